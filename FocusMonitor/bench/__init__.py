@@ -0,0 +1,2 @@
+# bench パッケージ（カメラや画面なしで処理性能を測るベンチマーク）
+__all__ = ["synthetic", "pipeline_bench", "db_bench", "frame_replay", "session_replay", "group_summary_bench"]
@@ -0,0 +1,279 @@
+"""DBManager の規模別ベンチマーク
+
+長期間使った後の DB を想定して detail_logs / score_logs を大量に生成し、
+行数が増えるごとに次の値を測って表にします（スキーマやインデックスを変えた時の比較用）。
+
+- 書き込み: 1件ずつ (save_detail_log) と まとめて (save_detail_logs) の行/秒
+- 読み出し: 1人分の get_recent_scores / get_recent_details / get_scores_page の時間
+- 集計: 1人分のダッシュボードの日/週/月の統計 (get_scores_between + compute_period_stats) と、
+  detail_logs の1日分の時間帯別集計の時間（比較用に、全員分の月の統計も測る）
+- ファイルサイズ
+
+シナリオ (1日8時間の記録を想定):
+- 1user_1year:     1人 × 365日
+- 500users_3months: 500人 × 90日 （500人分の行を user_id で分けて1つの DB に入れ、1人分を問い合わせる）
+
+全量はとても大きいので、--max-rows で打ち切ります（表の coverage が全量に対する割合）。
+
+FocusMonitor ディレクトリで実行:
+    python -m bench.db_bench
+    python -m bench.db_bench --scenario 500users_3months --max-rows 5000000 --output db.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common.data_struct import OneSecData, ScoreData
+from core.score_stats import (load_score_arrays, compute_period_stats, PERIOD_DAY, PERIOD_WEEK,
+                              PERIOD_MONTH, period_range)
+from database.db_manager import DBManager
+
+SCENARIOS = {
+    "1user_1year": {"users": 1, "days": 365},
+    "500users_3months": {"users": 500, "days": 90},
+}
+SECONDS_PER_DAY = 8 * 3600        # 1日の記録時間
+DAY_START = timedelta(hours=9)    # 記録開始時刻
+START_DATE = datetime(2025, 1, 6)
+STEP_SECONDS = 3600               # 1回に生成・書き込みする記録時間
+
+CHECKPOINT_ROWS = [10_000, 100_000, 1_000_000, 10_000_000, 100_000_000]
+
+
+def _timed(fn, repeat=5):
+    """repeat 回実行した中央値 (ms)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def _user_id(u: int) -> str:
+    return f"user{u:03d}"
+
+
+def _generate_day(rng, day: datetime, users: int, seconds: int, day_offset: int = 0):
+    """day から seconds 秒分の、ユーザーごとの (detail_logs 用 OneSecData, score_logs 用 ScoreData) を時刻順に作る
+
+    day_offset: day がその日の記録開始から何秒目か（スコアは記録開始から数えて1分ごとに出す）
+    戻り値: ユーザーの番号の順に [(details, scores), ...]
+    """
+    base = day + DAY_START
+    per_user = [([], []) for _ in range(users)]
+    looking = rng.choice(6, size=(seconds, users), p=[0.6, 0.15, 0.1, 0.07, 0.05, 0.03])
+    sleeping = rng.choice(6, size=(seconds, users), p=[0.9, 0.03, 0.02, 0.02, 0.01, 0.02])
+    no_face = rng.choice([0, 5], size=(seconds, users), p=[0.9, 0.1])
+    nose = rng.uniform(0, 0.03, size=(seconds, users))
+    score = rng.integers(40, 101, size=(seconds // 60 + 1, users))
+    ratio = rng.integers(0, 30, size=(seconds // 60 + 1, users))
+    minute = 0
+    for sec in range(seconds):
+        ts = base + timedelta(seconds=sec)
+        for u in range(users):
+            per_user[u][0].append(OneSecData(ts, int(looking[sec, u]), int(sleeping[sec, u]),
+                                             int(no_face[sec, u]), float(nose[sec, u])))
+        # 生成を区切る位置がチェックポイントに合わせてずれても、分の区切りは記録開始から数える
+        if (day_offset + sec) % 60 == 59:
+            for u in range(users):
+                per_user[u][1].append(ScoreData(ts, int(score[minute, u]), int(ratio[minute, u])))
+            minute += 1
+    return per_user
+
+
+def _detail_day_aggregate(db_path, day: datetime, user_id: str):
+    """ダッシュボードの時間帯別グラフを想定した detail_logs の1人・1日分の集計"""
+    start = day.strftime('%Y-%m-%d 00:00:00')
+    end = (day + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("""
+            SELECT substr(timestamp, 12, 2) AS hour,
+                   SUM(looking_away_count), SUM(sleeping_count), SUM(no_face_count), AVG(nose_movement)
+            FROM detail_logs WHERE user_id = ? AND timestamp >= ? AND timestamp < ?
+            GROUP BY hour
+        """, (user_id, start, end)).fetchall()
+
+
+def _period_stats(db, period, today, user_id=None):
+    start, end = period_range(period, today)
+    return compute_period_stats(load_score_arrays(db.get_scores_between(start, end, user_id=user_id)),
+                                period, today)
+
+
+def _history_pages(db, user_id: str, pages: int = 10):
+    """履歴画面を最新から pages ページ分さかのぼる"""
+    before = None
+    for _ in range(pages):
+        rows = db.get_scores_page(before=before, user_id=user_id)
+        if not rows:
+            return
+        before = (rows[-1]['timestamp'], rows[-1]['id'])
+
+
+def measure(db: DBManager, last_day: datetime, rng, single_sample: int, repeat: int) -> dict:
+    """今の DB の状態で各操作の時間を測る（読み出し・集計は db.user_id のユーザー1人分）"""
+    result = {}
+    user_id = db.user_id
+
+    # 書き込み: 1件ずつ（1件ごとに接続・コミット）とまとめて（1回のトランザクション）
+    # 計測用に書き込んだ行は最後に消して、行数の推移に影響しないようにする
+    with sqlite3.connect(db.db_path) as conn:
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM detail_logs").fetchone()[0]
+    sample_ts = last_day + DAY_START + timedelta(seconds=SECONDS_PER_DAY)
+    sample = [OneSecData(sample_ts + timedelta(seconds=i), 0, 0, 0, 0.0) for i in range(single_sample)]
+    start = time.perf_counter()
+    for d in sample:
+        db.save_detail_log(d)
+    result["insert_single_rows_per_s"] = single_sample / (time.perf_counter() - start)
+    batch = [OneSecData(sample_ts + timedelta(seconds=single_sample + i), 0, 0, 0, 0.0) for i in range(10_000)]
+    start = time.perf_counter()
+    db.save_detail_logs(batch)
+    result["insert_batch_rows_per_s"] = len(batch) / (time.perf_counter() - start)
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("DELETE FROM detail_logs WHERE id > ?", (max_id,))
+        conn.commit()
+
+    result["recent_scores_ms"] = _timed(lambda: db.get_recent_scores(100, user_id=user_id), repeat)
+    result["recent_details_ms"] = _timed(lambda: db.get_recent_details(100, user_id=user_id), repeat)
+    result["history_10_pages_ms"] = _timed(lambda: _history_pages(db, user_id), repeat)
+    today = last_day.date()
+    for period, key in ((PERIOD_DAY, "stats_day_ms"), (PERIOD_WEEK, "stats_week_ms"), (PERIOD_MONTH, "stats_month_ms")):
+        result[key] = _timed(lambda: _period_stats(db, period, today, user_id), repeat)
+    result["stats_month_all_users_ms"] = _timed(lambda: _period_stats(db, PERIOD_MONTH, today), repeat)
+    result["detail_day_aggregate_ms"] = _timed(lambda: _detail_day_aggregate(db.db_path, last_day, user_id), repeat)
+    return result
+
+
+def run_scenario(name: str, max_rows: int, db_path: str = None, seed: int = 0,
+                 single_sample: int = 200, repeat: int = 5, log=print) -> dict:
+    scenario = SCENARIOS[name]
+    users, days = scenario["users"], scenario["days"]
+    full_rows = users * days * SECONDS_PER_DAY
+    target_rows = min(full_rows, max_rows)
+
+    tmp_dir = None
+    if db_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, f"{name}.db")
+    elif os.path.exists(db_path):
+        os.remove(db_path)
+    db = DBManager(db_path)
+    rng = np.random.default_rng(seed)
+
+    checkpoints = [c for c in CHECKPOINT_ROWS if c < target_rows] + [target_rows]
+    rows_written = 0
+    generate_seconds = 0.0
+    results = []
+    day_index = 0
+    day_offset = 0  # その日の記録開始からの秒数
+    while rows_written < target_rows:
+        day = START_DATE + timedelta(days=day_index)
+        # 1時間分ずつ生成・書き込みし、次のチェックポイントの行数ちょうどで止める
+        seconds = min(STEP_SECONDS, SECONDS_PER_DAY - day_offset,
+                      -(-(checkpoints[0] - rows_written) // users))
+        start = time.perf_counter()
+        per_user = _generate_day(rng, day + timedelta(seconds=day_offset), users, seconds, day_offset)
+        generate_seconds += time.perf_counter() - start
+        # ログイン中のユーザーを切り替えながら、1人分ずつ保存する（user_id 列はログイン中のユーザーになる）
+        for u, (details, scores) in enumerate(per_user):
+            db.user_id = _user_id(u)
+            db.save_detail_logs(details)
+            db.save_score_logs(scores)
+            rows_written += len(details)
+        day_offset += seconds
+        if day_offset >= SECONDS_PER_DAY:
+            day_offset = 0
+            day_index += 1
+
+        if rows_written >= checkpoints[0]:
+            checkpoints.pop(0)
+            with sqlite3.connect(db_path) as conn:
+                detail_rows = conn.execute("SELECT COUNT(*) FROM detail_logs").fetchone()[0]
+                score_rows = conn.execute("SELECT COUNT(*) FROM score_logs").fetchone()[0]
+            row = {
+                "detail_rows": detail_rows,
+                "score_rows": score_rows,
+                "coverage": round(rows_written / full_rows, 6),
+                "file_mb": round(os.path.getsize(db_path) / 1024 ** 2, 2),
+            }
+            db.user_id = _user_id(0)
+            row.update(measure(db, day, rng, single_sample, repeat))
+            results.append(row)
+            log(format_row(row))
+            if not checkpoints:
+                break
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+    return {
+        "benchmark": "db",
+        "scenario": name,
+        "users": users,
+        "days": days,
+        "full_detail_rows": full_rows,
+        "generate_seconds": round(generate_seconds, 2),
+        "results": results,
+    }
+
+
+COLUMNS = [
+    # (キー, 見出し, 書式)  見出しは桁をそろえるため ASCII にしている
+    ("detail_rows", "detail_rows", "{:>12,}"),
+    ("score_rows", "score_rows", "{:>10,}"),
+    ("coverage", "coverage", "{:>8.2%}"),
+    ("file_mb", "MB", "{:>8.1f}"),
+    ("insert_single_rows_per_s", "single/s", "{:>10,.0f}"),
+    ("insert_batch_rows_per_s", "batch/s", "{:>10,.0f}"),
+    ("recent_scores_ms", "recent_score", "{:>12.2f}"),
+    ("recent_details_ms", "recent_detail", "{:>13.2f}"),
+    ("history_10_pages_ms", "history_ms", "{:>10.2f}"),
+    ("stats_day_ms", "day_ms", "{:>8.2f}"),
+    ("stats_week_ms", "week_ms", "{:>8.2f}"),
+    ("stats_month_ms", "month_ms", "{:>8.2f}"),
+    ("stats_month_all_users_ms", "month_all_ms", "{:>12.2f}"),
+    ("detail_day_aggregate_ms", "detail_day_ms", "{:>13.2f}"),
+]
+
+
+def format_header() -> str:
+    widths = [len(fmt.format(0)) for _, _, fmt in COLUMNS]
+    return " ".join(label.rjust(w) for (_, label, _), w in zip(COLUMNS, widths))
+
+
+def format_row(row: dict) -> str:
+    return " ".join(fmt.format(row[key]) for key, _, fmt in COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DBManager の規模別ベンチマーク")
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--max-rows", type=int, default=1_000_000, help="detail_logs の最大行数（シナリオの全量より少なければ打ち切る）")
+    parser.add_argument("--db", help="生成先の DB ファイル (省略時は一時ファイル。既存ファイルは削除される)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--single-sample", type=int, default=200, help="1件ずつの書き込みを測る件数")
+    parser.add_argument("--repeat", type=int, default=5, help="読み出し・集計を測る回数（中央値を使う）")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル")
+    args = parser.parse_args(argv)
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    reports = []
+    for name in names:
+        print(f"\n=== {name} ===")
+        print(format_header())
+        reports.append(run_scenario(name, args.max_rows, db_path=args.db, seed=args.seed,
+                                    single_sample=args.single_sample, repeat=args.repeat))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""フレームごとの記録 (core.frame_log) を集計・スコア計算に流し直す
+
+閾値を変えると居眠り・よそ見の回数やスコアがどう変わるかを、実際の記録で確かめるためのものです。
+MainApp と同じ Aggregator / Calculator / EpisodeTracker を使い、結果は JSON で出力します（--db で DB にも保存）。
+
+FocusMonitor ディレクトリで実行:
+    python -m bench.frame_replay frame_logs
+    python -m bench.frame_replay frame_logs --eye 0.6 --yaw 18 --pitch 12 --db replay.db
+    python -m bench.frame_replay frame_logs/frames_20250106_0900.fmlog --output result.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from bench.pipeline_bench import BENCH_CALIBRATION
+from common.data_struct import CalibrationData
+from common.event_bus import EventBus, TOPIC_ONE_SEC, TOPIC_SCORE, TOPIC_EPISODE
+from core.aggregator import Aggregator, FRAMES_PER_SECOND
+from core.calculator import Calculator
+from core.episodes import EpisodeTracker
+from core.frame_log import open_frame_log, list_frame_logs, replay
+from database.db_manager import DBManager
+
+
+def run_replay(paths, calibration_data: CalibrationData, db_path: str = None) -> dict:
+    logs = [open_frame_log(p) for p in paths]
+    bus = EventBus()
+    aggregator = Aggregator(bus, Calculator(), calibration_data)
+    tracker = EpisodeTracker(on_episode=lambda e: bus.publish(TOPIC_EPISODE, e))
+    scores, episodes = [], []
+    bus.subscribe(TOPIC_SCORE, scores.append)
+    bus.subscribe(TOPIC_ONE_SEC, tracker.add)
+    bus.subscribe(TOPIC_EPISODE, episodes.append)
+    if db_path is not None:
+        db = DBManager(db_path)
+        bus.subscribe(TOPIC_ONE_SEC, db.save_detail_log)
+        bus.subscribe(TOPIC_SCORE, db.save_score_log)
+        bus.subscribe(TOPIC_EPISODE, db.save_episode)
+
+    start = time.perf_counter()
+    # 1分ごとのスコア表示 (print) は捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        fed = replay(logs, aggregator)
+        tracker.flush()
+    wall = time.perf_counter() - start
+
+    recorded = sum(len(records) for records in logs)
+    simulated_seconds = fed / FRAMES_PER_SECOND
+    values = np.array([s.concentration_score for s in scores], dtype=float)
+    episode_seconds = Counter()
+    for e in episodes:
+        episode_seconds[e.episode_type] += e.duration_seconds
+    return {
+        "benchmark": "frame_replay",
+        "files": [os.path.basename(p) for p in paths],
+        "calibration": {
+            "eye_closedness_threshold": calibration_data.eye_closedness_threshold,
+            "gaze_angle_yaw_threshold": calibration_data.gaze_angle_yaw_threshold,
+            "gaze_angle_pitch_threshold": calibration_data.gaze_angle_pitch_threshold,
+        },
+        "recorded_frames": recorded,
+        "replayed_frames": fed,
+        "simulated_seconds": round(simulated_seconds, 1),
+        "wall_seconds": round(wall, 3),
+        "realtime_factor": round(simulated_seconds / wall, 1) if wall > 0 else None,
+        "minutes": len(scores),
+        "score_mean": round(float(values.mean()), 2) if len(values) else None,
+        "score_min": int(values.min()) if len(values) else None,
+        "episodes": dict(Counter(e.episode_type for e in episodes)),
+        "episode_seconds": dict(episode_seconds),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="フレームごとの記録を集計・スコア計算に流し直す")
+    parser.add_argument("paths", nargs="+", help="記録ファイル (.fmlog) または記録先のディレクトリ")
+    parser.add_argument("--eye", type=float, default=BENCH_CALIBRATION.eye_closedness_threshold, help="目の閉じ具合の閾値")
+    parser.add_argument("--yaw", type=float, default=BENCH_CALIBRATION.gaze_angle_yaw_threshold, help="視線の横角度の閾値")
+    parser.add_argument("--pitch", type=float, default=BENCH_CALIBRATION.gaze_angle_pitch_threshold, help="視線の縦角度の閾値")
+    parser.add_argument("--db", help="結果を保存する DB ファイル (省略時は保存しない)")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル (省略時は標準出力)")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.paths:
+        paths.extend(list_frame_logs(path) if os.path.isdir(path) else [path])
+    if not paths:
+        parser.error("記録ファイルが見つかりません")
+
+    calibration = CalibrationData(
+        eye_closedness_threshold=args.eye,
+        gaze_angle_yaw_threshold=args.yaw,
+        gaze_angle_pitch_threshold=args.pitch,
+    )
+    result = run_replay(paths, calibration, db_path=args.db)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""収集サーバーのグループ集計 (server.summaries) のベンチマーク
+
+多数のユーザーの score_logs を収集サーバーの保存先 (server.store) に送信と同じ単位で書き込み、次を測ります。
+
+- 書き込み: 集計の差分更新を含めた行/秒
+- 問い合わせ: 1週間分の1時間ごと・1日ごとの推移、パーセンタイル、全グループの比較の時間
+- 比較: 同じ推移を score_logs から直接集計した時間（集計テーブルがない場合）
+- 確かめ: 差分で更新した集計が、保存済みの記録から作り直した集計と一致するか
+
+FocusMonitor ディレクトリで実行:
+    python -m bench.group_summary_bench
+    python -m bench.group_summary_bench --users 5000 --groups 100 --days 7 --output groups.json
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from server.store import CollectorStore
+
+START_DATE = datetime(2025, 1, 6)
+HOURS_PER_DAY = 8                 # 1日の記録時間 (9時から)
+DAY_START = timedelta(hours=9)
+USERS_PER_CLIENT_BATCH = 100      # 1回の書き込みにまとめるユーザー数（送信をまとめて保存するのを想定）
+
+
+def _timed(fn, repeat=5):
+    """repeat 回実行した中央値 (ms)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def _ingest(store: CollectorStore, rng, users: int, days: int) -> int:
+    """1時間ごとに全ユーザーの1分ごとのスコアを書き込み、行数を返す"""
+    rows = 0
+    source_ids = np.zeros(users, dtype=np.int64)
+    for day in range(days):
+        for hour in range(HOURS_PER_DAY):
+            base = START_DATE + timedelta(days=day) + DAY_START + timedelta(hours=hour)
+            stamps = [(base + timedelta(minutes=m)).strftime('%Y-%m-%d %H:%M:%S') for m in range(60)]
+            scores = rng.integers(30, 101, size=(users, 60))
+            requests = []
+            for first in range(0, users, USERS_PER_CLIENT_BATCH):
+                batches = []
+                for u in range(first, min(first + USERS_PER_CLIENT_BATCH, users)):
+                    ids = source_ids[u] + np.arange(1, 61)
+                    source_ids[u] += 60
+                    batches.append((f"pc{u:05d}", "score", [
+                        [int(ids[m]), f"user{u:05d}", stamps[m], float(scores[u, m]), 0.0] for m in range(60)]))
+                requests.append(batches)
+            rows += sum(r for r in store.write_many(requests))
+    return rows
+
+
+def _direct_trend(conn, tables, members, start: str, end: str):
+    """集計テーブルを使わず、score_logs から1時間ごとの平均を求める（比較用）"""
+    placeholders = ", ".join("?" * len(members))
+    union = " UNION ALL ".join(f"SELECT user_id, timestamp, score FROM {t}" for t in tables)
+    return conn.execute(f"""
+        SELECT substr(timestamp, 1, 13), COUNT(*), AVG(score) FROM ({union})
+        WHERE timestamp >= ? AND timestamp < ? AND user_id IN ({placeholders})
+        GROUP BY 1 ORDER BY 1
+    """, (start, end, *members)).fetchall()
+
+
+def _snapshot(conn):
+    """集計テーブルの中身（作り直した結果と比べる用）"""
+    hourly = conn.execute("""
+        SELECT group_id, hour, score_count, ROUND(score_sum, 6), ROUND(score_sq_sum, 3), score_min, score_max
+        FROM group_hourly ORDER BY 1, 2
+    """).fetchall()
+    hist = conn.execute("SELECT * FROM group_score_hist WHERE count > 0 ORDER BY 1, 2, 3").fetchall()
+    return hourly, hist
+
+
+def run(users: int, groups: int, days: int, seed: int = 0, repeat: int = 5, data_dir: str = None) -> dict:
+    rng = np.random.default_rng(seed)
+    data_dir = data_dir or tempfile.mkdtemp(prefix="group_bench_")
+    if os.path.exists(data_dir):
+        shutil.rmtree(data_dir)
+    store = CollectorStore(data_dir)
+    try:
+        # メンバーを先に登録しておく（記録を受け取るたびにグループの集計も更新される）
+        group_ids = [f"team{g:03d}" for g in range(groups)]
+        for g, group_id in enumerate(group_ids):
+            store.summaries.set_group(group_id, f"チーム {g}")
+            store.summaries.add_members(group_id, [f"user{u:05d}" for u in range(g, users, groups)])
+        store.summaries.add_members("all", [f"user{u:05d}" for u in range(users)])
+
+        start = time.perf_counter()
+        rows = _ingest(store, rng, users, days)
+        ingest_seconds = time.perf_counter() - start
+
+        reader = store.open_reader()
+        first = START_DATE.strftime('%Y-%m-%d %H:%M:%S')
+        last = (START_DATE + timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        team = group_ids[0]
+        result = {
+            "users": users,
+            "groups": groups,
+            "days": days,
+            "score_rows": rows,
+            "ingest_rows_per_s": round(rows / ingest_seconds),
+            "trend_hour_ms": _timed(lambda: reader.trend(team, first, last), repeat),
+            "trend_day_ms": _timed(lambda: reader.trend(team, first, last, bucket="day"), repeat),
+            "trend_all_users_ms": _timed(lambda: reader.trend("all", first, last), repeat),
+            "percentiles_ms": _timed(lambda: reader.percentiles(team, first, last), repeat),
+            "percentiles_all_users_ms": _timed(lambda: reader.percentiles("all", first, last), repeat),
+            "compare_groups_ms": _timed(lambda: reader.compare(first, last), repeat),
+        }
+        members = reader.members(team)
+        tables = store.partitions("score")
+        result["direct_trend_ms"] = _timed(lambda: _direct_trend(reader.conn, tables, members, first, last),
+                                           max(1, repeat // 2))
+
+        # メンバーの入れ替え（過去の記録ごと足し引きする）
+        moved = members[:10]
+        start = time.perf_counter()
+        store.summaries.remove_members(team, moved)
+        store.summaries.add_members(group_ids[-1], moved)
+        result["move_10_members_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # 差分で更新した集計と、作り直した集計が一致するか
+        incremental = _snapshot(store.conn)
+        start = time.perf_counter()
+        store.rebuild_summaries()
+        result["rebuild_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result["matches_rebuild"] = incremental == _snapshot(store.conn)
+        reader.conn.close()
+    finally:
+        store.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="収集サーバーのグループ集計のベンチマーク")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="問い合わせを測る回数（中央値を使う）")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル")
+    args = parser.parse_args(argv)
+
+    result = run(args.users, args.groups, args.days, seed=args.seed, repeat=args.repeat)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
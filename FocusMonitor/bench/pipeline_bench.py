@@ -0,0 +1,182 @@
+"""集計 → スコア計算 → DB保存 のベンチマーク（カメラ・画面なし）
+
+合成した SensingData を、MainApp と同じ Aggregator / Calculator / EpisodeTracker / DBManager に
+できるだけ速く流し込み、処理できるフレーム数と段階ごとの処理時間を JSON で出力します。
+
+FocusMonitor ディレクトリで実行:
+    python -m bench.pipeline_bench --minutes 60
+    python -m bench.pipeline_bench --pattern focused:600,sleeping:60,absent:120 --output result.json
+    python -m bench.pipeline_bench --minutes 30 --tracemalloc   # Python のメモリ確保量も測る（遅くなる）
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource  # Windows にはない
+except ImportError:
+    resource = None
+
+from bench.synthetic import SyntheticStream, parse_schedule, mixed_schedule
+from common.data_struct import CalibrationData
+from common.event_bus import EventBus, TOPIC_ONE_SEC, TOPIC_SCORE, TOPIC_EPISODE
+from core.aggregator import Aggregator, FRAMES_PER_SECOND
+from core.calculator import Calculator
+from core.episodes import EpisodeTracker
+from database.db_manager import DBManager
+
+# キャリブレーション済みを想定した閾値
+BENCH_CALIBRATION = CalibrationData(
+    eye_closedness_threshold=0.55,
+    gaze_angle_yaw_threshold=15.0,
+    gaze_angle_pitch_threshold=12.0,
+)
+
+
+class StageTimer:
+    """段階ごとの処理時間を記録する"""
+
+    def __init__(self):
+        self.samples = {}  # 段階名 -> [秒, ...]
+
+    def wrap(self, name, fn):
+        """fn を呼ぶたびに処理時間を記録する関数を返す"""
+        samples = self.samples.setdefault(name, [])
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> dict:
+        result = {}
+        for name, values in self.samples.items():
+            if not values:
+                continue
+            ms = np.asarray(values) * 1000
+            result[name] = {
+                "count": int(len(ms)),
+                "mean_ms": round(float(ms.mean()), 4),
+                "p50_ms": round(float(np.percentile(ms, 50)), 4),
+                "p95_ms": round(float(np.percentile(ms, 95)), 4),
+                "p99_ms": round(float(np.percentile(ms, 99)), 4),
+                "max_ms": round(float(ms.max()), 4),
+                "total_s": round(float(ms.sum() / 1000), 4),
+            }
+        return result
+
+
+def _peak_rss_kb():
+    """プロセスの最大メモリ使用量 (KB)。resource がない環境 (Windows) では None"""
+    if resource is None:
+        return None
+    # ru_maxrss は Linux では KB, macOS では bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+
+
+def run_pipeline(schedule, db_path: str = None, seed: int = 0, trace_memory: bool = False) -> dict:
+    """合成データを流し込んで計測結果を dict で返す
+
+    Aggregator は FRAMES_PER_SECOND 件を1秒として数えるので、合成データもそのレートで作る。
+    OneSecData と ScoreData の時刻は、どちらも合成データの時刻にそろえる。
+    """
+    rate_hz = FRAMES_PER_SECOND
+    stream = SyntheticStream(schedule, rate_hz=rate_hz, seed=seed)
+    timer = StageTimer()
+
+    tmp_dir = None
+    if db_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, "bench.db")
+
+    # MainApp と同じ組み立て（各段階を計測用に包む）
+    bus = EventBus()
+    db = DBManager(db_path)
+    calculator = Calculator(clock=lambda: stream.now)
+    calculator.calculate_score = timer.wrap("score_1min", calculator.calculate_score)
+    aggregator = Aggregator(bus, calculator, BENCH_CALIBRATION, clock=lambda: stream.now_ns)
+    aggregator.summarize_second = timer.wrap("aggregate_1s", aggregator.summarize_second)
+    tracker = EpisodeTracker(on_episode=lambda e: bus.publish(TOPIC_EPISODE, e))
+
+    bus.subscribe(TOPIC_ONE_SEC, timer.wrap("db_save_detail", db.save_detail_log))
+    bus.subscribe(TOPIC_SCORE, timer.wrap("db_save_score", db.save_score_log))
+    bus.subscribe(TOPIC_ONE_SEC, timer.wrap("episodes", tracker.add))
+    bus.subscribe(TOPIC_EPISODE, timer.wrap("db_save_episode", db.save_episode))
+    add_frame = timer.wrap("frame_total", aggregator.add)
+
+    if trace_memory:
+        tracemalloc.start()
+    frames = 0
+    start = time.perf_counter()
+    # 1分ごとのスコア表示 (print) は計測の邪魔なので捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        for data in stream:
+            add_frame(data)
+            frames += 1
+        tracker.flush()
+    wall = time.perf_counter() - start
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    simulated_seconds = frames / rate_hz
+    result = {
+        "benchmark": "pipeline",
+        "config": {
+            "schedule": [[name, round(seconds, 3)] for name, seconds in schedule],
+            "rate_hz": rate_hz,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "frames": frames,
+        "simulated_seconds": round(simulated_seconds, 3),
+        "wall_seconds": round(wall, 4),
+        "throughput_fps": round(frames / wall, 1) if wall > 0 else None,
+        "realtime_factor": round(simulated_seconds / wall, 1) if wall > 0 else None,
+        "stages": timer.summary(),
+        "db_file_bytes": os.path.getsize(db_path),
+        "peak_rss_kb": _peak_rss_kb(),
+        "tracemalloc_peak_bytes": traced_peak,
+    }
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="集計→スコア計算→DB保存のベンチマーク")
+    parser.add_argument("--pattern", help="状態:秒数 のカンマ区切り (例: focused:600,sleeping:30)。省略時はランダムな作業パターン")
+    parser.add_argument("--minutes", type=float, default=10, help="--pattern 省略時に生成する長さ (分)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="保存先の DB ファイル (省略時は一時ファイル)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Python のメモリ確保のピークを測る")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル (省略時は標準出力)")
+    args = parser.parse_args(argv)
+
+    schedule = parse_schedule(args.pattern) if args.pattern else mixed_schedule(args.minutes * 60, args.seed)
+    result = run_pipeline(schedule, db_path=args.db, seed=args.seed, trace_memory=args.tracemalloc)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""記録したカメラ映像 (core.session) を detector に通し、精度と速度を測る
+
+detector を変更したら、同じ映像で次を確かめます。
+- 速度: 1フレームの解析時間と fps
+- 精度: 出力 (顔ありの判定・目の閉じ具合・視線角度・鼻の座標) が基準とどれだけ違うか
+
+基準は、記録時の出力（映像の圧縮による小さな差が出る）か、--baseline で指定した以前の再生結果です。
+
+mediapipe とモデルファイルが必要です。モデルのパスに合わせて、アプリと同じくリポジトリのルートで実行:
+    PYTHONPATH=FocusMonitor python -m bench.session_replay sessions/20250106_090000 --save-baseline   # 変更前に基準を作る
+    PYTHONPATH=FocusMonitor python -m bench.session_replay sessions/20250106_090000 --baseline sessions/20250106_090000/baseline.fmlog
+"""
+import argparse
+import json
+import os
+import sys
+
+from core.session import replay_session
+
+BASELINE_FILE = "baseline.fmlog"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="記録したカメラ映像で detector の精度と速度を測る")
+    parser.add_argument("session", help="記録のフォルダ (sessions/<開始時刻>)")
+    parser.add_argument("--baseline", help="比べる相手の記録ファイル (省略時は記録時の出力)")
+    parser.add_argument("--save-baseline", nargs="?", const="", metavar="PATH",
+                        help=f"今回の出力を基準として保存する (省略時は <session>/{BASELINE_FILE})")
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル (省略時は標準出力)")
+    parser.add_argument("--fail-on-diff", action="store_true", help="基準と1つでも違えば終了コード 1 にする")
+    args = parser.parse_args(argv)
+
+    save_path = None
+    if args.save_baseline is not None:
+        save_path = args.save_baseline or os.path.join(args.session, BASELINE_FILE)
+
+    # mediapipe の読み込みに時間がかかるので、引数を確認してから import する
+    from core.detector import FaceDetector
+    detector = FaceDetector(open_camera=False)
+    result = replay_session(detector, args.session, baseline_path=args.baseline, save_path=save_path)
+    if save_path:
+        result["saved_baseline"] = save_path
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.fail_on_diff and not result["diff"]["identical"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""合成 SensingData の生成（カメラなしで集計・スコア計算・DB保存を動かすため）
+
+状態（集中・よそ見・居眠り・不在）ごとに、実際の detector の出力に近い値を作ります。
+
+- focused: 目はほぼ開いていて時々瞬き、視線は画面内で小さく揺れる
+- looking_away: 視線が左右どちらかに大きく外れる
+- sleeping: 目がほぼ閉じている（たまに薄く開く）
+- absent: 顔が検出されない
+
+スケジュールは [(状態, 秒数), ...] で指定します。"focused:600,sleeping:30" のような文字列からも作れます。
+"""
+import random
+from datetime import datetime, timedelta
+
+from common.data_struct import SensingData
+from common.timeutil import to_ns
+
+PATTERN_FOCUSED = "focused"
+PATTERN_LOOKING_AWAY = "looking_away"
+PATTERN_SLEEPING = "sleeping"
+PATTERN_ABSENT = "absent"
+PATTERNS = [PATTERN_FOCUSED, PATTERN_LOOKING_AWAY, PATTERN_SLEEPING, PATTERN_ABSENT]
+
+# ランダムなスケジュールで使う、各状態の出やすさと1回の長さ(秒)の範囲
+_MIXED_WEIGHTS = {
+    PATTERN_FOCUSED: (0.70, (60, 900)),
+    PATTERN_LOOKING_AWAY: (0.15, (3, 40)),
+    PATTERN_SLEEPING: (0.07, (5, 120)),
+    PATTERN_ABSENT: (0.08, (10, 600)),
+}
+
+
+def parse_schedule(text: str):
+    """'focused:600,sleeping:30' → [('focused', 600.0), ('sleeping', 30.0)]"""
+    schedule = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, seconds = part.partition(":")
+        if name not in PATTERNS:
+            raise ValueError(f"不明な状態です: {name} (使えるもの: {', '.join(PATTERNS)})")
+        schedule.append((name, float(seconds or 60)))
+    return schedule
+
+
+def mixed_schedule(total_seconds: float, seed: int = 0):
+    """1日の作業を想定したランダムなスケジュール（合計 total_seconds 秒）"""
+    rng = random.Random(seed)
+    names = list(_MIXED_WEIGHTS)
+    weights = [_MIXED_WEIGHTS[n][0] for n in names]
+    schedule, elapsed = [], 0.0
+    while elapsed < total_seconds:
+        name = rng.choices(names, weights)[0]
+        lo, hi = _MIXED_WEIGHTS[name][1]
+        seconds = min(rng.uniform(lo, hi), total_seconds - elapsed)
+        schedule.append((name, seconds))
+        elapsed += seconds
+    return schedule
+
+
+class SyntheticStream:
+    """スケジュールに沿って SensingData を rate_hz の間隔で生成する
+
+    start: 最初のフレームの時刻。timestamp は実時間ではなくこの時刻から rate_hz 間隔で進む
+           （SensingData.timestamp には detector と同じく monotonic ナノ秒に直して入れる）
+    """
+
+    def __init__(self, schedule, rate_hz: float = 5.0, seed: int = 0, start: datetime = None):
+        self.schedule = list(schedule)
+        self.rate_hz = rate_hz
+        self.rng = random.Random(seed)
+        self.start = start or datetime(2025, 1, 6, 9, 0, 0)
+        self.now = self.start
+        # 顔の位置はゆっくり動く（ランダムウォーク）
+        self._nose = [0.5, 0.5]
+
+    @property
+    def now_ns(self) -> int:
+        """今のフレームの時刻 (monotonic ナノ秒)"""
+        return to_ns(self.now)
+
+    @property
+    def total_frames(self) -> int:
+        return sum(int(round(seconds * self.rate_hz)) for _, seconds in self.schedule)
+
+    def __iter__(self):
+        dt = timedelta(seconds=1.0 / self.rate_hz)
+        for pattern, seconds in self.schedule:
+            for _ in range(int(round(seconds * self.rate_hz))):
+                yield self._frame(pattern)
+                self.now += dt
+
+    def _frame(self, pattern) -> SensingData:
+        rng = self.rng
+        if pattern == PATTERN_ABSENT:
+            return SensingData(timestamp=self.now_ns, face_detected=False)
+
+        self._nose[0] = min(max(self._nose[0] + rng.gauss(0, 0.002), 0.2), 0.8)
+        self._nose[1] = min(max(self._nose[1] + rng.gauss(0, 0.002), 0.2), 0.8)
+
+        if pattern == PATTERN_SLEEPING:
+            eye = rng.uniform(0.8, 1.0) if rng.random() > 0.05 else rng.uniform(0.4, 0.6)
+            yaw, pitch = rng.gauss(0, 3), rng.gauss(-8, 3)
+        elif pattern == PATTERN_LOOKING_AWAY:
+            eye = rng.uniform(0.0, 0.3)
+            yaw = rng.choice([-1, 1]) * rng.uniform(22, 30)
+            pitch = rng.gauss(0, 5)
+        else:
+            # 約4秒に1回の瞬き
+            eye = rng.uniform(0.85, 1.0) if rng.random() < 0.05 else rng.uniform(0.0, 0.3)
+            yaw, pitch = rng.gauss(0, 5), rng.gauss(0, 4)
+
+        return SensingData(
+            timestamp=self.now_ns,
+            face_detected=True,
+            eye_closedness=eye,
+            gaze_angle_yaw=yaw,
+            gaze_angle_pitch=pitch,
+            nose_x=self._nose[0] + rng.gauss(0, 0.001),
+            nose_y=self._nose[1] + rng.gauss(0, 0.001),
+        )
@@ -1,2 +1,2 @@
 # common パッケージ
-__all__ = ["data_struct"]
+__all__ = ["data_struct", "event_bus"]
@@ -1,6 +1,9 @@
 """データ構造定義（モジュール間で受け渡す値の型）
 
 重要: ここに書いた型は他モジュールのインターフェースとなるため、安易に変更しないでください。
+
+SensingData（フレームごと）と OneSecData（1秒ごと）は数が多いので、slots で軽くしてあり、
+時刻は monotonic のナノ秒（common.timeutil.now_ns）で持ちます。datetime への変換は DB 保存時に行います。
 """
 from dataclasses import dataclass
 from typing import Optional, Tuple
@@ -9,16 +12,17 @@ import numpy as np
 
 
 
-@dataclass
+@dataclass(slots=True)
 class SensingData:
     """センサーから取得した生データ"""
-    timestamp: datetime = None
+    timestamp: int = 0                  # 取得時刻 (monotonic ナノ秒)
     face_detected: bool = False         # 顔認識の有無
     eye_closedness: float = 0.0         # 両目の閉じ具合の平均値 (0.0〜1.0)
     gaze_angle_yaw: float = 0.0         # 視線の横方向角度 (度)
     gaze_angle_pitch: float = 0.0       # 視線の縦方向角度 (度)
     nose_x: float = 0.0                 # 鼻のX座標
     nose_y: float = 0.0                 # 鼻のY座標
+    captured_at: float = 0.0            # このフレームの撮影時刻 (time.perf_counter。遅延の計測用, 不明なら 0)
 
 @dataclass
 class ScoreData:
@@ -33,16 +37,50 @@ class CalibrationData:
     eye_closedness_threshold: float     # 目の閉じ具合の閾値
     gaze_angle_yaw_threshold: float     # 画面外視線横角度の閾値
     gaze_angle_pitch_threshold: float   # 画面外視線縦角度の閾値
+    # 平常時の中央値（キャリブレーションで求めた基準。ずれの検知に使う）
+    eye_closedness_center: float = 0.0
+    gaze_angle_yaw_center: float = 0.0
+    gaze_angle_pitch_center: float = 0.0
 
 @dataclass
+class CalibrationProfile:
+    """ユーザー・カメラごとに保存するキャリブレーション結果"""
+    user_id: str
+    camera_id: int
+    version: int                        # 同じユーザー・カメラで何回目の結果か (1〜)
+    created_at: datetime
+    calibration: CalibrationData
+    sample_count: int = 0               # 計算に使ったサンプル数
+
+@dataclass(slots=True)
 class OneSecData:
     """1秒ごとの集計データ"""
-    timestamp: datetime
+    timestamp: int             # 集計時刻 (monotonic ナノ秒。datetime も可)
     looking_away_count: int    # 目線が画面外にあったフレーム数 (0-5)
     sleeping_count: int        # 目を閉じていたフレーム数 (0-5)
     no_face_count: int         # 顔認識できなかったフレーム数 (0-5)
     nose_coord_std_ave: float  # 鼻の座標の標準偏差 (顔の動きの激しさ)
 
+@dataclass
+class EpisodeData:
+    """居眠り・不在・よそ見が続いた1回分の区間"""
+    episode_type: str          # "sleeping" / "absent" / "looking_away"
+    start: datetime            # 最初の秒の時刻
+    end: datetime              # 最後の秒の時刻 + 1秒
+    duration_seconds: int      # 続いた秒数
+    user_id: Optional[str] = None
+
+@dataclass
+class AlertData:
+    """居眠り・不在の即時アラート（発生と解除）"""
+    alert_type: str            # "sleeping" / "absent"
+    timestamp: datetime
+    active: bool               # True: 発生, False: 解除
+    duration_seconds: float    # 状態が続いていた秒数
+    latency_ms: float = 0.0    # 判定に使ったフレームの撮影からアラート発行までの時間
+    captured_at: float = 0.0   # 判定に使ったフレームの撮影時刻 (time.perf_counter)
+    user_id: Optional[str] = None
+
 # @dataclass
 # class Frame:
 #     """カメラから取得した生フレーム
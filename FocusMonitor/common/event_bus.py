@@ -0,0 +1,50 @@
+"""プロセス内のイベント配信（publish / subscribe）
+
+集計処理（MainApp）が作った OneSecData や ScoreData を、画面や DB 保存などの購読者に直接届けます。
+画面側は受け取ったデータを自分で保持し、DB は起動直後の初回表示の時だけ読めばよくなります。
+
+- スレッドセーフ: 購読・解除・発行はどのスレッドから行ってもよい
+- 購読者は発行したスレッドで同期的に呼ばれる（GUI を触る購読者は GUI スレッドから発行されるトピックを購読すること）
+- 1つの購読者で例外が起きても、他の購読者には配信を続ける
+"""
+import threading
+import traceback
+
+# --- トピック名 ---
+TOPIC_ONE_SEC = "one_sec"   # OneSecData: 1秒ごとの集計
+TOPIC_SCORE = "score"       # ScoreData: 1分ごとのスコア
+TOPIC_EPISODE = "episode"   # EpisodeData: 居眠り・不在・よそ見の区間が終わった時
+TOPIC_ALERT = "alert"       # AlertData: 即時アラート（detector のスレッドから発行される）
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers = {}  # topic -> [callback, ...]
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, callback):
+        """購読する。戻り値の関数を呼ぶと購読を解除できる"""
+        with self._lock:
+            # 発行中のスナップショットに影響しないよう、リストは作り直す
+            self._subscribers[topic] = self._subscribers.get(topic, []) + [callback]
+        return lambda: self.unsubscribe(topic, callback)
+
+    def unsubscribe(self, topic: str, callback):
+        with self._lock:
+            callbacks = [cb for cb in self._subscribers.get(topic, []) if cb != callback]
+            self._subscribers[topic] = callbacks
+
+    def publish(self, topic: str, payload):
+        """購読者全員に payload を渡す（購読した順に呼ぶ）"""
+        with self._lock:
+            callbacks = self._subscribers.get(topic, [])
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception:
+                print(f"EventBus: '{topic}' の購読者でエラーが発生しました")
+                traceback.print_exc()
+
+    def has_subscribers(self, topic: str) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(topic))
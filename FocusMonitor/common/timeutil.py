@@ -0,0 +1,70 @@
+"""時刻の扱い
+
+フレームごと・1秒ごとのデータ (SensingData / OneSecData) の時刻は、datetime を作らずに
+time.monotonic_ns() の整数で持ちます。datetime に変換するのは DB 保存など外に出す時だけです。
+
+monotonic は時計合わせ（NTP など）で戻ったり飛んだりしないので、間隔の計算にもそのまま使えます。
+壁時計への変換は「monotonic と壁時計の対応」を基準にします。スリープ中は monotonic が進まない OS があり、
+時計合わせで壁時計だけが動くこともあるので、変換のたびに対応がずれていないかを確かめ、
+ANCHOR_TOLERANCE_NS を超えてずれていたら取り直します（スコアなど datetime.now() で付ける時刻と揃える）。
+"""
+import time
+from datetime import datetime, timedelta
+
+NS_PER_SECOND = 1_000_000_000
+ANCHOR_TOLERANCE_NS = NS_PER_SECOND   # monotonic から求めた壁時計が、実際とこれ以上ずれたら対応を取り直す
+
+_MONO_ANCHOR_NS = 0
+_EPOCH_ANCHOR_NS = 0
+_WALL_ANCHOR = None
+_EPOCH_OFFSET_NS = 0   # monotonic ナノ秒 → UNIX 時刻のナノ秒 の差
+
+
+def _anchor():
+    """monotonic と壁時計の対応を記録する（壁時計はマイクロ秒に切り捨てて、datetime と UNIX 時刻で同じ瞬間を指すようにする）"""
+    global _MONO_ANCHOR_NS, _EPOCH_ANCHOR_NS, _WALL_ANCHOR, _EPOCH_OFFSET_NS
+    mono = time.monotonic_ns()
+    epoch = time.time_ns() // 1000 * 1000
+    _MONO_ANCHOR_NS, _EPOCH_ANCHOR_NS = mono, epoch
+    _WALL_ANCHOR = datetime.fromtimestamp(epoch / NS_PER_SECOND)
+    _EPOCH_OFFSET_NS = epoch - mono
+
+
+def _resync():
+    """スリープ・時計合わせで壁時計とのずれが大きくなっていたら、対応を取り直す"""
+    drift = time.time_ns() - (time.monotonic_ns() + _EPOCH_OFFSET_NS)
+    if abs(drift) > ANCHOR_TOLERANCE_NS:
+        _anchor()
+
+
+_anchor()
+
+
+def now_ns() -> int:
+    """現在時刻 (monotonic, ナノ秒)"""
+    return time.monotonic_ns()
+
+
+def to_datetime(ts) -> datetime:
+    """monotonic のナノ秒を datetime に変換する（datetime ならそのまま返す）"""
+    if isinstance(ts, datetime):
+        return ts
+    _resync()
+    return _WALL_ANCHOR + timedelta(microseconds=(ts - _MONO_ANCHOR_NS) // 1000)
+
+
+def to_ns(dt: datetime) -> int:
+    """datetime を monotonic のナノ秒に変換する（合成データなどで使う）"""
+    delta = dt - _WALL_ANCHOR
+    return _MONO_ANCHOR_NS + (delta // timedelta(microseconds=1)) * 1000
+
+
+def to_epoch_ns(ts: int) -> int:
+    """monotonic のナノ秒を UNIX 時刻のナノ秒に変換する（ファイルに書き出す時刻用。プロセスをまたいでも意味が変わらない）"""
+    _resync()
+    return ts + _EPOCH_OFFSET_NS
+
+
+def from_epoch_ns(epoch_ns: int) -> int:
+    """UNIX 時刻のナノ秒を（このプロセスの）monotonic のナノ秒に変換する"""
+    return epoch_ns - _EPOCH_OFFSET_NS
@@ -10,6 +10,9 @@ FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 FPS = 30
 
+# プレビュー表示の上限レート (ディスプレイ・detector のレートがこれより低ければそちらに合わせる)
+PREVIEW_MAX_FPS = 30
+
 # --- 集中度判定の閾値 (ロジック班が調整する場所) ---
 # 居眠り判定 (目の開き具合がこれ以下なら閉眼とみなす)
 THRESHOLD_EYE_CLOSED = 0.5 
@@ -22,5 +25,92 @@ THRESHOLD_FACE_PITCH = 0.2
 SCORE_DEDUCT_LOOKING_AWAY = 1  # よそ見の減点/秒
 SCORE_DEDUCT_SLEEPING = 5      # 居眠りの減点/秒
 
+# --- キャリブレーション ---
+# 収集するサンプル数 (200ms 間隔なので 50 で約10秒。メモリは一定なので数分に延ばしてもよい)
+CALIBRATION_REQUIRED_SAMPLES = 50
+# 角度の振れ幅に使うパーセンタイル (外れ値の1フレームで閾値が跳ね上がらないよう、最大/最小ではなくこれを使う)
+CALIBRATION_LOW_PERCENTILE = 5
+CALIBRATION_HIGH_PERCENTILE = 95
+# この件数までは全サンプルを持って正確なパーセンタイルを使う (P² の推定は数百件を超えるまで外れ値に引っ張られるため)
+CALIBRATION_EXACT_SAMPLES = 1000
+# 保存済みの閾値のずれ検知 (通常記録中のデータの中央値が基準からずれたら再キャリブレーションする)
+CALIBRATION_DRIFT_WINDOW_SAMPLES = 1500  # 判定1回分のサンプル数 (200ms 間隔で約5分)
+CALIBRATION_DRIFT_RATIO = 0.5            # 中央値のずれが閾値の幅のこの割合を超えたら「ずれ」
+CALIBRATION_DRIFT_WINDOWS = 2            # 「ずれ」がこの回数続いたら再キャリブレーション
+
+# --- 区間（エピソード）の記録 ---
+# これ以上の秒数続いた居眠り・不在・よそ見を1回として記録する
+EPISODE_MIN_SECONDS = {
+    "sleeping": 3,
+    "absent": 2,        # 離席率の集計と同じく、単発1秒の不在は数えない
+    "looking_away": 3,
+}
+
+# --- 即時アラート (1分ごとのスコアを待たずに知らせる) ---
+ALERT_SLEEP_SECONDS = 3.0       # 閉眼がこの秒数続いたら居眠りアラート
+ALERT_ABSENT_SECONDS = 5.0      # 顔が映らない状態がこの秒数続いたら不在アラート
+ALERT_CLEAR_SECONDS = 1.0       # 状態がこの秒数解消したらアラートを解除 (瞬間的なゆらぎでは解除・リセットしない)
+ALERT_SOUND_ENABLED = True      # アラート発生時に音を鳴らす
+ALERT_LATENCY_BUDGET_MS = 300   # 撮影から画面表示までの目標時間 (超えたらログに出す)
+
+# --- プロファイリング (FOCUSMONITOR_PROFILE=1 / --profile / Ctrl+Shift+P で開始) ---
+PROFILE_OUTPUT_DIR = "profiles"    # 結果の書き出し先
+PROFILE_WINDOW_SECONDS = 60        # 1回の計測の長さ (秒)
+PROFILE_SNAPSHOT_INTERVAL = 15     # tracemalloc のスナップショット間隔 (秒)
+
+# --- detector を別プロセスで動かす (起動オプション --detector-process でも有効になる) ---
+DETECTOR_PROCESS_ENABLED = False
+DETECTOR_PROCESS_SLOTS = 3                 # フレームを受け渡す共有メモリのスロット数
+DETECTOR_PROCESS_STARTUP_TIMEOUT = 60      # モデル・カメラの準備を待つ最大秒数
+DETECTOR_PROCESS_STALL_SECONDS = 10        # この秒数フレームが届かなければ止まったとみなして再起動
+DETECTOR_PROCESS_RESTART_MAX_DELAY = 30    # 再起動を繰り返す時の最大の待ち時間 (1秒から倍にしていく)
+
+# --- 遅延の計測 (撮影 → プレビュー / main_loop / 保存) ---
+LATENCY_WINDOW_SAMPLES = 2000      # 段階ごとに保持する直近のサンプル数
+LATENCY_REPORT_SECONDS = 300       # この間隔で遅延の一覧をログに出す (0 で出さない。終了時には必ず出す)
+
+# --- CPU 使用率に合わせた負荷の自動調整 (古いノートPCでビデオ会議と同時に使う時など) ---
+GOVERNOR_ENABLED = True
+GOVERNOR_CPU_BUDGET_PERCENT = 40       # このアプリ (別プロセスの detector を含む) の CPU 使用率の上限 (全コアに対する %)
+GOVERNOR_LATENCY_BUDGET_MS = 200       # 撮影 → 解析結果 の p95 がこれを超えても負荷を下げる
+GOVERNOR_INTERVAL_SECONDS = 5          # 使用率を測って段階を見直す間隔
+GOVERNOR_RECOVER_RATIO = 0.6           # 使用率と遅延が上限のこの割合を下回ったら1段階戻す
+GOVERNOR_RECOVER_INTERVALS = 3         # 戻すのは、下回った状態がこの回数続いた時
+# 段階ごとの (解析の fps, 解析に渡す画像の縮小率, プレビューの fps)。0 が最高品質
+# 解析の fps は集計に必要な 5fps (200ms に1フレーム) を下回らないようにし、タイマーの位相ずれの分だけ余裕を持たせる
+GOVERNOR_LEVELS = [
+    (30, 1.0, 30),
+    (20, 1.0, 20),
+    (15, 0.75, 15),
+    (10, 0.5, 10),
+    (8, 0.5, 8),
+]
+
+# --- フレームごとの記録 (閾値・集計方法の見直し用。bench/frame_replay.py で集計し直せる) ---
+FRAME_LOG_ENABLED = False          # detector の出力をフレームごとにファイルへ記録する
+FRAME_LOG_DIR = "frame_logs"       # 記録先 (1時間ごとにファイルを分ける)
+FRAME_LOG_LANDMARKS = False        # ランドマークも記録する (1フレーム約 5.7KB, 30fps で1時間約 600MB)
+FRAME_LOG_ROTATE_SECONDS = 3600    # ファイルを分ける間隔 (秒)
+FRAME_LOG_FLUSH_RECORDS = 64       # この件数ごとにまとめて書き込む
+
+# --- カメラ映像の記録 (起動オプション --record-session。bench/session_replay.py で detector を流し直せる) ---
+SESSION_DIR = "sessions"           # 記録先 (記録ごとに開始時刻のフォルダを作る)
+SESSION_VIDEO_FOURCC = "MJPG"      # 映像の圧縮形式 (フレームごとの JPEG。OpenCV の標準ビルドで読み書きできる)
+SESSION_VIDEO_FPS = 30             # 動画ファイルに書く名目の fps (実際の撮影時刻は sensing の記録に残す)
+
+# ランドマーク重畳表示のレベル ("none" / "keypoints" / "mesh")
+LANDMARK_OVERLAY_LEVEL = "mesh"
+
 # UIの履歴表示数
-HISTORY_DISPLAY_COUNT = 60  # 最新60件を表示
\ No newline at end of file
+HISTORY_DISPLAY_COUNT = 60  # 履歴画面で1回に読み込む件数 (スクロールすると次の60件を読み込む)
+HISTORY_MAX_PAGES = 10      # 履歴画面でメモリに持つ最大ページ数 (超えたら表示位置から遠いページを捨て、戻った時に読み直す)
+# --- 収集サーバー (チーム全体の集計用。サーバーは python -m server.collector で起動) ---
+COLLECTOR_URL = None               # 送信先 (例: "http://192.168.0.10:8765")。None なら送らない
+COLLECTOR_CLIENT_ID = None         # このクライアントの名前。None ならホスト名
+COLLECTOR_HOST = "127.0.0.1"       # サーバーが待ち受けるアドレス
+COLLECTOR_PORT = 8765
+COLLECTOR_DATA_DIR = "collector_data"       # サーバーの保存先
+COLLECTOR_MAX_BODY_BYTES = 8 * 1024 * 1024  # 1回の送信で受け付ける最大サイズ
+UPLOAD_BATCH_ROWS = 500            # 1回に送る最大の行数 (種類ごと)
+UPLOAD_INTERVAL_SECONDS = 10       # 未送信の行を確かめる間隔
+UPLOAD_RETRY_MAX_SECONDS = 300     # 送れなかった時に待つ最大の秒数 (5秒から倍にしていく)
@@ -1,2 +1,2 @@
 # core パッケージ（AI・計算ロジック）
-__all__ = ["camera", "detector", "calculator"]
+__all__ = ["camera", "detector", "calculator", "calibration", "score_stats", "startup", "streaming_stats", "episodes", "alerts", "aggregator", "profiler", "frame_log", "session", "detector_process", "latency", "governor"]
@@ -0,0 +1,134 @@
+"""フレームごとの SensingData を 1秒 / 1分 の単位に集計する処理
+
+もともと MainApp の process_one_second / process_one_minute にあった処理を、
+Qt に依存しない形で切り出したものです。MainApp もベンチマーク (bench/) も同じこのクラスを使います。
+
+- 5フレーム (200ms 間隔で1秒) ごとに OneSecData を作って TOPIC_ONE_SEC に発行
+- 60秒ごとに Calculator でスコアを計算して TOPIC_SCORE に発行
+
+発行した時点で購読者（DB 保存など）の処理は終わっているので、発行後に
+「その秒・分の最初のフレームの撮影から保存まで」の遅延を core.latency に記録する。
+"""
+from datetime import datetime
+
+from common.timeutil import now_ns
+from common.data_struct import SensingData, ScoreData, OneSecData, CalibrationData
+from common.event_bus import TOPIC_ONE_SEC, TOPIC_SCORE
+from core.latency import TRACER, STAGE_DETAIL_SAVED, STAGE_SCORE_PROCESSING, STAGE_SCORE_SAVED
+
+FRAMES_PER_SECOND = 5     # 1秒分とみなすフレーム数
+SECONDS_PER_MINUTE = 60   # 1分分とみなす秒数
+
+
+class Aggregator:
+    """
+    bus: 集計結果の発行先 (EventBus)
+    calculator: スコア計算 (core.calculator.Calculator)
+    calibration_data: 判定に使う閾値。差し替える時は属性に代入する
+    clock: OneSecData の時刻 (monotonic ナノ秒) を返す関数（ベンチマークなどで実時間以外を使う時に差し替える）
+    """
+
+    def __init__(self, bus, calculator, calibration_data: CalibrationData, clock=now_ns):
+        self.bus = bus
+        self.calculator = calculator
+        self.calibration_data = calibration_data
+        self.clock = clock
+
+        # --- データバッファリング用変数 ---
+        self.sec_buffer = []  # 1秒分のデータ (最大5個)
+        self.min_buffer = []  # 1分分のデータ (最大60個)
+        self.nose_5sec_buffer_x = []    # 鼻の座標xの5秒分のデータ
+        self.nose_5sec_buffer_y = []    # 鼻の座標yの5秒分のデータ
+        self.nose_data_buffer = 0.0     # 5秒に1回更新される鼻の座標の標準偏差
+        # 遅延の計測用: 今の秒・分で最初のフレームと、最後のフレームの撮影時刻 (0 は不明)
+        self._second_captured_at = 0.0
+        self._minute_captured_at = 0.0
+        self._last_captured_at = 0.0
+
+        # --- スコアデータ初期値 ---
+        self.score_data = ScoreData(
+            timestamp = datetime.now(),
+            concentration_score = 0,
+            reaving_ratio = 0,
+        )
+
+    def add(self, raw_data: SensingData):
+        """1フレーム追加する。1秒分たまったら集計して発行する"""
+        self.sec_buffer.append(raw_data)
+        if raw_data.captured_at:
+            if not self._second_captured_at:
+                self._second_captured_at = raw_data.captured_at
+            if not self._minute_captured_at:
+                self._minute_captured_at = raw_data.captured_at
+            self._last_captured_at = raw_data.captured_at
+
+        # 1秒経過判定 (データが5個溜まったら処理)
+        if len(self.sec_buffer) >= FRAMES_PER_SECOND:
+            self.process_one_second()
+            self.sec_buffer.clear() # バッファをリセット
+
+    def summarize_second(self, data_list) -> OneSecData:
+        """1秒分のフレームから OneSecData を作る"""
+        calib = self.calibration_data
+
+        # A. 目線が画面外にあったフレーム数
+        looking_away_cnt = sum(1 for d in data_list if d.face_detected
+                               and (d.gaze_angle_yaw > calib.gaze_angle_yaw_threshold
+                               or d.gaze_angle_yaw < -calib.gaze_angle_yaw_threshold
+                               or d.gaze_angle_pitch > calib.gaze_angle_pitch_threshold
+                               or d.gaze_angle_pitch < -calib.gaze_angle_pitch_threshold))
+
+        # B. 目を閉じているフレーム数
+        sleeping_cnt = sum(1 for d in data_list if d.face_detected and d.eye_closedness > calib.eye_closedness_threshold)
+
+        # C. 顔認識できなかったフレーム数
+        no_face_cnt = sum(1 for d in data_list if not d.face_detected)
+
+        # D. 5秒間の鼻の座標の標準偏差(顔が見えているフレームだけで計算)
+        self.nose_5sec_buffer_x += [d.nose_x for d in data_list if d.face_detected]    # x座標バッファに追加
+        self.nose_5sec_buffer_y += [d.nose_y for d in data_list if d.face_detected]    # y座標バッファに追加
+
+        if((len(self.min_buffer)+1) % 5 == 0):      # 5秒分のバッファがたまったとき
+            if len(self.nose_5sec_buffer_x) >= 5:   # データの数が5個以上のとき
+                # 動きの激しさを計算 (ここでは顔の向きのブレを標準偏差とする例)
+                self.nose_5sec_buffer_x.clear()
+                self.nose_5sec_buffer_y.clear()
+            else:
+                self.nose_data_buffer = 0.0
+
+        # DB保存用データ構造
+        return OneSecData(
+            timestamp = self.clock(),
+            looking_away_count = looking_away_cnt,      # 目線が画面外にあったフレーム数 (0-5)
+            sleeping_count = sleeping_cnt,              # 目を閉じていたフレーム数 (0-5)
+            no_face_count = no_face_cnt,                # 顔認識できなかったフレーム数 (0-5)
+            nose_coord_std_ave = self.nose_data_buffer, # 鼻の座標の標準偏差の平均 (顔の動きの激しさ)
+        )
+
+    def process_one_second(self):
+        """
+        1秒ごとの処理：データの集約と発行
+        """
+        one_sec_summary = self.summarize_second(self.sec_buffer)
+
+        # DB保存・画面更新は購読者が行う
+        self.bus.publish(TOPIC_ONE_SEC, one_sec_summary)
+        TRACER.record_age(STAGE_DETAIL_SAVED, self._second_captured_at)
+        self._second_captured_at = 0.0
+        self.min_buffer.append(one_sec_summary)
+
+        # 1分経過判定
+        if len(self.min_buffer) >= SECONDS_PER_MINUTE:
+            self.process_one_minute()
+            self.min_buffer.clear()
+            self._minute_captured_at = 0.0
+
+    def process_one_minute(self):
+        """1分ごとの処理：スコア算出と発行"""
+        self.score_data: ScoreData = self.calculator.calculate_score(self.min_buffer)
+        print("1分のスコア：", self.score_data.concentration_score)
+
+        # DBへの保存とダッシュボード画面の更新（購読者に配信）
+        self.bus.publish(TOPIC_SCORE, self.score_data)
+        TRACER.record_age(STAGE_SCORE_PROCESSING, self._last_captured_at)
+        TRACER.record_age(STAGE_SCORE_SAVED, self._minute_captured_at)
@@ -0,0 +1,132 @@
+"""居眠り・不在の即時アラート判定
+
+detector の解析ループから1フレームごとに呼ばれ、状態が一定時間続いたらアラートを発行します。
+1分ごとのスコア計算とは独立しているので、居眠りはスコアの更新を待たずに数秒で通知されます。
+
+- 時間のヒステリシス: 状態が fire_after 秒続いたら発生、clear_after 秒解消したら解除
+  （瞬きや一瞬の誤検出で発生・解除を繰り返さない）
+- 経過時間はフレームの撮影時刻 (time.perf_counter) で測るので、処理レートに依存しない
+"""
+import threading
+import time
+from datetime import datetime
+
+from common.data_struct import SensingData, CalibrationData, AlertData
+from config import ALERT_SLEEP_SECONDS, ALERT_ABSENT_SECONDS, ALERT_CLEAR_SECONDS
+
+# --- アラートの種類 ---
+ALERT_SLEEPING = "sleeping"
+ALERT_ABSENT = "absent"
+ALERT_MESSAGES = {
+    ALERT_SLEEPING: "居眠りしていませんか？",
+    ALERT_ABSENT: "席を離れています",
+}
+
+
+class _RuleState:
+    """1つのルールのヒステリシス状態"""
+
+    def __init__(self, alert_type, fire_after, clear_after):
+        self.alert_type = alert_type
+        self.fire_after = fire_after
+        self.clear_after = clear_after
+        self.reset()
+
+    def reset(self):
+        self.since = None         # 状態が始まった撮影時刻
+        self.false_since = None   # 状態が途切れ始めた撮影時刻
+        self.active = False
+
+    def update(self, condition: bool, t: float):
+        """1フレーム分更新する。発生なら (True, 継続秒)、解除なら (False, 継続秒)、それ以外は None"""
+        if condition:
+            self.false_since = None
+            if self.since is None:
+                self.since = t
+            if not self.active and t - self.since >= self.fire_after:
+                self.active = True
+                return True, t - self.since
+            return None
+
+        if self.since is None:
+            return None
+        if self.false_since is None:
+            self.false_since = t
+        if t - self.false_since < self.clear_after:
+            return None
+        was_active, duration = self.active, self.false_since - self.since
+        self.reset()
+        return (False, duration) if was_active else None
+
+
+class AlertEvaluator:
+    """フレームごとの SensingData からアラートを判定する
+
+    on_alert(AlertData): アラートの発生・解除時に呼ばれる（detector のスレッドで呼ばれる）
+    enabled が False の間（ログイン前・キャリブレーション中）は判定しない。
+    on_frame（detector のスレッド）と set_enabled（GUI スレッド）はロックで排他し、
+    無効にして解除を出した後に発生が届くことはない（on_alert はロックを持ったまま呼ぶので、ここに戻ってこないこと）。
+    """
+
+    def __init__(self, calibration_data: CalibrationData, on_alert,
+                 sleep_seconds: float = ALERT_SLEEP_SECONDS,
+                 absent_seconds: float = ALERT_ABSENT_SECONDS,
+                 clear_seconds: float = ALERT_CLEAR_SECONDS):
+        self.calibration_data = calibration_data
+        self.on_alert = on_alert
+        self.user_id = None
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.rules = {
+            ALERT_SLEEPING: _RuleState(ALERT_SLEEPING, sleep_seconds, clear_seconds),
+            ALERT_ABSENT: _RuleState(ALERT_ABSENT, absent_seconds, clear_seconds),
+        }
+
+    def set_calibration(self, calibration_data: CalibrationData):
+        """閾値を差し替える（GUI スレッドから呼んでよい。参照の差し替えだけ）"""
+        self.calibration_data = calibration_data
+
+    def set_enabled(self, enabled: bool):
+        """判定の有効・無効を切り替える。無効にした時は続いている状態を捨てる（発生中のアラートは解除を出す）"""
+        with self._lock:
+            if not enabled:
+                now = time.perf_counter()
+                for alert_type, rule in self.rules.items():
+                    if rule.active:
+                        # 画面のバナーと alert_logs の発生に対応する解除を残す（フレームによる解除ではないので撮影時刻はなし）
+                        self.on_alert(AlertData(
+                            alert_type=alert_type,
+                            timestamp=datetime.now(),
+                            active=False,
+                            duration_seconds=now - rule.since,
+                            latency_ms=0.0,
+                            captured_at=0.0,
+                            user_id=self.user_id,
+                        ))
+                    rule.reset()
+            self.enabled = enabled
+
+    def on_frame(self, data: SensingData, captured_at: float):
+        """detector の listener: 1フレーム解析するたびに呼ばれる"""
+        with self._lock:
+            if not self.enabled:
+                return
+            conditions = {
+                ALERT_SLEEPING: data.face_detected
+                                and data.eye_closedness > self.calibration_data.eye_closedness_threshold,
+                ALERT_ABSENT: not data.face_detected,
+            }
+            for alert_type, rule in self.rules.items():
+                change = rule.update(conditions[alert_type], captured_at)
+                if change is None:
+                    continue
+                active, duration = change
+                self.on_alert(AlertData(
+                    alert_type=alert_type,
+                    timestamp=datetime.now(),
+                    active=active,
+                    duration_seconds=duration,
+                    latency_ms=(time.perf_counter() - captured_at) * 1000,
+                    captured_at=captured_at,
+                    user_id=self.user_id,
+                ))
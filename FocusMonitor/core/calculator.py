@@ -4,14 +4,28 @@
 """
 from common.data_struct import ScoreData
 from datetime import datetime
+import numpy as np
 import config
 
-class Calculator:
-    def __init__(self):
+# calculate_scores_batch に渡す配列の最後の軸の並び (OneSecData のフィールド順)
+ONE_SEC_FIELDS = ("looking_away_count", "sleeping_count", "no_face_count", "nose_coord_std_ave")
 
 
+class Calculator:
+    # 閾値・パラメータ（必要に応じて調整）
+    LOOKING_AWAY_FRAME_THRESH = 3      # 1秒あたりのフレーム中、これ以上ならその秒を「よそ見」とみなす
+    SLEEPING_FRAME_THRESH = 3          # 1秒あたりのフレーム中、これ以上ならその秒を「閉眼」とみなす
+    MIN_LOOKING_AWAY_SECONDS = 10      # この秒数を超えたら減点開始
+    MIN_SLEEPING_CONSECUTIVE = 10      # 連続秒数がこれを超えたら減点開始
+    NOSE_STD_THRESHOLD = 0.015         # 鼻の座標std平均の閾値（不安定判定）
+    NOSE_STD_WINDOW = 5                # 不安定判定のウィンドウ秒数
+    UNSTABLE_DEDUCT_PER_SEC = 1        # 不安定の減点／秒
+    # 離席率集計時に、no_face_count==5 が何秒以上連続した場合にカウントするか
+    MIN_CONSECUTIVE_ABSENT_SECONDS_FOR_COUNT = 2
 
-        pass
+    def __init__(self, clock=datetime.now):
+        # ScoreData の時刻 (datetime) を返す関数（ベンチマークなどで実時間以外を使う時に差し替える）
+        self.clock = clock
 
     def calculate_score(self, data) -> ScoreData:
         """
@@ -29,20 +43,19 @@ class Calculator:
         """
         # early exit
         if not data:
-            return ScoreData(timestamp=datetime.now(), concentration_score=100, reaving_ratio=0)
+            return ScoreData(timestamp=self.clock(), concentration_score=100, reaving_ratio=0)
 
         total_seconds = len(data)
         baseline = 100
 
-        # ローカル閾値・パラメータ（必要に応じて調整）
-        LOOKING_AWAY_FRAME_THRESH = 3      # 1秒あたりのフレーム中、これ以上ならその秒を「よそ見」とみなす
-        SLEEPING_FRAME_THRESH = 3          # 1秒あたりのフレーム中、これ以上ならその秒を「閉眼」とみなす
-        MIN_LOOKING_AWAY_SECONDS = 10      # この秒数を超えたら減点開始
-        MIN_SLEEPING_CONSECUTIVE = 10      # 連続秒数がこれを超えたら減点開始
-        NOSE_STD_THRESHOLD = 0.015         # 鼻の座標std平均の閾値（不安定判定）
-        UNSTABLE_DEDUCT_PER_SEC = 1        # 不安定の減点／秒（ローカル定数）
-        # 離席率集計時に、no_face_count==5 が何秒以上連続した場合にカウントするか
-        MIN_CONSECUTIVE_ABSENT_SECONDS_FOR_COUNT = 2
+        # 閾値・パラメータ（クラス定数。calculate_scores_batch と共通）
+        LOOKING_AWAY_FRAME_THRESH = self.LOOKING_AWAY_FRAME_THRESH
+        SLEEPING_FRAME_THRESH = self.SLEEPING_FRAME_THRESH
+        MIN_LOOKING_AWAY_SECONDS = self.MIN_LOOKING_AWAY_SECONDS
+        MIN_SLEEPING_CONSECUTIVE = self.MIN_SLEEPING_CONSECUTIVE
+        NOSE_STD_THRESHOLD = self.NOSE_STD_THRESHOLD
+        UNSTABLE_DEDUCT_PER_SEC = self.UNSTABLE_DEDUCT_PER_SEC
+        MIN_CONSECUTIVE_ABSENT_SECONDS_FOR_COUNT = self.MIN_CONSECUTIVE_ABSENT_SECONDS_FOR_COUNT
 
         # 1 よそ見秒数（閾値以上のフレームがあった秒を1秒としてカウント）
         looking_away_seconds = sum(1 for s in data if getattr(s, 'looking_away_count', 0) >= LOOKING_AWAY_FRAME_THRESH)
@@ -65,11 +78,12 @@ class Calculator:
 
         # 3 不安定（5秒ウィンドウの平均stdで判定）
         unstable_flags = [False] * total_seconds
-        for i in range(0, max(0, total_seconds - 4)):
-            window = data[i:i+5]
-            avg_std = sum(getattr(w, 'nose_coord_std_ave', 0.0) for w in window) / 5.0
+        win = self.NOSE_STD_WINDOW
+        for i in range(0, max(0, total_seconds - (win - 1))):
+            window = data[i:i+win]
+            avg_std = sum(getattr(w, 'nose_coord_std_ave', 0.0) for w in window) / float(win)
             if avg_std > NOSE_STD_THRESHOLD:
-                for j in range(i, i+5):
+                for j in range(i, i+win):
                     unstable_flags[j] = True
         unstable_seconds = sum(1 for f in unstable_flags if f)
         unstable_deduction = unstable_seconds * UNSTABLE_DEDUCT_PER_SEC
@@ -101,11 +115,104 @@ class Calculator:
         score = max(0, min(100, int(round(score))))
 
         return ScoreData(
-            timestamp=datetime.now(),
+            timestamp=self.clock(),
             concentration_score=score,
             reaving_ratio=reaving_ratio
         )
 
+    # --- まとめて計算（サーバー側の再計算など） ---
+
+    def calculate_scores_batch(self, data, seconds_per_minute: int = 60):
+        """
+        多数の「1分」のスコアと離席率をまとめて計算する（calculate_score と同じ結果になる）
+
+        data: 次のどちらか
+          - (分数, 秒数, 4) の NumPy 配列。最後の軸は ONE_SEC_FIELDS の順
+          - (行数, 4) の配列やタプルのリストを順に返すイテラブル（DBManager.iter_detail_rows など）。
+            行を先頭から seconds_per_minute 行ずつ区切って1分とみなす（MainApp と同じ区切り方）。
+            最後の端数も短い1分として計算する
+        戻り値: (scores, reaving_ratios) いずれも長さ=分数の int 配列
+        """
+        if isinstance(data, np.ndarray):
+            return self._score_minutes(data)
+
+        scores, ratios = [], []
+        pending = np.empty((0, len(ONE_SEC_FIELDS)), dtype=np.float64)
+        for chunk in data:
+            chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, len(ONE_SEC_FIELDS))
+            pending = np.concatenate([pending, chunk]) if len(pending) else chunk
+            n_full = len(pending) // seconds_per_minute
+            if n_full:
+                full = pending[:n_full * seconds_per_minute].reshape(n_full, seconds_per_minute, -1)
+                s, r = self._score_minutes(full)
+                scores.append(s)
+                ratios.append(r)
+                pending = pending[n_full * seconds_per_minute:]
+        if len(pending):
+            s, r = self._score_minutes(pending[None])
+            scores.append(s)
+            ratios.append(r)
+
+        if not scores:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(scores), np.concatenate(ratios)
+
+    def _score_minutes(self, minutes):
+        """(分数, 秒数, 4) の配列を Python のループなしで一括計算する"""
+        minutes = np.asarray(minutes, dtype=np.float64)
+        n_minutes, total_seconds = minutes.shape[:2]
+        if total_seconds == 0:
+            return np.full(n_minutes, 100, dtype=np.int64), np.zeros(n_minutes, dtype=np.int64)
+
+        looking_away = minutes[..., 0]
+        sleeping = minutes[..., 1]
+        no_face = minutes[..., 2]
+        nose_std = minutes[..., 3]
+        baseline = 100
+
+        # 1 よそ見秒数
+        looking_away_seconds = (looking_away >= self.LOOKING_AWAY_FRAME_THRESH).sum(axis=1)
+        looking_away_deduction = (np.maximum(looking_away_seconds - self.MIN_LOOKING_AWAY_SECONDS, 0)
+                                  * getattr(config, 'SCORE_DEDUCT_LOOKING_AWAY', 1))
+
+        # 2 居眠り（各秒の「そこまでの連続秒数」を求め、10秒を超えた秒を数える）
+        sleeping_flags = sleeping >= self.SLEEPING_FRAME_THRESH
+        sleeping_consec = _run_length_so_far(sleeping_flags)
+        extra_sleep_seconds = (sleeping_consec > self.MIN_SLEEPING_CONSECUTIVE).sum(axis=1)
+        sleeping_deduction = extra_sleep_seconds * getattr(config, 'SCORE_DEDUCT_SLEEPING', 5)
+
+        # 3 不安定（5秒の箱型フィルタで移動平均 → 閾値超えのウィンドウに含まれる秒を不安定とする）
+        w = self.NOSE_STD_WINDOW
+        n_windows = total_seconds - w + 1
+        if n_windows > 0:
+            # calculate_score と同じ順で足して、閾値ちょうど付近でも結果が一致するようにする
+            window_sum = np.zeros((n_minutes, n_windows))
+            for k in range(w):
+                window_sum = window_sum + nose_std[:, k:k + n_windows]
+            unstable_windows = (window_sum / float(w)) > self.NOSE_STD_THRESHOLD
+            # ウィンドウ開始位置のフラグを、ウィンドウ内の w 秒に広げる
+            padded = np.pad(unstable_windows, ((0, 0), (w - 1, w - 1)))
+            unstable_flags = np.zeros((n_minutes, total_seconds), dtype=bool)
+            for k in range(w):
+                unstable_flags |= padded[:, k:k + total_seconds]
+            unstable_seconds = unstable_flags.sum(axis=1)
+        else:
+            unstable_seconds = np.zeros(n_minutes, dtype=np.int64)
+        unstable_deduction = unstable_seconds * self.UNSTABLE_DEDUCT_PER_SEC
+
+        # 4 不在（連続した長さが規定以上の不在だけ数える）
+        absent_flags = no_face >= 5
+        run_total = (_run_length_so_far(absent_flags)
+                     + _run_length_so_far(absent_flags[:, ::-1])[:, ::-1] - 1)
+        counted_absent_seconds = (absent_flags & (run_total >= self.MIN_CONSECUTIVE_ABSENT_SECONDS_FOR_COUNT)).sum(axis=1)
+
+        reaving_ratio = np.round((counted_absent_seconds / total_seconds) * 100).astype(np.int64)
+        absent_deduction = np.round(baseline * (reaving_ratio / 100.0)).astype(np.int64)
+
+        score = baseline - absent_deduction - looking_away_deduction - sleeping_deduction - unstable_deduction
+        score = np.clip(np.round(score), 0, 100).astype(np.int64)
+        return score, reaving_ratio
+
 ### 以下は例
     def calculate(self, one_minute_data: list) -> ScoreData:
         """
@@ -123,7 +230,7 @@ class Calculator:
             current_score -= 10
 
         return ScoreData(
-            timestamp=datetime.now(),
+            timestamp=self.clock(),
             concentration_score=max(0, current_score), # 0未満にはしない
             message="集中できています" if current_score > 80 else "休憩しましょう"
         )
@@ -150,3 +257,11 @@ class Calculator:
     #         dist = ((gx - 0.5) ** 2 + (gy - 0.5) ** 2) ** 0.5
     #         score += max(0.0, 0.4 * (1.0 - dist))
     #     return max(0.0, min(1.0, score))
+
+
+def _run_length_so_far(flags):
+    """(分数, 秒数) の bool 配列で、各秒までの True の連続数を返す（False の秒は 0）"""
+    n_seconds = flags.shape[1]
+    idx = np.arange(n_seconds)
+    last_false = np.maximum.accumulate(np.where(flags, -1, idx), axis=1)
+    return np.where(flags, idx - last_false, 0)
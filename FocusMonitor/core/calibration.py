@@ -1,14 +1,80 @@
 import numpy as np
+
 from common.data_struct import CalibrationData, SensingData
+from core.streaming_stats import RunningStats, P2Quantile
+from config import (CALIBRATION_REQUIRED_SAMPLES, CALIBRATION_LOW_PERCENTILE,
+                    CALIBRATION_HIGH_PERCENTILE, CALIBRATION_EXACT_SAMPLES, CALIBRATION_DRIFT_WINDOW_SAMPLES,
+                    CALIBRATION_DRIFT_RATIO, CALIBRATION_DRIFT_WINDOWS)
+
+
+class _FeatureStats:
+    """1つの特徴量の統計（平均・分散と 下位/中央/上位 パーセンタイル）を固定メモリで持つ
+
+    exact_samples 件までは値を配列に持ち、パーセンタイルは np.percentile で正確に求める
+    （件数が少ない間の P² の推定は、外れ値の1フレームで大きくずれるため）。
+    それを超えたら P² の推定値を使う。
+    """
+
+    def __init__(self, low_percentile, high_percentile, exact_samples: int = CALIBRATION_EXACT_SAMPLES):
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.stats = RunningStats()
+        self.low = P2Quantile(low_percentile / 100)
+        self.median = P2Quantile(0.5)
+        self.high = P2Quantile(high_percentile / 100)
+        self._samples = np.empty(exact_samples, dtype=np.float64)
+
+    def add(self, x: float):
+        if self.stats.count < len(self._samples):
+            self._samples[self.stats.count] = x
+        self.stats.add(x)
+        self.low.add(x)
+        self.median.add(x)
+        self.high.add(x)
+
+    def _quantiles(self):
+        """(下位, 中央, 上位) パーセンタイル"""
+        if self.stats.count <= len(self._samples):
+            return tuple(float(v) for v in np.percentile(
+                self._samples[:self.stats.count], [self.low_percentile, 50, self.high_percentile]))
+        return self.low.value(), self.median.value(), self.high.value()
+
+    @property
+    def center(self) -> float:
+        """中央値"""
+        return self._quantiles()[1]
+
+    @property
+    def spread(self) -> float:
+        """下位〜上位パーセンタイルの幅"""
+        low, _, high = self._quantiles()
+        return high - low
+
 
 class Calibration:
-    def __init__(self):
-        self.collected_data = [] # データ保存用リスト
-        self.required_samples = 50
+    """キャリブレーション（平常時の目・顔向きのばらつきから閾値を決める）
+
+    パーセンタイルは CALIBRATION_EXACT_SAMPLES 件までは正確に求め、それを超えた分はストリーミング推定器で
+    逐次更新するので、required_samples を数分に延ばしてもメモリは一定。
+    """
+
+    def __init__(self, required_samples: int = CALIBRATION_REQUIRED_SAMPLES,
+                 low_percentile: float = CALIBRATION_LOW_PERCENTILE,
+                 high_percentile: float = CALIBRATION_HIGH_PERCENTILE):
+        self.required_samples = required_samples
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self._reset()
+
+    def _reset(self):
+        self.sample_count = 0
+        self.eye = _FeatureStats(self.low_percentile, self.high_percentile)
+        self.yaw = _FeatureStats(self.low_percentile, self.high_percentile)
+        self.pitch = _FeatureStats(self.low_percentile, self.high_percentile)
 
     def start(self):
         """キャリブレーション開始前の初期化"""
-        self.collected_data = []
+        self._reset()
         print("キャリブレーションを開始します")
 
     def add_data(self, sensing_data: SensingData) -> bool:
@@ -17,43 +83,99 @@ class Calibration:
         戻り値: 完了したら True, まだなら False
         """
         if sensing_data.face_detected:
-            self.collected_data.append(sensing_data)
+            self.eye.add(sensing_data.eye_closedness)
+            self.yaw.add(sensing_data.gaze_angle_yaw)
+            self.pitch.add(sensing_data.gaze_angle_pitch)
+            self.sample_count += 1
+
+            print(f"Calib progress: {self.sample_count}/{self.required_samples}")
 
-            print(f"Calib progress: {len(self.collected_data)}/{self.required_samples}")
-        
         # データが溜まったかチェック
-        return len(self.collected_data) >= self.required_samples
+        return self.sample_count >= self.required_samples
 
     def calculate(self) -> CalibrationData:
-        """溜まったデータから計算を行う"""
-        if not self.collected_data:
+        """これまでのデータから閾値を計算する（途中でも呼べる）"""
+        if self.sample_count == 0:
             return None # データがない場合
 
-        # 目の閉じ具合
-        # ※ eye_closedness が SensingData にある前提
-        eye_vals = [d.eye_closedness for d in self.collected_data]
-        eye_closedness_ave = np.mean(eye_vals)
-
-        # 視線角度 (Yaw/Pitch)
-        yaw_vals = [d.gaze_angle_yaw for d in self.collected_data]
-        pitch_vals = [d.gaze_angle_pitch for d in self.collected_data]
-
-        yaw_max = np.max(yaw_vals)
-        yaw_min = np.min(yaw_vals)
-        pitch_max = np.max(pitch_vals)
-        pitch_min = np.min(pitch_vals)
-
-        # 閾値計算
-        # 目の閾値: 平均値と「完全に閉じた状態(1.0)」の中間など、ロジックに合わせて調整
-        # ここでは前のコードのロジックを踏襲
-        eye_th = eye_closedness_ave + (1.0 - eye_closedness_ave) / 3
-        
-        # 角度の閾値: 最大と最小の振れ幅の半分
-        yaw_th = (yaw_max - yaw_min) / 2
-        pitch_th = (pitch_max - pitch_min) / 2
+        # 目の閾値: 平常時の中央値と「完全に閉じた状態(1.0)」の間の 1/3 の位置
+        # （前のコードは平均値だったが、瞬きなどに引っ張られないよう中央値を使う）
+        eye_center = self.eye.center
+        eye_th = eye_center + (1.0 - eye_center) / 3
+
+        # 角度の閾値: 下位〜上位パーセンタイルの振れ幅の半分
+        yaw_th = self.yaw.spread / 2
+        pitch_th = self.pitch.spread / 2
 
         return CalibrationData(
             eye_closedness_threshold=eye_th,
             gaze_angle_yaw_threshold=yaw_th,
-            gaze_angle_pitch_threshold=pitch_th
-        )
\ No newline at end of file
+            gaze_angle_pitch_threshold=pitch_th,
+            eye_closedness_center=eye_center,
+            gaze_angle_yaw_center=self.yaw.center,
+            gaze_angle_pitch_center=self.pitch.center,
+        )
+
+
+class DriftMonitor:
+    """保存済みの閾値が今の環境に合っているかを、通常記録中のデータで確かめる
+
+    window_samples 件ごとに目・顔向きの中央値を推定し、キャリブレーション時の中央値
+    (CalibrationData の *_center) からのずれが閾値の幅の drift_ratio 倍を超えたら「ずれ」とする。
+    「ずれ」が drift_windows 回続いたら add_data が True を返す（再キャリブレーションの合図）。
+    よそ見や居眠りは一時的なので中央値はほとんど動かず、カメラ位置や姿勢が変わった時だけ反応する。
+    """
+
+    def __init__(self, calibration_data: CalibrationData,
+                 window_samples: int = CALIBRATION_DRIFT_WINDOW_SAMPLES,
+                 drift_ratio: float = CALIBRATION_DRIFT_RATIO,
+                 drift_windows: int = CALIBRATION_DRIFT_WINDOWS):
+        self.window_samples = window_samples
+        self.drift_ratio = drift_ratio
+        self.drift_windows = drift_windows
+        self.reset(calibration_data)
+
+    def reset(self, calibration_data: CalibrationData):
+        """基準の閾値を差し替えて判定をやり直す"""
+        self.calibration_data = calibration_data
+        self.drift_count = 0
+        self._start_window()
+
+    def _start_window(self):
+        self.window_count = 0
+        self.face_count = 0
+        self.eye = P2Quantile(0.5)
+        self.yaw = P2Quantile(0.5)
+        self.pitch = P2Quantile(0.5)
+
+    def add_data(self, sensing_data: SensingData) -> bool:
+        """データを1つ追加する。再キャリブレーションが必要なら True"""
+        self.window_count += 1
+        if sensing_data.face_detected:
+            self.face_count += 1
+            self.eye.add(sensing_data.eye_closedness)
+            self.yaw.add(sensing_data.gaze_angle_yaw)
+            self.pitch.add(sensing_data.gaze_angle_pitch)
+
+        if self.window_count < self.window_samples:
+            return False
+
+        # 顔が映っていた時間が短い区間は判定しない
+        if self.face_count >= self.window_samples // 2:
+            if self._is_drifted():
+                self.drift_count += 1
+                print(f"DriftMonitor: 閾値のずれを検知しました ({self.drift_count}/{self.drift_windows})")
+            else:
+                self.drift_count = 0
+        self._start_window()
+        return self.drift_count >= self.drift_windows
+
+    def _is_drifted(self) -> bool:
+        c = self.calibration_data
+        checks = [
+            (self.eye.value(), c.eye_closedness_center, c.eye_closedness_threshold - c.eye_closedness_center),
+            (self.yaw.value(), c.gaze_angle_yaw_center, c.gaze_angle_yaw_threshold),
+            (self.pitch.value(), c.gaze_angle_pitch_center, c.gaze_angle_pitch_threshold),
+        ]
+        return any(abs(median - center) > self.drift_ratio * abs(width)
+                   for median, center, width in checks if width)
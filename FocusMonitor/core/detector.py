@@ -6,20 +6,45 @@
 import time
 import cv2
 import mediapipe as mp
+import numpy as np
 import threading
-from datetime import datetime
 
 # 自作モジュールのインポート
 from common.data_struct import SensingData
+from common.timeutil import now_ns
 from config import CAMERA_ID, FRAME_WIDTH, FRAME_HEIGHT
+from core.profiler import tick as profiler_tick
+from core.session import SessionRecorder
+from core.latency import TRACER, STAGE_INFERENCE
+
+MAX_LANDMARKS = 478       # FaceLandmarker の点数 (虹彩を含む)
+LANDMARK_RING_SIZE = 3    # ランドマーク用バッファの数（公開した配列は、この数-1 フレーム後までは書き換えない）
+
 
 class FaceDetector:
-    def __init__(self):
+    """
+    open_camera: False ならカメラを開かない（記録した映像を analyze_frame に渡して使う時）
+    """
+
+    def __init__(self, open_camera: bool = True):
         self.running = False
-        self.latest_data = SensingData(timestamp=datetime.now())
+        self.latest_data = SensingData(timestamp=now_ns())
         self.latest_frame = None  # 最新フレーム（表示用）
-        self.latest_landmarks = None  # 最新ランドマーク（表示用）
+        self.frame_seq = 0  # 最新フレームの通し番号（表示側の再描画判定用）
+        self.frame_trace = (0, 0.0)  # (通し番号, 撮影時刻) 表示したフレームの古さの計測用
+        self.fps = 0.0  # 実測の処理レート（指数移動平均）
+        self._last_frame_time = None
+        self.latest_landmarks = None  # 最新ランドマーク（表示用, (N,3) float32 の正規化座標）
+        # ランドマークはフレームごとに配列を作らず、事前に確保したバッファに順番に書き込む
+        # （表示側が描画中のバッファを上書きしないよう複数持つ）
+        self._landmark_ring = np.zeros((LANDMARK_RING_SIZE, MAX_LANDMARKS, 3), dtype=np.float32)
+        self._landmark_slot = 0
         self.lock = threading.Lock() # データの読み書き衝突防止
+        self._listeners = []  # 1フレーム解析するたびに呼ぶ関数 fn(SensingData, 撮影時刻)
+        # 負荷の調整 (core.governor が set_quality で変える)
+        self.target_fps = None        # 解析の目標 fps。None なら従来どおり毎回 30ms 休む
+        self.input_scale = 1.0        # 解析に渡す画像の縮小率（ランドマークは正規化座標なので結果の単位は変わらない）
+        self.session_recorder = None  # 記録モード中の SessionRecorder
         
         # 視線角度変換の仮パラメータ
         self.EYE_MAX_YAW_DEG = 30.0
@@ -32,9 +57,11 @@ class FaceDetector:
         self._init_mediapipe()
         
         # カメラ設定
-        self.cap = cv2.VideoCapture(CAMERA_ID)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        self.cap = None
+        if open_camera:
+            self.cap = cv2.VideoCapture(CAMERA_ID)
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
 
     def _init_mediapipe(self):
         """MediaPipe Tasks APIの初期化 (IMAGE モード)"""
@@ -47,17 +74,18 @@ class FaceDetector:
             base_options=BaseOptions(model_asset_path='./FocusMonitor/core/face_landmarker.task'),
             running_mode=VisionRunningMode.IMAGE,
             num_faces=1,
-            output_face_blendshapes=True,
-            output_facial_transformation_matrixes=True,
+            output_face_blendshapes=True,               # 目の閉じ具合・視線に使う
+            output_facial_transformation_matrixes=False, # 使っていないので計算させない
         )
         self.landmarker = FaceLandmarker.create_from_options(options)
 
-    def _analyze_result(self, result):
+    def _analyze_result(self, result, captured_at: float = 0.0):
         """AI解析結果を処理 (IMAGE モード用)"""
         if result.face_blendshapes and result.face_landmarks:
             # データの抽出（Blendshapesとlandmarksを利用）
             blendshapes = result.face_blendshapes[0]
-            landmarkers = result.face_landmarks[0]
+            # ランドマークは (N,3) の配列にまとめて持つ（描画側で一括変換するため）
+            landmarkers = self._fill_landmarks(result.face_landmarks[0])
 
             self._last_blendshapes = blendshapes
             
@@ -79,28 +107,72 @@ class FaceDetector:
             gaze_yaw, gaze_pitch = self._calculate_gaze_angle()
 
             # 鼻の座標
-            nose_coord_x, nose_coord_y = landmarkers[4].x, landmarkers[4].y
+            nose_coord_x, nose_coord_y = float(landmarkers[4, 0]), float(landmarkers[4, 1])
 
             # データを更新（排他制御） 
             with self.lock:
                 self.latest_data = SensingData(
-                    timestamp=datetime.now(),
+                    timestamp=now_ns(),
                     face_detected=True,                     # 顔認識の有無
                     eye_closedness = eye_closedness_ave,    # 両目の閉じ具合の平均値 (0.0〜1.0)
                     gaze_angle_yaw = gaze_yaw,              # 視線の横方向角度 (度)
                     gaze_angle_pitch = gaze_pitch,          # 視線の縦方向角度 (度)
                     nose_x = nose_coord_x,                  # 鼻のX座標
                     nose_y = nose_coord_y,                  # 鼻のY座標
+                    captured_at = captured_at,
                 )
         else:
             # 顔が見つからない場合
             with self.lock:
                 self.latest_data = SensingData(
-                    timestamp=datetime.now(),
-                    face_detected=False
+                    timestamp=now_ns(),
+                    face_detected=False,
+                    captured_at=captured_at,
                 )
                 self.latest_landmarks = None
     
+    def analyze_frame(self, frame, captured_at: float = 0.0) -> SensingData:
+        """1フレーム (BGR) を解析して最新データを更新し、その SensingData を返す
+
+        captured_at: 撮影時刻 (time.perf_counter)。SensingData.captured_at に入る
+        """
+        # 画像をAIに渡す (IMAGE モード：同期処理)
+        if self.input_scale < 1.0:
+            frame = cv2.resize(frame, None, fx=self.input_scale, fy=self.input_scale, interpolation=cv2.INTER_AREA)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        result = self.landmarker.detect(mp_image)
+        self._analyze_result(result, captured_at)
+        with self.lock:
+            return self.latest_data
+
+    def set_quality(self, target_fps: float = None, input_scale: float = 1.0):
+        """解析の fps と入力画像の縮小率を変える（どのスレッドから呼んでもよい。次のフレームから反映）"""
+        self.target_fps = target_fps
+        self.input_scale = input_scale
+
+    def start_session_recording(self, directory: str = None) -> str:
+        """記録モードを開始する（撮影したフレームと SensingData を保存する）。記録先のフォルダを返す"""
+        if self.session_recorder is None:
+            self.session_recorder = SessionRecorder(directory) if directory else SessionRecorder()
+        return self.session_recorder.session_dir
+
+    def stop_session_recording(self):
+        recorder, self.session_recorder = self.session_recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def _fill_landmarks(self, landmarks):
+        """MediaPipe のランドマークを次のリングバッファに書き込み、(N,3) のビューを返す
+
+        タプルのリストを経由せず、値を1つずつ float32 の一時配列に詰めてからコピーする。
+        """
+        n = min(len(landmarks), MAX_LANDMARKS)
+        self._landmark_slot = (self._landmark_slot + 1) % LANDMARK_RING_SIZE
+        buf = self._landmark_ring[self._landmark_slot, :n]
+        buf.reshape(-1)[:] = np.fromiter(
+            (v for lm in landmarks[:n] for v in (lm.x, lm.y, lm.z)), dtype=np.float32, count=n * 3)
+        return buf
+
     def _calculate_gaze_angle(self):
         """視線角度の計算（yaw=左右, pitch=上下）
         Blendshapes（eyeLook*）を使って角度に変換して返す。
@@ -142,23 +214,74 @@ class FaceDetector:
         self.thread.start()
 
     def _process_loop(self):
-        while self.running and self.cap.isOpened():
+        while self.running and self.cap is not None and self.cap.isOpened():
+            profiler_tick("detector")
+            loop_start = time.perf_counter()
             success, frame = self.cap.read()
             if not success:
                 time.sleep(0.1)
                 continue
+            captured_at = time.perf_counter()  # 撮影時刻（アラートの遅延計測用）
 
             # フレームをデータと一緒に保存（表示用）
+            # ※ 公開したフレームは書き換えない（表示側がコピーせずに参照するため）
             with self.lock:
                 self.latest_frame = frame.copy()
+                self.frame_seq += 1
+                self.frame_trace = (self.frame_seq, captured_at)
+            self._update_fps()
 
-            # 画像をAIに渡す (IMAGE モード：同期処理)
-            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            result = self.landmarker.detect(mp_image)
-            self._analyze_result(result)
+            data = self.analyze_frame(frame, captured_at)
+            TRACER.record_age(STAGE_INFERENCE, captured_at)
+            # 記録モードなら、解析したフレームと結果を組にして残す
+            recorder = self.session_recorder
+            if recorder is not None:
+                recorder.write(frame, data)
+            self._notify_listeners(captured_at)
             
             # 負荷調整（PCスペックに合わせて調整）
-            time.sleep(0.03) 
+            target_fps = self.target_fps
+            if target_fps:
+                time.sleep(max(0.0, 1.0 / target_fps - (time.perf_counter() - loop_start)))
+            else:
+                time.sleep(0.03)
+
+    def add_listener(self, fn):
+        """1フレーム解析するたびに fn(SensingData, 撮影時刻) を呼ぶ
+
+        fn は detector のスレッドで呼ばれるので、重い処理や GUI の操作はしないこと。
+        撮影時刻は time.perf_counter() の値。
+        """
+        with self.lock:
+            self._listeners = self._listeners + [fn]
+
+    def remove_listener(self, fn):
+        with self.lock:
+            self._listeners = [f for f in self._listeners if f != fn]
+
+    def _notify_listeners(self, captured_at):
+        with self.lock:
+            listeners = self._listeners
+            data = self.latest_data
+        for fn in listeners:
+            try:
+                fn(data, captured_at)
+            except Exception as e:
+                print(f"Detector: listener でエラーが発生しました: {e}")
+
+    def _update_fps(self):
+        """フレーム間隔から処理レートを更新（表示側のレート調整用）"""
+        now = time.perf_counter()
+        if self._last_frame_time is not None:
+            dt = now - self._last_frame_time
+            if dt > 0:
+                inst = 1.0 / dt
+                self.fps = inst if self.fps == 0.0 else self.fps * 0.9 + inst * 0.1
+        self._last_frame_time = now
+
+    def get_fps(self) -> float:
+        """detectorの実測処理レート (fps) を取得するためのメソッド。未計測なら 0.0"""
+        return self.fps
 
     def get_current_data(self) -> SensingData:
         """外部（UIやロジック）から最新データを取得するためのメソッド"""
@@ -170,8 +293,19 @@ class FaceDetector:
         with self.lock:
             return self.latest_frame
     
+    def get_latest_frame_with_seq(self):
+        """最新フレームとその通し番号を同時に取得するためのメソッド
+
+        戻り値: (frame, seq)。表示側は seq が変わった時だけ描画し直せばよい
+        """
+        with self.lock:
+            return self.latest_frame, self.frame_seq
+    
     def get_latest_landmarks(self):
-        """最新ランドマーク（描画用）を取得するためのメソッド"""
+        """最新ランドマーク（描画用）を取得するためのメソッド
+
+        戻り値: (N,3) float32 の正規化座標配列。顔がなければ None
+        """
         with self.lock:
             return self.latest_landmarks
             
@@ -185,7 +319,10 @@ class FaceDetector:
             self.thread.join(timeout=2.0)  # 最大2秒待機
             print("Detector: スレッドの終了を確認しました")
         
+        # 記録モードなら書き切る
+        self.stop_session_recording()
+
         # カメラをリリース
-        if self.cap.isOpened():
+        if self.cap is not None and self.cap.isOpened():
             self.cap.release()
             print("Detector: カメラをリリースしました")
\ No newline at end of file
@@ -0,0 +1,349 @@
+"""FaceDetector を別プロセスで動かす（GUI と1つの GIL を取り合わないように）
+
+同じプロセスでは、_analyze_result や画面側のランドマーク描画などの Python の処理が重なると、
+GUI のカクつきと detector の fps 低下の両方につながります。ProcessDetector は FaceDetector を
+子プロセスで動かし、GUI 側には FaceDetector と同じメソッド (get_current_data / get_latest_frame など) を見せます。
+
+- フレームとランドマーク: multiprocessing.shared_memory のスロット（数個）に子プロセスが順番に書く
+  各スロットの先頭に通し番号を置き、書き込み中は -1 にする。親はコピーの前後で番号を確かめ、
+  途中で上書きされたフレームは捨てる（データは使う）
+- SensingData など: 小さなタプルにして multiprocessing.Queue で送る
+- 負荷の調整 (set_quality) と子プロセスの CPU 時間: multiprocessing.Value / Array で共有する
+- 監視: 子プロセスが落ちた・一定時間何も送ってこない時は、間隔を空けながら（最大 DETECTOR_PROCESS_RESTART_MAX_DELAY 秒）再起動する
+
+時刻 (SensingData.timestamp の monotonic_ns, 撮影時刻の perf_counter) は OS 全体で共通の時計なので、
+子プロセスの値をそのまま使える。
+"""
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from common.data_struct import SensingData
+from common.timeutil import now_ns
+from config import (FRAME_WIDTH, FRAME_HEIGHT, DETECTOR_PROCESS_SLOTS, DETECTOR_PROCESS_STALL_SECONDS,
+                    DETECTOR_PROCESS_STARTUP_TIMEOUT, DETECTOR_PROCESS_RESTART_MAX_DELAY)
+from core.frame_log import LANDMARK_COUNT
+from core.latency import TRACER, STAGE_INFERENCE
+
+# 子プロセスから送るメッセージの種類（タプルの先頭）
+MSG_READY = "ready"     # (MSG_READY,)  モデル・カメラの準備ができた
+MSG_FRAME = "frame"     # (MSG_FRAME, 通し番号, 撮影時刻, ランドマーク数, SensingData の各値...)
+MSG_ERROR = "error"     # (MSG_ERROR, メッセージ)  終了する前に送る
+
+DEFAULT_DETECTOR_CLASS = "core.detector.FaceDetector"
+
+
+def _buffer_size(slots: int, height: int, width: int) -> int:
+    return slots * (8 + LANDMARK_COUNT * 3 * 4 + height * width * 3)
+
+
+def _views(buf, slots: int, height: int, width: int):
+    """共有メモリを (通し番号, ランドマーク, フレーム) の配列として見る"""
+    seqs = np.ndarray((slots,), dtype=np.int64, buffer=buf)
+    offset = seqs.nbytes
+    landmarks = np.ndarray((slots, LANDMARK_COUNT, 3), dtype=np.float32, buffer=buf, offset=offset)
+    offset += landmarks.nbytes
+    frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=buf, offset=offset)
+    return seqs, landmarks, frames
+
+
+def _load_class(path: str):
+    module_name, _, class_name = path.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _child_main(shm_name, slots, height, width, out_queue, stop_event, parent_pid, detector_class,
+                quality, cpu_seconds):
+    """子プロセスの処理: カメラを読んで解析し、結果を共有メモリとキューに書く
+
+    quality: [目標 fps (0 は指定なし), 入力の縮小率]（親が書き換える）
+    cpu_seconds: この子プロセスが使った CPU 時間（子が書き込む）
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    seqs, landmarks_buf, frames = _views(shm.buf, slots, height, width)
+    detector = None
+    try:
+        import cv2
+        detector = _load_class(detector_class)()
+        out_queue.put((MSG_READY,))
+        seq = 0
+        while not stop_event.is_set() and detector.cap is not None and detector.cap.isOpened():
+            # 親プロセスがいなくなったら終わる（カメラを掴んだまま残らないように）
+            if os.getppid() != parent_pid:
+                break
+            loop_start = time.perf_counter()
+            target_fps = quality[0] or None
+            detector.set_quality(target_fps, quality[1])
+            success, frame = detector.cap.read()
+            if not success:
+                time.sleep(0.1)
+                continue
+            captured_at = time.perf_counter()
+            data = detector.analyze_frame(frame, captured_at)
+
+            if frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height))
+            seq += 1
+            slot = seq % slots
+            seqs[slot] = -1          # 書き込み中
+            frames[slot] = frame
+            landmarks = detector.latest_landmarks
+            n = 0
+            if landmarks is not None:
+                n = min(len(landmarks), LANDMARK_COUNT)
+                landmarks_buf[slot, :n] = landmarks[:n]
+            seqs[slot] = seq
+            out_queue.put((MSG_FRAME, seq, captured_at, n, data.timestamp, data.face_detected,
+                           data.eye_closedness, data.gaze_angle_yaw, data.gaze_angle_pitch, data.nose_x, data.nose_y))
+
+            cpu_seconds.value = time.process_time()
+
+            # 負荷調整（FaceDetector のループと同じ）
+            if target_fps:
+                time.sleep(max(0.0, 1.0 / target_fps - (time.perf_counter() - loop_start)))
+            else:
+                time.sleep(0.03)
+    except Exception as e:
+        out_queue.put((MSG_ERROR, f"{type(e).__name__}: {e}"))
+    finally:
+        if detector is not None:
+            detector.stop()
+        del seqs, landmarks_buf, frames
+        shm.close()
+
+
+class ProcessDetector:
+    """子プロセスの FaceDetector を、同じプロセスの FaceDetector と同じように使うための窓口
+
+    detector_class: 子プロセスで作る detector のクラス ("モジュール.クラス名")
+    """
+
+    def __init__(self, slots: int = DETECTOR_PROCESS_SLOTS, width: int = FRAME_WIDTH, height: int = FRAME_HEIGHT,
+                 detector_class: str = DEFAULT_DETECTOR_CLASS):
+        self.running = False
+        self.latest_data = SensingData(timestamp=now_ns())
+        self.latest_frame = None  # 最新フレーム（表示用。共有メモリからコピーしたもの）
+        self.frame_seq = 0
+        self.frame_trace = (0, 0.0)  # (通し番号, 撮影時刻)
+        self.fps = 0.0
+        self.latest_landmarks = None
+        self.restarts = 0         # 子プロセスを再起動した回数
+        self.dropped_frames = 0   # コピー中に上書きされて捨てたフレーム数
+        self.lock = threading.Lock()
+        self._listeners = []
+        self._last_frame_time = None
+
+        self.slots = slots
+        self.width = width
+        self.height = height
+        self.detector_class = detector_class
+        self._ctx = multiprocessing.get_context("spawn")  # GUI のスレッドを fork しない
+        self._quality = self._ctx.Array("d", [0.0, 1.0], lock=False)
+        self._cpu_seconds = self._ctx.Value("d", 0.0, lock=False)
+        self._cpu_seconds_base = 0.0   # 終了した子プロセスが使った CPU 時間の合計
+        self._shm = shared_memory.SharedMemory(create=True, size=_buffer_size(slots, height, width))
+        self._seqs, self._landmarks, self._frames = _views(self._shm.buf, slots, height, width)
+        self._seqs[:] = 0
+        self._process = None
+        self._queue = None
+        self._stop_event = None
+        self._ready = False
+        self._spawned_at = 0.0
+        self._last_message = 0.0
+
+    # --- 開始・終了 ---
+
+    def start(self):
+        """子プロセスと監視スレッドを開始"""
+        self.running = True
+        self._spawn()
+        self.thread = threading.Thread(target=self._supervise_loop, name="ProcessDetector", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """子プロセスを止め、共有メモリを解放する"""
+        print("ProcessDetector: 子プロセスを停止しています...")
+        self.running = False
+        if hasattr(self, 'thread') and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self._terminate()
+        if self._shm is not None:
+            del self._seqs, self._landmarks, self._frames
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            print("ProcessDetector: 共有メモリを解放しました")
+
+    def _spawn(self):
+        self._queue = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._process = self._ctx.Process(
+            target=_child_main, name="FaceDetector", daemon=True,
+            args=(self._shm.name, self.slots, self.height, self.width, self._queue, self._stop_event,
+                  os.getpid(), self.detector_class, self._quality, self._cpu_seconds))
+        # 前の子プロセスの CPU 時間を足し込んでから 0 に戻す
+        self._cpu_seconds_base += self._cpu_seconds.value
+        self._cpu_seconds.value = 0.0
+        self._ready = False
+        self._spawned_at = time.monotonic()
+        self._last_message = self._spawned_at
+        self._process.start()
+
+    def _terminate(self):
+        if self._process is None:
+            return
+        self._stop_event.set()
+        self._process.join(timeout=3.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._queue.cancel_join_thread()
+        self._queue.close()
+        self._process = None
+
+    # --- 監視・受信 ---
+
+    def _supervise_loop(self):
+        """子プロセスからのメッセージを受け取り、落ちた・止まった時は再起動する"""
+        delay = 1.0
+        while self.running:
+            try:
+                msg = self._queue.get(timeout=0.5)
+            except (queue.Empty, OSError, ValueError):
+                msg = None
+
+            if msg is not None:
+                self._last_message = time.monotonic()
+                if msg[0] == MSG_FRAME:
+                    self._on_frame(msg)
+                elif msg[0] == MSG_READY:
+                    self._ready = True
+                    print("ProcessDetector: 子プロセスの準備ができました")
+                elif msg[0] == MSG_ERROR:
+                    print(f"ProcessDetector: 子プロセスでエラーが発生しました: {msg[1]}")
+                continue
+
+            now = time.monotonic()
+            if not self.running:
+                break
+            if not self._process.is_alive():
+                reason = f"終了した (終了コード {self._process.exitcode})"
+            elif self._ready and now - self._last_message > DETECTOR_PROCESS_STALL_SECONDS:
+                reason = f"{DETECTOR_PROCESS_STALL_SECONDS}秒間応答しない"
+            elif not self._ready and now - self._spawned_at > DETECTOR_PROCESS_STARTUP_TIMEOUT:
+                reason = f"{DETECTOR_PROCESS_STARTUP_TIMEOUT}秒以内に起動しなかった"
+            else:
+                continue
+
+            # しばらく正常に動いていたなら、再起動の間隔を最初に戻す
+            if now - self._spawned_at > DETECTOR_PROCESS_RESTART_MAX_DELAY * 2:
+                delay = 1.0
+            print(f"ProcessDetector: 子プロセスが{reason}ため、{delay:.0f}秒後に再起動します")
+            self._terminate()
+            deadline = time.monotonic() + delay
+            while self.running and time.monotonic() < deadline:
+                time.sleep(0.1)
+            delay = min(delay * 2, DETECTOR_PROCESS_RESTART_MAX_DELAY)
+            if self.running:
+                self.restarts += 1
+                self._spawn()
+
+    def _on_frame(self, msg):
+        _, seq, captured_at, n, *values = msg
+        data = SensingData(*values, captured_at=captured_at)
+        TRACER.record_age(STAGE_INFERENCE, captured_at)
+        slot = seq % self.slots
+
+        # 共有メモリからコピーする（コピーの前後で通し番号が変わっていたら上書きされている）
+        frame = landmarks = None
+        if self._seqs[slot] == seq:
+            frame = self._frames[slot].copy()
+            landmarks = self._landmarks[slot, :n].copy() if n else None
+            if self._seqs[slot] != seq:
+                frame = landmarks = None
+        if frame is None:
+            self.dropped_frames += 1
+
+        with self.lock:
+            self.latest_data = data
+            if frame is not None:
+                self.latest_frame = frame
+                self.frame_seq += 1
+                self.frame_trace = (self.frame_seq, captured_at)
+                self.latest_landmarks = landmarks
+            elif not data.face_detected:
+                self.latest_landmarks = None
+        self._update_fps()
+        self._notify_listeners(data, captured_at)
+
+    # --- FaceDetector と同じ窓口 ---
+
+    def add_listener(self, fn):
+        """1フレーム解析するたびに fn(SensingData, 撮影時刻) を呼ぶ（監視スレッドで呼ばれる）"""
+        with self.lock:
+            self._listeners = self._listeners + [fn]
+
+    def remove_listener(self, fn):
+        with self.lock:
+            self._listeners = [f for f in self._listeners if f != fn]
+
+    def _notify_listeners(self, data, captured_at):
+        with self.lock:
+            listeners = self._listeners
+        for fn in listeners:
+            try:
+                fn(data, captured_at)
+            except Exception as e:
+                print(f"ProcessDetector: listener でエラーが発生しました: {e}")
+
+    def _update_fps(self):
+        now = time.perf_counter()
+        if self._last_frame_time is not None:
+            dt = now - self._last_frame_time
+            if dt > 0:
+                inst = 1.0 / dt
+                self.fps = inst if self.fps == 0.0 else self.fps * 0.9 + inst * 0.1
+        self._last_frame_time = now
+
+    def get_fps(self) -> float:
+        return self.fps
+
+    def get_current_data(self) -> SensingData:
+        with self.lock:
+            return self.latest_data
+
+    def get_latest_frame(self):
+        with self.lock:
+            return self.latest_frame
+
+    def get_latest_frame_with_seq(self):
+        with self.lock:
+            return self.latest_frame, self.frame_seq
+
+    def get_latest_landmarks(self):
+        with self.lock:
+            return self.latest_landmarks
+
+    def set_quality(self, target_fps: float = None, input_scale: float = 1.0):
+        """子プロセスの解析の fps と入力画像の縮小率を変える（次のフレームから反映）"""
+        self._quality[0] = target_fps or 0.0
+        self._quality[1] = input_scale
+
+    @property
+    def child_cpu_seconds(self) -> float:
+        """子プロセスが使った CPU 時間の合計（再起動前の分も含む）"""
+        return self._cpu_seconds_base + self._cpu_seconds.value
+
+    def start_session_recording(self, directory: str = None):
+        """記録モードは子プロセスでは使えない（同じプロセスの FaceDetector で記録する）"""
+        print("ProcessDetector: 別プロセスの detector では映像の記録はできません")
+        return None
+
+    def stop_session_recording(self):
+        pass
@@ -0,0 +1,98 @@
+"""居眠り・不在・よそ見の区間（エピソード）の抽出
+
+1秒ごとの集計 (OneSecData) を受け取るたびに状態の連続をランレングスで数え、
+連続が途切れた時点で EpisodeData を1件作って通知します。
+区間は DB の episodes テーブルに索引付きで保存されるので、
+「今週何回居眠りしたか」などは detail_logs を全件読み直さずに求められます。
+"""
+from datetime import timedelta
+
+from common.data_struct import OneSecData, EpisodeData
+from common.timeutil import NS_PER_SECOND, to_datetime
+from core.calculator import Calculator
+from config import EPISODE_MIN_SECONDS
+
+# --- 区間の種類 ---
+EPISODE_SLEEPING = "sleeping"
+EPISODE_ABSENT = "absent"
+EPISODE_LOOKING_AWAY = "looking_away"
+EPISODE_TYPES = [EPISODE_SLEEPING, EPISODE_ABSENT, EPISODE_LOOKING_AWAY]
+EPISODE_LABELS = {
+    EPISODE_SLEEPING: "居眠り",
+    EPISODE_ABSENT: "不在",
+    EPISODE_LOOKING_AWAY: "よそ見",
+}
+
+# 1秒ごとのデータの間隔がこれより空いたら（アプリ停止など）、続いている区間をそこで閉じる
+MAX_GAP_NS = 3 * NS_PER_SECOND
+
+
+def classify_second(data: OneSecData) -> set:
+    """1秒分の集計がどの状態に当たるか（判定基準は Calculator と同じ）"""
+    states = set()
+    if data.no_face_count >= 5:
+        states.add(EPISODE_ABSENT)
+    if data.sleeping_count >= Calculator.SLEEPING_FRAME_THRESH:
+        states.add(EPISODE_SLEEPING)
+    if data.looking_away_count >= Calculator.LOOKING_AWAY_FRAME_THRESH:
+        states.add(EPISODE_LOOKING_AWAY)
+    return states
+
+
+class EpisodeTracker:
+    """1秒ごとのデータから区間を抽出する
+
+    on_episode(EpisodeData): 区間が閉じた時に呼ばれる
+    種類ごとに「開始時刻・最後の秒の時刻・秒数」だけを持つので、メモリは一定。
+    時刻は OneSecData と同じ monotonic ナノ秒で持ち、EpisodeData を作る時に datetime に変換する。
+    """
+
+    def __init__(self, on_episode, user_id=None, min_seconds=None):
+        self.on_episode = on_episode
+        self.user_id = user_id
+        self.min_seconds = dict(EPISODE_MIN_SECONDS if min_seconds is None else min_seconds)
+        self._runs = {}         # 種類 -> [開始時刻, 最後の秒の時刻, 秒数]
+        self._last_timestamp = None
+
+    def set_user(self, user_id):
+        """ユーザーが変わったら、前のユーザーの区間を閉じてから切り替える"""
+        if user_id != self.user_id:
+            self.flush()
+            self.user_id = user_id
+
+    def add(self, data: OneSecData):
+        """1秒分のデータを追加する（EventBus の TOPIC_ONE_SEC の購読者）"""
+        ts = data.timestamp
+        if self._last_timestamp is not None and ts - self._last_timestamp > MAX_GAP_NS:
+            self.flush()
+        self._last_timestamp = ts
+
+        states = classify_second(data)
+        for episode_type in EPISODE_TYPES:
+            run = self._runs.get(episode_type)
+            if episode_type in states:
+                if run is None:
+                    self._runs[episode_type] = [ts, ts, 1]
+                else:
+                    run[1] = ts
+                    run[2] += 1
+            elif run is not None:
+                self._close(episode_type)
+
+    def flush(self):
+        """続いている区間をすべて閉じる（終了時・ユーザー切り替え時）"""
+        for episode_type in list(self._runs):
+            self._close(episode_type)
+        self._last_timestamp = None
+
+    def _close(self, episode_type):
+        start, last, seconds = self._runs.pop(episode_type)
+        if seconds < self.min_seconds.get(episode_type, 1):
+            return
+        self.on_episode(EpisodeData(
+            episode_type=episode_type,
+            start=to_datetime(start),
+            end=to_datetime(last) + timedelta(seconds=1),
+            duration_seconds=seconds,
+            user_id=self.user_id,
+        ))
@@ -0,0 +1,242 @@
+"""フレームごとの SensingData をバイナリファイルに記録し、あとから集計処理に流し直す
+
+DB に残るのは1秒ごとの集計だけなので、閾値や集計方法を変えた時に実際の記録で試せるよう、
+detector の出力（必要ならランドマークも）を固定長レコードでそのまま追記します。
+
+ファイル形式 (1時間ごとに新しいファイル: frames_YYYYmmdd_HHMM.fmlog):
+    ヘッダ 16 バイト: マジック "FMFRAME1" / フラグ (uint32) / 1レコードのバイト数 (uint32)
+    レコード: frame_dtype() の構造体をすき間なく並べたもの（リトルエンディアン）
+
+時刻はプロセスをまたいでも使えるよう、monotonic ではなく UNIX 時刻のナノ秒で書きます。
+読み出しは np.memmap なので、何時間分あってもファイル全体を読み込まずに扱えます。
+
+    logs = [open_frame_log(p) for p in list_frame_logs("frame_logs")]
+    replay(logs, aggregator)   # MainApp と同じ 200ms 間隔でサンプリングして Aggregator に渡す
+"""
+import glob
+import os
+import struct
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from common.data_struct import SensingData
+from common.timeutil import NS_PER_SECOND, to_epoch_ns, from_epoch_ns
+from config import FRAME_LOG_DIR, FRAME_LOG_LANDMARKS, FRAME_LOG_ROTATE_SECONDS, FRAME_LOG_FLUSH_RECORDS
+from core.aggregator import FRAMES_PER_SECOND
+
+MAGIC = b"FMFRAME1"
+HEADER = struct.Struct("<8sII")   # マジック, フラグ, 1レコードのバイト数
+FLAG_LANDMARKS = 1
+FILE_SUFFIX = ".fmlog"
+
+LANDMARK_COUNT = 478   # core.detector.MAX_LANDMARKS と同じ（detector は mediapipe を読み込むので import しない）
+
+# SensingData の項目（timestamp 以外）。値は記録したものをそのまま再現できるよう float64 で持つ
+FEATURE_FIELDS = ["face_detected", "eye_closedness", "gaze_angle_yaw", "gaze_angle_pitch", "nose_x", "nose_y"]
+
+# MainApp の main_loop と同じ間隔
+MAIN_LOOP_INTERVAL_NS = NS_PER_SECOND // FRAMES_PER_SECOND
+# これより古いフレームしかない時刻は、記録が止まっていたとみなして流さない
+MAX_STALE_NS = NS_PER_SECOND
+
+
+def frame_dtype(with_landmarks: bool = False) -> np.dtype:
+    """1フレーム分のレコードの型"""
+    fields = [
+        ("epoch_ns", "<i8"),
+        ("face_detected", "u1"),
+        ("eye_closedness", "<f8"),
+        ("gaze_angle_yaw", "<f8"),
+        ("gaze_angle_pitch", "<f8"),
+        ("nose_x", "<f8"),
+        ("nose_y", "<f8"),
+    ]
+    if with_landmarks:
+        fields.append(("landmarks", "<f4", (LANDMARK_COUNT, 3)))
+    return np.dtype(fields)
+
+
+class FrameRecorder:
+    """SensingData を1フレームずつファイルに追記する
+
+    detector のリスナー（detector のスレッド）から write を呼ぶ想定。
+    書き込みは flush_records 件ごとにまとめて行い、1フレームごとのシステムコールやメモリ確保はしない。
+    """
+
+    def __init__(self, directory: str = FRAME_LOG_DIR, with_landmarks: bool = FRAME_LOG_LANDMARKS,
+                 rotate_seconds: int = FRAME_LOG_ROTATE_SECONDS, flush_records: int = FRAME_LOG_FLUSH_RECORDS):
+        self.directory = directory
+        self.with_landmarks = with_landmarks
+        self.dtype = frame_dtype(with_landmarks)
+        self.path = None                  # 書き込み中のファイル
+        self.records_written = 0          # このインスタンスで書いたレコード数
+        self._rotate_ns = int(rotate_seconds * NS_PER_SECOND)
+        self._buffer = np.zeros(flush_records, dtype=self.dtype)
+        self._count = 0
+        self._file = None
+        self._period = None
+        self._closed = False              # close 後に届いたフレームは書かない
+        self._lock = threading.Lock()
+
+    def write(self, data: SensingData, landmarks=None):
+        """1フレーム追記する。landmarks は (N,3) の配列（with_landmarks の時だけ使う）"""
+        epoch_ns = to_epoch_ns(data.timestamp)
+        period = epoch_ns // self._rotate_ns
+        with self._lock:
+            if self._closed:
+                return
+            if period != self._period:
+                self._flush()
+                self._open(period)
+            record = self._buffer[self._count]
+            record["epoch_ns"] = epoch_ns
+            record["face_detected"] = data.face_detected
+            record["eye_closedness"] = data.eye_closedness
+            record["gaze_angle_yaw"] = data.gaze_angle_yaw
+            record["gaze_angle_pitch"] = data.gaze_angle_pitch
+            record["nose_x"] = data.nose_x
+            record["nose_y"] = data.nose_y
+            if self.with_landmarks:
+                if landmarks is None:
+                    record["landmarks"] = 0.0
+                else:
+                    n = min(len(landmarks), LANDMARK_COUNT)
+                    record["landmarks"][:n] = landmarks[:n]
+                    record["landmarks"][n:] = 0.0
+            self._count += 1
+            if self._count == len(self._buffer):
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                print(f"FrameRecorder: 記録を終了しました ({self.path}, {self.records_written}件)")
+            self._period = None
+
+    def _flush(self):
+        if self._count and self._file is not None:
+            self._file.write(self._buffer[:self._count].tobytes())
+            self._file.flush()
+            self.records_written += self._count
+        self._count = 0
+
+    def _open(self, period: int):
+        """period（rotate_seconds ごとの通し番号）のファイルを開く。同じ形式のファイルがあれば追記する"""
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.fromtimestamp(period * self._rotate_ns / NS_PER_SECOND).strftime('%Y%m%d_%H%M')
+        flags = FLAG_LANDMARKS if self.with_landmarks else 0
+        header = HEADER.pack(MAGIC, flags, self.dtype.itemsize)
+
+        suffix = 0
+        while True:
+            name = f"frames_{stamp}{f'_{suffix}' if suffix else ''}{FILE_SUFFIX}"
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                self._file = open(path, "wb")
+                self._file.write(header)
+                break
+            with open(path, "rb") as f:
+                existing = f.read(HEADER.size)
+            if existing == header:
+                self._file = open(path, "r+b")
+                # 途中で落ちて最後のレコードが欠けていたら切り捨てる
+                size = os.path.getsize(path)
+                self._file.truncate(size - (size - HEADER.size) % self.dtype.itemsize)
+                self._file.seek(0, os.SEEK_END)
+                break
+            # ランドマークの有無が違うファイルには追記しない
+            suffix += 1
+        self.path = path
+        self._period = period
+        print(f"FrameRecorder: {path} に記録します")
+
+
+# --- 読み出し ---
+
+def open_frame_log(path: str) -> np.ndarray:
+    """記録ファイルを読み取り専用の memmap（構造化配列）で開く
+
+    書き込み中のファイルでも、その時点で書き終わっているレコードまでを返す。
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"フレーム記録ファイルではありません: {path}")
+    magic, flags, record_size = HEADER.unpack(header)
+    dtype = frame_dtype(bool(flags & FLAG_LANDMARKS))
+    if magic != MAGIC or record_size != dtype.itemsize:
+        raise ValueError(f"フレーム記録ファイルではないか、形式が違います: {path}")
+
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def save_frame_log(path: str, records: np.ndarray):
+    """構造化配列 (frame_dtype) をまとめて1つの記録ファイルに書き出す"""
+    flags = FLAG_LANDMARKS if "landmarks" in records.dtype.names else 0
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, flags, records.dtype.itemsize))
+        f.write(np.ascontiguousarray(records).tobytes())
+
+
+def list_frame_logs(directory: str = FRAME_LOG_DIR):
+    """ディレクトリ内の記録ファイルを時刻順に返す"""
+    return sorted(glob.glob(os.path.join(directory, f"frames_*{FILE_SUFFIX}")))
+
+
+def replay(logs, aggregator, interval_ns: int = MAIN_LOOP_INTERVAL_NS) -> int:
+    """記録したフレームを Aggregator に流し直す。流したフレーム数を返す
+
+    logs: open_frame_log の戻り値（時刻順）のリスト
+    MainApp の main_loop と同じく interval_ns ごとに「その時点の最新フレーム」を1つ取り出して渡す。
+    記録が MAX_STALE_NS 以上途切れている間は何も渡さない。
+    OneSecData の時刻は、実時間ではなく流しているフレームの時刻になる。
+    """
+    current = [0]
+    original_clock = aggregator.clock
+    aggregator.clock = lambda: current[0]
+    fed = 0
+    next_tick = None
+    try:
+        for records in logs:
+            if len(records) == 0:
+                continue
+            ts = np.asarray(records["epoch_ns"])
+            if next_tick is None or ts[0] - next_tick > MAX_STALE_NS:
+                next_tick = int(ts[0])
+            ticks = np.arange(next_tick, int(ts[-1]) + 1, interval_ns, dtype=np.int64)
+            if len(ticks) == 0:
+                continue
+            next_tick = int(ticks[-1]) + interval_ns
+
+            # 各時刻の最新フレーム（記録の途切れ・ファイルの先頭より前は除く）
+            idx = np.searchsorted(ts, ticks, side="right") - 1
+            keep = idx >= 0
+            keep[keep] = ticks[keep] - ts[idx[keep]] <= MAX_STALE_NS
+            idx = idx[keep]
+
+            # 列ごとに Python の値へ変換してから SensingData を作る（numpy のスカラーを1つずつ作らない）
+            timestamps = from_epoch_ns(ts[idx]).tolist()
+            columns = [np.asarray(records[name])[idx].tolist() for name in FEATURE_FIELDS]
+            add = aggregator.add
+            for timestamp, face, eye, yaw, pitch, nose_x, nose_y in zip(timestamps, *columns):
+                current[0] = timestamp
+                add(SensingData(timestamp, bool(face), eye, yaw, pitch, nose_x, nose_y))
+            fed += len(timestamps)
+    finally:
+        aggregator.clock = original_clock
+    return fed
@@ -0,0 +1,113 @@
+"""CPU 使用率に合わせて detector とプレビューの負荷を自動で調整する
+
+古いノートPCでビデオ会議と同時に使うと CPU が張り付くため、このアプリの CPU 使用率と
+detector の遅延 (撮影 → 解析結果) を一定間隔で測り、GOVERNOR_LEVELS の段階を上下させます。
+
+- 上限を超えた（または遅延が GOVERNOR_LATENCY_BUDGET_MS を超えた）ら1段階下げる
+- 使用率と遅延がどちらも上限の GOVERNOR_RECOVER_RATIO 倍を下回る状態が GOVERNOR_RECOVER_INTERVALS 回続いたら1段階戻す
+  （遅延で下げた時に、CPU だけを見て戻してはすぐ下げるのを繰り返さない）
+- 解析の fps は、集計 (core.aggregator) が1秒分の OneSecData を作るのに必要な FRAMES_PER_SECOND を下回らせない
+
+変えるもの: 解析の fps と入力画像の縮小率 (detector.set_quality)、プレビューの表示レート (preview.set_max_fps)。
+MediaPipe の blendshapes は目の閉じ具合・視線の計算に必要なので切らない（使っていない変換行列の出力は常に切ってある）。
+
+CPU 使用率はこのプロセスの CPU 時間 (time.process_time) と、detector が別プロセスならその CPU 時間の合計から求める。
+"""
+import os
+import time
+
+from config import (GOVERNOR_CPU_BUDGET_PERCENT, GOVERNOR_LATENCY_BUDGET_MS, GOVERNOR_INTERVAL_SECONDS,
+                    GOVERNOR_RECOVER_RATIO, GOVERNOR_RECOVER_INTERVALS, GOVERNOR_LEVELS)
+from core.aggregator import FRAMES_PER_SECOND
+from core.latency import TRACER, STAGE_INFERENCE
+
+
+class CpuGovernor:
+    """
+    detector: set_quality(target_fps, input_scale) を持つもの (FaceDetector / ProcessDetector)
+    preview: set_max_fps(fps) を持つもの (ui.frame_dispatcher.FrameDispatcher)。None なら変えない
+    main_loop などから tick() を定期的に呼ぶ（GUI スレッドから呼ぶ想定。間隔が来るまでは何もしない）
+    """
+
+    def __init__(self, detector, preview=None, budget_percent: float = GOVERNOR_CPU_BUDGET_PERCENT,
+                 latency_budget_ms: float = GOVERNOR_LATENCY_BUDGET_MS,
+                 interval_seconds: float = GOVERNOR_INTERVAL_SECONDS, levels=GOVERNOR_LEVELS,
+                 cpu_count: int = None, clock=time.perf_counter, cpu_clock=None):
+        self.detector = detector
+        self.preview = preview
+        self.budget_percent = budget_percent
+        self.latency_budget_ms = latency_budget_ms
+        self.interval_seconds = interval_seconds
+        # 集計に必要な fps を下回る段階は、下限の fps に引き上げて使う
+        self.levels = [(max(fps, FRAMES_PER_SECOND), scale, preview_fps) for fps, scale, preview_fps in levels]
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self.clock = clock
+        self.cpu_clock = cpu_clock or self._cpu_seconds
+        self.level = 0
+        self.last_cpu_percent = None
+        self.last_latency_ms = None
+        self._calm_intervals = 0
+        self._last_wall = None
+        self._last_cpu = None
+        self.apply()
+
+    def _cpu_seconds(self) -> float:
+        """このプロセスと、別プロセスの detector が使った CPU 時間の合計"""
+        return time.process_time() + getattr(self.detector, "child_cpu_seconds", 0.0)
+
+    def tick(self):
+        now = self.clock()
+        if self._last_wall is None:
+            self._last_wall, self._last_cpu = now, self.cpu_clock()
+            return
+        if now - self._last_wall < self.interval_seconds:
+            return
+        cpu = self.cpu_clock()
+        cpu_percent = (cpu - self._last_cpu) / (now - self._last_wall) / self.cpu_count * 100
+        self._last_wall, self._last_cpu = now, cpu
+        if cpu_percent < 0:
+            # detector の子プロセスが入れ替わった直後など
+            return
+        self.last_cpu_percent = cpu_percent
+
+        # 今の段階で解析したフレームだけを見る（間隔 × fps 件）
+        fps = self.levels[self.level][0]
+        latency = TRACER.percentile(STAGE_INFERENCE, 95, last=max(1, int(self.interval_seconds * fps)))
+        self.last_latency_ms = latency * 1000 if latency is not None else None
+        self.update(cpu_percent, self.last_latency_ms)
+
+    def update(self, cpu_percent: float, latency_ms: float = None):
+        """測った値から段階を決めて適用する。段階が変わったら True"""
+        over_latency = latency_ms is not None and latency_ms > self.latency_budget_ms
+        if cpu_percent > self.budget_percent or over_latency:
+            self._calm_intervals = 0
+            if self.level < len(self.levels) - 1:
+                return self._change(self.level + 1, cpu_percent, latency_ms)
+            return False
+
+        calm_latency = latency_ms is None or latency_ms < self.latency_budget_ms * GOVERNOR_RECOVER_RATIO
+        if cpu_percent < self.budget_percent * GOVERNOR_RECOVER_RATIO and calm_latency:
+            self._calm_intervals += 1
+            if self._calm_intervals >= GOVERNOR_RECOVER_INTERVALS and self.level > 0:
+                self._calm_intervals = 0
+                return self._change(self.level - 1, cpu_percent, latency_ms)
+        else:
+            self._calm_intervals = 0
+        return False
+
+    def _change(self, level: int, cpu_percent: float, latency_ms: float) -> bool:
+        direction = "下げ" if level > self.level else "戻し"
+        self.level = level
+        self.apply()
+        fps, scale, preview_fps = self.levels[level]
+        latency = f"{latency_ms:.0f} ms" if latency_ms is not None else "-"
+        print(f"CpuGovernor: CPU {cpu_percent:.0f}% / 遅延 p95 {latency} のため段階 {level} に{direction}ました"
+              f" (解析 {fps}fps, 縮小率 {scale}, プレビュー {preview_fps}fps)")
+        return True
+
+    def apply(self):
+        """今の段階を detector とプレビューに反映する"""
+        fps, scale, preview_fps = self.levels[self.level]
+        self.detector.set_quality(fps, scale)
+        if self.preview is not None:
+            self.preview.set_max_fps(preview_fps)
@@ -0,0 +1,117 @@
+"""撮影から表示・保存までの遅延の計測
+
+フレームは cap.read → 解析 → detector の最新データ → (a) プレビューのタイマー / (b) 200ms の main_loop
+→ 1秒・1分のバッファ → DB と進むので、画面のプレビューやスコアがどれだけ古いかは見ただけでは分かりません。
+
+各フレームの撮影時刻 (time.perf_counter) を SensingData.captured_at として持ち回り、
+各段階で「その時点での撮影からの経過時間」を記録します。プレビューのフレームは detector の
+通し番号 (frame_seq) を trace ID にして、表示したフレームの撮影時刻を引き当てます。
+
+段階:
+- capture_to_sensing:        撮影 → 解析結果 (SensingData) ができるまで
+- preview_frame_age:         プレビューに表示した時点でのフレームの古さ
+- main_loop_sensing_age:     main_loop が SensingData を受け取った時点での古さ
+- capture_to_alert_display:  アラートの判定に使ったフレームの撮影 → バナー表示
+- event_to_detail_saved:     1秒の中で最初のフレームの撮影 → OneSecData の保存
+- last_frame_to_score_saved: 1分の最後のフレームの撮影 → スコアの保存（処理の遅れ）
+- event_to_score_saved:      1分の最初のフレームの撮影 → スコアの保存（最大の遅れ）
+
+段階ごとに直近 LATENCY_WINDOW_SAMPLES 件を持ち、パーセンタイルを report() で出します。
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config import LATENCY_WINDOW_SAMPLES
+
+STAGE_INFERENCE = "capture_to_sensing"
+STAGE_PREVIEW = "preview_frame_age"
+STAGE_MAIN_LOOP = "main_loop_sensing_age"
+STAGE_ALERT = "capture_to_alert_display"
+STAGE_DETAIL_SAVED = "event_to_detail_saved"
+STAGE_SCORE_PROCESSING = "last_frame_to_score_saved"
+STAGE_SCORE_SAVED = "event_to_score_saved"
+STAGES = [STAGE_INFERENCE, STAGE_PREVIEW, STAGE_MAIN_LOOP, STAGE_ALERT,
+          STAGE_DETAIL_SAVED, STAGE_SCORE_PROCESSING, STAGE_SCORE_SAVED]
+
+# 件数だけを数えるもの
+COUNT_MAIN_LOOP_REUSED = "main_loop_reused_sensing"   # main_loop が前回と同じフレームの SensingData を受け取った回数
+
+
+class LatencyTracer:
+    def __init__(self, window: int = LATENCY_WINDOW_SAMPLES):
+        self.window = window
+        self._samples = {}   # 段階 -> deque[秒]
+        self._counts = {}    # 名前 -> 回数
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        samples = self._samples.get(stage)
+        if samples is None:
+            with self._lock:
+                samples = self._samples.setdefault(stage, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def record_age(self, stage: str, captured_at: float):
+        """撮影時刻から今までの時間を記録する。撮影時刻がない (0) データは無視する"""
+        if captured_at > 0:
+            self.record(stage, time.perf_counter() - captured_at)
+
+    def count(self, name: str):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def percentile(self, stage: str, q: float, last: int = None):
+        """直近 last 件（省略時は保持している全件）の q パーセンタイル (秒)。サンプルがなければ None"""
+        samples = self._samples.get(stage)
+        if not samples:
+            return None
+        values = list(samples)
+        if last:
+            values = values[-last:]
+        return float(np.percentile(values, q))
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._counts = {}
+
+    def summary(self) -> dict:
+        """段階ごとの件数とパーセンタイル (ms)"""
+        with self._lock:
+            items = [(name, list(samples)) for name, samples in self._samples.items()]
+            counts = dict(self._counts)
+        order = {name: i for i, name in enumerate(STAGES)}
+        result = {}
+        for name, values in sorted(items, key=lambda kv: order.get(kv[0], len(order))):
+            if not values:
+                continue
+            ms = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            result[name] = {
+                "count": len(ms),
+                "p50_ms": round(float(p50), 1),
+                "p95_ms": round(float(p95), 1),
+                "p99_ms": round(float(p99), 1),
+                "max_ms": round(float(ms.max()), 1),
+            }
+        if counts:
+            result["counts"] = counts
+        return result
+
+    def report(self) -> str:
+        summary = self.summary()
+        counts = summary.pop("counts", {})
+        lines = [f"{'stage':<28} {'count':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'maxms':>9}"]
+        for name, s in summary.items():
+            lines.append(f"{name:<28} {s['count']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} "
+                         f"{s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+        for name, value in counts.items():
+            lines.append(f"{name:<28} {value:>6}")
+        return "\n".join(lines)
+
+
+# アプリ全体で1つ使う
+TRACER = LatencyTracer()
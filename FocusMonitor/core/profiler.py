@@ -0,0 +1,255 @@
+"""動作中のアプリのプロファイリング（処理時間の偏り・メモリリークの調査用）
+
+一定時間（ウィンドウ）だけ次の情報を集めて、profiles/<開始時刻>/ に書き出します。
+アプリを再起動せずに、重くなってきたその場で取れるようにしています。
+
+- スレッドごとの cProfile: 各スレッドのループが tick(名前) を呼ぶと、そのスレッドで計測が始まる
+  （detector のスレッド = "detector", Qt のメインループ = "qt_main"）
+- 区間の時間: @profiled(名前) を付けた関数（DB の書き込みなど）の回数・合計・最大時間
+- tracemalloc: 一定間隔でスナップショットを取り、前回・最初との差分（増えた場所）を書き出す
+
+有効にする方法:
+- 環境変数 FOCUSMONITOR_PROFILE=1 （数字を入れるとウィンドウの秒数）
+- 起動オプション --profile / --profile=秒数
+- 画面で Ctrl+Shift+P （もう一度押すとその場で終了して書き出す）
+
+計測していない間は tick / @profiled はフラグを1つ見るだけなので、常に呼んでおいてよい。
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from config import PROFILE_OUTPUT_DIR, PROFILE_WINDOW_SECONDS, PROFILE_SNAPSHOT_INTERVAL
+
+ENV_VAR = "FOCUSMONITOR_PROFILE"
+STOP_GRACE_SECONDS = 1.0   # 終了時に、各スレッドが tick で cProfile を止めるのを待つ最大秒数
+
+
+class Profiler:
+    def __init__(self, output_dir: str = PROFILE_OUTPUT_DIR,
+                 window_seconds: float = PROFILE_WINDOW_SECONDS,
+                 snapshot_interval: float = PROFILE_SNAPSHOT_INTERVAL):
+        self.output_dir = output_dir
+        self.window_seconds = window_seconds
+        self.snapshot_interval = snapshot_interval
+        self.active = False
+        self.stopping = False     # 計測は終わり、各スレッドが cProfile を止めるのを待っている間
+        self.session_dir = None
+        self._lock = threading.Lock()
+        self._deadline = 0.0
+        self._profiles = {}       # 名前 -> [cProfile.Profile, 終了済みか, スレッドID]
+        self._sections = {}       # 名前 -> [回数, 合計秒, 最大秒]
+        self._started_tracemalloc = False
+        self._snapshots = []      # (経過秒, tracemalloc.Snapshot) 最初と直前の2つだけ持つ
+        self._snapshot_count = 0
+        self._stop_event = None
+        self._watcher = None
+
+    # --- 開始・終了 ---
+
+    def start(self, window_seconds: float = None) -> bool:
+        """計測を開始する。すでに計測中なら False"""
+        with self._lock:
+            if self.active or self.stopping:
+                return False
+            window = window_seconds or self.window_seconds
+            self.session_dir = os.path.join(self.output_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+            os.makedirs(self.session_dir, exist_ok=True)
+            self._t0 = time.perf_counter()
+            self._deadline = self._t0 + window
+            self._profiles = {}
+            self._sections = {}
+            self._snapshots = []
+            self._snapshot_count = 0
+
+            self._started_tracemalloc = not tracemalloc.is_tracing()
+            if self._started_tracemalloc:
+                tracemalloc.start(25)
+            self._take_snapshot()
+
+            self._stop_event = threading.Event()
+            self._watcher = threading.Thread(target=self._watch, name="Profiler", daemon=True)
+            self.active = True
+            self._watcher.start()
+        print(f"Profiler: {window:.0f}秒間の計測を開始しました ({self.session_dir})")
+        return True
+
+    def stop(self):
+        """計測を終了して結果を書き出す（ウィンドウの途中でも呼べる）"""
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            self.stopping = True
+            self._stop_event.set()
+        # 呼び出したスレッド（ショートカット・終了時なら Qt のメインスレッド）の計測はここで止められる
+        current = threading.get_ident()
+        for entry in self._profiles.values():
+            if entry[0] is not None and not entry[1] and entry[2] == current:
+                entry[0].disable()
+                entry[1] = True
+        self._wait_and_finish()
+
+    def toggle(self, window_seconds: float = None):
+        if self.active:
+            self.stop()
+        else:
+            self.start(window_seconds)
+
+    # --- 計測 ---
+
+    def tick(self, name: str):
+        """各スレッドのループの先頭で呼ぶ。計測中ならこのスレッドの cProfile を動かす"""
+        if not self.active and not self.stopping:
+            return
+        entry = self._profiles.get(name)
+        if self.stopping or time.perf_counter() >= self._deadline:
+            # cProfile はスレッドごとなので、止めるのも同じスレッドで行う
+            if entry is not None and not entry[1]:
+                entry[0].disable()
+                entry[1] = True
+            return
+        if entry is None:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12 以降は全スレッドで1つしか使えない（最初のスレッドの計測に全スレッド分が入る）
+                self._profiles[name] = [None, True, threading.get_ident()]
+                return
+            self._profiles[name] = [profile, False, threading.get_ident()]
+
+    def add_section(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._sections.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    # --- 内部処理 ---
+
+    def _watch(self):
+        """スナップショットを定期的に取り、ウィンドウが終わったら書き出す"""
+        while not self._stop_event.wait(min(self.snapshot_interval, max(0.0, self._deadline - time.perf_counter()))):
+            if time.perf_counter() >= self._deadline:
+                with self._lock:
+                    if not self.active:
+                        return
+                    self.active = False
+                    self.stopping = True
+                self._wait_and_finish()
+                return
+            self._take_snapshot()
+
+    def _wait_and_finish(self):
+        """各スレッドが tick で自分の cProfile を止めるのを待ってから（最大 STOP_GRACE_SECONDS）書き出す"""
+        deadline = time.perf_counter() + STOP_GRACE_SECONDS
+        while time.perf_counter() < deadline:
+            if all(entry[1] for entry in list(self._profiles.values())):
+                break
+            time.sleep(0.02)
+        try:
+            self._finish()
+        finally:
+            self.stopping = False
+
+    def _take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        elapsed = time.perf_counter() - self._t0
+        self._snapshot_count += 1
+        if self._snapshots:
+            self._write_memory_diff(snapshot, elapsed)
+            self._snapshots = [self._snapshots[0], (elapsed, snapshot)]
+        else:
+            self._snapshots = [(elapsed, snapshot)]
+
+    def _write_memory_diff(self, snapshot, elapsed):
+        first_t, first = self._snapshots[0]
+        prev_t, prev = self._snapshots[-1]
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"経過 {elapsed:.0f}秒  現在 {current / 1024:.0f} KB  ピーク {peak / 1024:.0f} KB", ""]
+        for title, base, base_t in (("前回", prev, prev_t), ("最初", first, first_t)):
+            lines.append(f"--- {title} ({base_t:.0f}秒) からの増加 上位30 ---")
+            for stat in snapshot.compare_to(base, "lineno")[:30]:
+                lines.append(str(stat))
+            lines.append("")
+        path = os.path.join(self.session_dir, f"memory_{self._snapshot_count:03d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+    def _finish(self):
+        self._take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        for name, (profile, finished, _) in self._profiles.items():
+            if profile is None:
+                continue
+            if not finished:
+                # ループが止まっていて tick が来なかったスレッド（途中までの結果は取れない）
+                print(f"Profiler: '{name}' の計測を止められなかったため書き出しません")
+                continue
+            profile.dump_stats(os.path.join(self.session_dir, f"{name}.prof"))
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(50)
+            with open(os.path.join(self.session_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+
+        lines = [f"{'区間':<40} {'回数':>8} {'合計ms':>10} {'平均ms':>8} {'最大ms':>8}"]
+        for name, (count, total, worst) in sorted(self._sections.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"{name:<40} {count:>8} {total * 1000:>10.1f} {total / count * 1000:>8.2f} {worst * 1000:>8.2f}")
+        with open(os.path.join(self.session_dir, "sections.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"Profiler: 計測結果を書き出しました ({self.session_dir})")
+
+
+# アプリ全体で1つ使う
+PROFILER = Profiler()
+
+
+def tick(name: str):
+    PROFILER.tick(name)
+
+
+def profiled(name: str):
+    """関数の実行時間を、計測中だけ区間として記録するデコレータ"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.active:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                PROFILER.add_section(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def window_from_env(argv=None):
+    """環境変数・起動オプションから計測ウィンドウの秒数を決める。指定がなければ None"""
+    argv = argv or []
+    for arg in argv:
+        if arg == "--profile":
+            return PROFILE_WINDOW_SECONDS
+        if arg.startswith("--profile="):
+            return float(arg.split("=", 1)[1])
+    value = os.environ.get(ENV_VAR, "")
+    if value in ("", "0"):
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return PROFILE_WINDOW_SECONDS
+    # "1" は「有効にする」の意味として扱う
+    return PROFILE_WINDOW_SECONDS if seconds == 1 else seconds
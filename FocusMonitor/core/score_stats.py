@@ -0,0 +1,226 @@
+"""スコアの統計計算（日・週・月の時間帯ごとの集計）
+
+タイムスタンプとスコアを一度だけ NumPy 配列に変換し、各レコードが入る時間帯（バケット）の番号を
+計算で求めてから、np.maximum.at / np.bincount で全バケットの最大・平均・状態別件数をまとめて求めます。
+Qt には依存しないので、画面を出さないレポート出力からも使えます。
+
+    python -m core.score_stats --db focusmonitor.db
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+import numpy as np
+
+# 状態の並び (円グラフの並びと同じ)
+STATE_FOCUSED, STATE_DISTRACTED, STATE_UNFOCUSED, STATE_AWAY = range(4)
+STATE_LABELS = ["集中", "注意散漫", "非集中", "離席"]
+
+PERIOD_DAY = "日"
+PERIOD_WEEK = "週"
+PERIOD_MONTH = "月"
+PERIODS = [PERIOD_DAY, PERIOD_WEEK, PERIOD_MONTH]
+
+DAY_BUCKET_HOURS = 4   # 日の集計は4時間ごとの6区間
+MAX_MONTH_WEEKS = 6    # 月の集計は最大6週
+
+
+@dataclass
+class ScoreArrays:
+    """スコアログを列ごとの配列にしたもの"""
+    timestamps: np.ndarray      # datetime64[s]（パースできなかった行は NaT）
+    scores: np.ndarray          # float64
+    reaving_ratios: np.ndarray  # float64
+
+    def __len__(self):
+        return len(self.scores)
+
+
+@dataclass
+class PeriodStats:
+    """1つの期間（日・週・月）の集計結果"""
+    period: str
+    labels: list                # バケットの表示名
+    max_scores: np.ndarray      # バケットごとの最大スコア（データなしは0）
+    mean_scores: np.ndarray     # バケットごとの平均スコア（データなしは0）
+    counts: np.ndarray          # バケットごとの件数
+    state_counts: np.ndarray    # (バケット数, 4) の状態別件数
+
+    @property
+    def total_state_counts(self) -> np.ndarray:
+        """期間全体の状態別件数 (集中, 注意散漫, 非集中, 離席)"""
+        return self.state_counts.sum(axis=0)
+
+    @property
+    def mean_score(self) -> float:
+        """期間全体の平均スコア（データなしは0）"""
+        total = self.counts.sum()
+        return float((self.mean_scores * self.counts).sum() / total) if total else 0.0
+
+
+def _parse_timestamps(values) -> np.ndarray:
+    """'YYYY-mm-dd HH:MM:SS' 形式の文字列を datetime64[s] に一括変換する"""
+    arr = np.asarray(values, dtype=object)
+    try:
+        return arr.astype('datetime64[s]')
+    except (ValueError, TypeError):
+        pass
+    # 不正な値が混ざっている場合だけ1件ずつ変換し、失敗した行は NaT にする
+    out = np.empty(len(arr), dtype='datetime64[s]')
+    for i, v in enumerate(arr):
+        try:
+            out[i] = np.datetime64(v, 's')
+        except (ValueError, TypeError):
+            out[i] = np.datetime64('NaT')
+    return out
+
+
+def load_score_arrays(rows) -> ScoreArrays:
+    """DB の行（dict または (timestamp, score, reaving_ratio) のタプル）を配列に変換する"""
+    if rows and isinstance(rows[0], dict):
+        rows = [(r['timestamp'], r['score'], r.get('reaving_ratio', 0)) for r in rows]
+    n = len(rows)
+    if n == 0:
+        return ScoreArrays(np.empty(0, dtype='datetime64[s]'), np.empty(0), np.empty(0))
+
+    ts_col, score_col, ratio_col = zip(*rows)
+    timestamps = _parse_timestamps(ts_col)
+    scores = np.asarray(score_col, dtype=np.float64)
+    ratios = np.asarray([r or 0 for r in ratio_col], dtype=np.float64)
+    return ScoreArrays(timestamps, scores, ratios)
+
+
+def classify_states(scores: np.ndarray, reaving_ratios: np.ndarray) -> np.ndarray:
+    """スコアと離席率から状態番号を求める（DashboardPage.get_status と同じ基準）"""
+    return np.where(reaving_ratios > 90, STATE_AWAY,
+           np.where(scores >= 70, STATE_FOCUSED,
+           np.where(scores >= 40, STATE_DISTRACTED, STATE_UNFOCUSED)))
+
+
+def _month_start_sunday(today: date) -> date:
+    """月の集計の起点（月初の週の日曜日）"""
+    first_day = today.replace(day=1)
+    return first_day - timedelta(days=first_day.weekday() + 1)
+
+
+def period_range(period: str, today: date = None):
+    """期間の集計対象となる [start, end) を datetime で返す（DB の範囲検索用）"""
+    today = today or date.today()
+    if period == PERIOD_DAY:
+        start = today
+        end = today + timedelta(days=1)
+    elif period == PERIOD_WEEK:
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    elif period == PERIOD_MONTH:
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+    else:
+        raise ValueError(f"未知の期間です: {period}")
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+
+class _Derived:
+    """全期間で共通に使う派生配列（1回だけ計算する）"""
+
+    def __init__(self, arrays: ScoreArrays):
+        ts = arrays.timestamps
+        self.valid = ~np.isnat(ts)
+        self.days = ts.astype('datetime64[D]')
+        # NaT は 00:00 に置き換えてから時刻を求める（対象外の判定は valid で行う）
+        elapsed = np.where(self.valid, ts - self.days, np.timedelta64(0, 's'))
+        self.hours = (elapsed // np.timedelta64(1, 'h')).astype(np.int64)
+        self.months = ts.astype('datetime64[M]')
+        self.states = classify_states(arrays.scores, arrays.reaving_ratios)
+        self.scores = arrays.scores
+
+
+def _bucket_indices(derived: _Derived, period: str, today: date):
+    """各レコードのバケット番号を計算で求める。対象外のレコードは -1"""
+    today64 = np.datetime64(today, 'D')
+    if period == PERIOD_DAY:
+        labels = [f"{h}-{h + DAY_BUCKET_HOURS}時" for h in range(0, 24, DAY_BUCKET_HOURS)]
+        in_range = derived.valid & (derived.days == today64)
+        idx = derived.hours // DAY_BUCKET_HOURS
+    elif period == PERIOD_WEEK:
+        monday = today - timedelta(days=today.weekday())
+        labels = [(monday + timedelta(days=i)).strftime("%m/%d") for i in range(7)]
+        offset = (derived.days - np.datetime64(monday, 'D')).astype(np.int64)
+        in_range = derived.valid & (offset >= 0) & (offset < 7)
+        idx = offset
+    elif period == PERIOD_MONTH:
+        sunday = _month_start_sunday(today)
+        first_day = today.replace(day=1)
+        last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        n_weeks = min(MAX_MONTH_WEEKS, (last_day - sunday).days // 7 + 1)
+        labels = [f"第{i + 1}週" for i in range(n_weeks)]
+        offset = (derived.days - np.datetime64(sunday, 'D')).astype(np.int64)
+        idx = offset // 7
+        in_range = (derived.valid & (derived.months == np.datetime64(today, 'M'))
+                    & (idx >= 0) & (idx < n_weeks))
+    else:
+        raise ValueError(f"未知の期間です: {period}")
+    return labels, np.where(in_range, idx, -1)
+
+
+def _aggregate(derived: _Derived, period: str, labels, idx) -> PeriodStats:
+    n = len(labels)
+    mask = idx >= 0
+    b = idx[mask]
+    scores = derived.scores[mask]
+
+    max_scores = np.zeros(n)
+    np.maximum.at(max_scores, b, scores)
+    counts = np.bincount(b, minlength=n)
+    sums = np.bincount(b, weights=scores, minlength=n)
+    mean_scores = np.divide(sums, counts, out=np.zeros(n), where=counts > 0)
+    state_counts = np.bincount(b * 4 + derived.states[mask], minlength=n * 4).reshape(n, 4)
+
+    return PeriodStats(period=period, labels=labels, max_scores=max_scores,
+                       mean_scores=mean_scores, counts=counts, state_counts=state_counts)
+
+
+def compute_period_stats(arrays: ScoreArrays, period: str, today: date = None) -> PeriodStats:
+    """1つの期間の集計を行う"""
+    return compute_all_periods(arrays, today, periods=[period])[period]
+
+
+def compute_all_periods(arrays: ScoreArrays, today: date = None, periods=PERIODS) -> dict:
+    """日・週・月の集計をまとめて行う（派生配列は共有する）"""
+    today = today or date.today()
+    derived = _Derived(arrays)
+    result = {}
+    for period in periods:
+        labels, idx = _bucket_indices(derived, period, today)
+        result[period] = _aggregate(derived, period, labels, idx)
+    return result
+
+
+def format_report(stats: dict) -> str:
+    """集計結果をテキストのレポートにする"""
+    lines = []
+    for period, st in stats.items():
+        total = st.total_state_counts
+        breakdown = "  ".join(f"{label}:{int(c)}" for label, c in zip(STATE_LABELS, total))
+        lines.append(f"[{period}] 平均: {st.mean_score:.1f}  {breakdown}")
+        for label, mx, mean, cnt in zip(st.labels, st.max_scores, st.mean_scores, st.counts):
+            lines.append(f"  {label:>8}  最大 {mx:5.1f}  平均 {mean:5.1f}  件数 {int(cnt)}")
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+    from database.db_manager import DBManager
+
+    parser = argparse.ArgumentParser(description="スコアの日・週・月の集計を表示する")
+    parser.add_argument("--db", default="focusmonitor.db", help="DBファイルのパス")
+    args = parser.parse_args()
+
+    db = DBManager(args.db)
+    start, _ = period_range(PERIOD_MONTH)
+    # 週の集計は前月にまたがることがあるので、月と週の早い方から読み込む
+    start = min(start, period_range(PERIOD_WEEK)[0])
+    arrays = load_score_arrays(db.get_scores_between(start))
+    print(format_report(compute_all_periods(arrays)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""カメラ映像の記録と再生（detector を変更した時に、同じ映像で精度と速度を確かめるため）
+
+記録モードでは、detector が解析したフレームをそのまま動画ファイルに書き、同じ順番で
+その時の SensingData を core.frame_log の形式で残します（n 番目のレコードが n 番目のフレーム）。
+
+    sessions/<開始時刻>/
+        video.avi            撮影したフレーム (SESSION_VIDEO_FOURCC で圧縮)
+        frames_*.fmlog       各フレームの SensingData と撮影時刻
+
+再生 (replay_session) では、動画を先頭からできるだけ速く detector に通し、出力を記録と比べます。
+映像は圧縮されているので、記録時の出力とは小さな差が出ます。変更前のコードで一度再生した結果を
+基準 (baseline) として保存しておき、変更後の再生と比べると、コードの変更による差だけが分かります。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from common.data_struct import SensingData
+from config import SESSION_DIR, SESSION_VIDEO_FOURCC, SESSION_VIDEO_FPS
+from core.frame_log import (FrameRecorder, open_frame_log, list_frame_logs, save_frame_log,
+                            frame_dtype, FEATURE_FIELDS)
+
+VIDEO_FILE = "video.avi"
+
+
+class SessionRecorder:
+    """フレームと SensingData を組にして記録する
+
+    detector のスレッドから write を呼び、別のスレッドから close してよい。
+    """
+
+    def __init__(self, directory: str = SESSION_DIR, fourcc: str = SESSION_VIDEO_FOURCC,
+                 fps: float = SESSION_VIDEO_FPS):
+        self.session_dir = os.path.join(directory, datetime.now().strftime('%Y%m%d_%H%M%S'))
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.fourcc = fourcc
+        self.fps = fps
+        self.frames = 0
+        self._writer = None
+        # 1回の記録は1時間を超えても1つのフォルダに入れる（ファイルが分かれても読み出し時につなげる）
+        self._sensing = FrameRecorder(self.session_dir, with_landmarks=False)
+        self._lock = threading.Lock()
+        self._closed = False
+        print(f"SessionRecorder: {self.session_dir} に記録します")
+
+    def write(self, frame, data: SensingData):
+        with self._lock:
+            if self._closed:
+                return
+            if self._writer is None:
+                height, width = frame.shape[:2]
+                path = os.path.join(self.session_dir, VIDEO_FILE)
+                self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+                if not self._writer.isOpened():
+                    print(f"SessionRecorder: 動画ファイルを作れませんでした ({path}, {self.fourcc})")
+                    self._closed = True
+                    return
+            self._writer.write(frame)
+            self._sensing.write(data)
+            self.frames += 1
+
+    def close(self):
+        with self._lock:
+            if self._closed and self._writer is None:
+                return
+            self._closed = True
+            if self._writer is not None:
+                self._writer.release()
+                self._writer = None
+            self._sensing.close()
+        print(f"SessionRecorder: 記録を終了しました ({self.session_dir}, {self.frames}フレーム)")
+
+
+def load_session_sensing(session_dir: str) -> np.ndarray:
+    """記録した SensingData を1つの構造化配列にして返す"""
+    logs = [open_frame_log(p) for p in list_frame_logs(session_dir)]
+    if not logs:
+        raise FileNotFoundError(f"SensingData の記録がありません: {session_dir}")
+    return np.concatenate(logs)
+
+
+def compare_sensing(expected: np.ndarray, actual: np.ndarray) -> dict:
+    """2つの記録をフレームごとに比べる（顔ありの判定の不一致と、両方で顔があったフレームの値の差）"""
+    n = min(len(expected), len(actual))
+    face_expected = expected["face_detected"][:n].astype(bool)
+    face_actual = actual["face_detected"][:n].astype(bool)
+    both = face_expected & face_actual
+    result = {
+        "frames": n,
+        "frame_count_diff": int(len(actual) - len(expected)),
+        "face_mismatch": int(np.count_nonzero(face_expected != face_actual)),
+    }
+    identical = result["frame_count_diff"] == 0 and result["face_mismatch"] == 0
+    for name in FEATURE_FIELDS[1:]:
+        diff = np.abs(expected[name][:n][both] - actual[name][:n][both])
+        max_diff = float(diff.max()) if len(diff) else 0.0
+        result[name] = {
+            "max_abs_diff": max_diff,
+            "mean_abs_diff": float(diff.mean()) if len(diff) else 0.0,
+        }
+        identical = identical and max_diff == 0.0
+    result["identical"] = identical
+    return result
+
+
+def replay_session(detector, session_dir: str, baseline_path: str = None, save_path: str = None) -> dict:
+    """記録した映像を detector に通し、出力を記録（または baseline）と比べた結果を返す
+
+    detector: FaceDetector（カメラは使わないので open_camera=False で作ってよい）
+    baseline_path: 比べる相手の記録ファイル。省略時は記録時の SensingData
+    save_path: 今回の出力を記録ファイルとして保存する（次回の baseline 用）
+    """
+    recorded = load_session_sensing(session_dir)
+    expected = open_frame_log(baseline_path) if baseline_path else recorded
+
+    cap = cv2.VideoCapture(os.path.join(session_dir, VIDEO_FILE))
+    if not cap.isOpened():
+        raise FileNotFoundError(f"動画ファイルを開けません: {session_dir}")
+
+    actual = np.zeros(len(recorded), dtype=frame_dtype())
+    durations = []
+    count = 0
+    start = time.perf_counter()
+    try:
+        while count < len(recorded):
+            success, frame = cap.read()
+            if not success:
+                break
+            t = time.perf_counter()
+            data = detector.analyze_frame(frame)
+            durations.append(time.perf_counter() - t)
+            # 時刻は記録時のものを使う（比較・保存した記録を並べて見られるように）
+            actual[count] = (recorded["epoch_ns"][count], data.face_detected, data.eye_closedness,
+                             data.gaze_angle_yaw, data.gaze_angle_pitch, data.nose_x, data.nose_y)
+            count += 1
+    finally:
+        cap.release()
+    wall = time.perf_counter() - start
+    actual = actual[:count]
+
+    if save_path:
+        save_frame_log(save_path, actual)
+
+    ms = np.asarray(durations) * 1000 if durations else np.zeros(1)
+    return {
+        "session": os.path.basename(os.path.normpath(session_dir)),
+        "baseline": os.path.basename(baseline_path) if baseline_path else "recorded",
+        "frames": count,
+        "wall_seconds": round(wall, 3),
+        "fps": round(count / wall, 1) if wall > 0 else None,
+        "analyze_ms": {
+            "mean": round(float(ms.mean()), 3),
+            "p50": round(float(np.percentile(ms, 50)), 3),
+            "p95": round(float(np.percentile(ms, 95)), 3),
+            "max": round(float(ms.max()), 3),
+        },
+        "diff": compare_sensing(expected, actual),
+    }
@@ -0,0 +1,89 @@
+"""起動処理の高速化まわり
+
+- StartupProfiler: import や初期化にかかった時間を記録して内訳を表示する
+- DetectorLoader: mediapipe / cv2 の import とモデル読み込み・カメラ起動を別スレッドで行う
+  （ログイン画面を先に出し、ユーザーが ID を入力している間に読み込みを済ませる）
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, Signal
+
+
+class StartupProfiler:
+    def __init__(self, t0: float = None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.sections = []  # (名前, 所要時間秒)
+        self.marks = []     # (名前, 起動からの経過秒)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name: str):
+        """with ブロックの所要時間を記録する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.sections.append((name, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        """起動からの経過時間を記録する"""
+        with self._lock:
+            self.marks.append((name, time.perf_counter() - self.t0))
+
+    def elapsed(self, name: str):
+        """mark で記録した経過時間（秒）。未記録なら None"""
+        for mark_name, t in self.marks:
+            if mark_name == name:
+                return t
+        return None
+
+    def report(self) -> str:
+        with self._lock:
+            lines = ["--- 起動時間の内訳 ---"]
+            for name, dt in self.sections:
+                lines.append(f"  {name:<40} {dt * 1000:8.1f} ms")
+            lines.append("--- 起動からの経過 ---")
+            for name, t in self.marks:
+                lines.append(f"  {name:<40} {t * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class DetectorLoader(QObject):
+    """FaceDetector をバックグラウンドで生成する
+
+    完了したら loaded(detector)、失敗したら failed(例外) を GUI スレッドに通知する。
+    use_process=True なら、子プロセスで動かす ProcessDetector を作る（モデル・カメラの準備は子プロセスが start 後に行う）
+    """
+    loaded = Signal(object)
+    failed = Signal(object)
+
+    def __init__(self, profiler: StartupProfiler = None, parent=None, use_process: bool = False):
+        super().__init__(parent)
+        self.profiler = profiler or StartupProfiler()
+        self.use_process = use_process
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="DetectorLoader", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            if self.use_process:
+                from core.detector_process import ProcessDetector
+                detector = ProcessDetector()
+                self.profiler.mark("detector_ready")
+                self.loaded.emit(detector)
+                return
+            with self.profiler.measure("import core.detector (cv2, mediapipe)"):
+                from core.detector import FaceDetector
+            with self.profiler.measure("FaceDetector() (モデル・カメラ)"):
+                detector = FaceDetector()
+            self.profiler.mark("detector_ready")
+        except Exception as e:
+            self.failed.emit(e)
+            return
+        self.loaded.emit(detector)
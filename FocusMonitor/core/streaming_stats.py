@@ -0,0 +1,121 @@
+"""ストリーミング統計量（データを溜めずに1件ずつ更新する推定器）
+
+- RunningStats: 平均・分散（Welford 法）と最小・最大
+- P2Quantile: P² アルゴリズムによる分位点の推定（マーカー5個分の固定メモリ）
+
+どちらもサンプル数に関係なく一定のメモリ・一定の計算量で更新でき、値はいつでもすぐに取り出せます。
+"""
+import math
+
+
+class RunningStats:
+    """平均・分散を逐次計算する（Welford 法）"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self) -> float:
+        """標本分散（不偏）。2件未満なら 0.0"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """P² アルゴリズムによる p 分位点の推定 (Jain & Chlamtac, 1985)
+
+    p: 0.0〜1.0 （例: 0.95 で 95 パーセンタイル）
+    最初の5件までは正確な値を返し、以降は5個のマーカーを放物線補間で動かして推定する。
+    """
+
+    def __init__(self, p: float):
+        if not 0.0 <= p <= 1.0:
+            raise ValueError("p は 0.0〜1.0 で指定してください")
+        self.p = p
+        self.count = 0
+        self._q = []                            # マーカーの高さ
+        self._n = [0, 1, 2, 3, 4]               # マーカーの実際の位置
+        self._np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]  # マーカーの理想の位置
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]    # 理想の位置の増分
+
+    def add(self, x: float):
+        self.count += 1
+        q = self._q
+        if self.count <= 5:
+            q.append(x)
+            if self.count == 5:
+                q.sort()
+            return
+
+        n = self._n
+        # x が入る区間 k を探す（両端を超えたら端のマーカーを更新）
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        # 中間の3マーカーを理想の位置に近づける
+        for i in range(1, 4):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = self._parabolic(i, d)
+                if q[i - 1] < qp < q[i + 1]:
+                    q[i] = qp
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> float:
+        """現在の推定値。データがなければ nan"""
+        if self.count == 0:
+            return math.nan
+        if self.count < 5:
+            # 件数が少ないうちは線形補間で正確に求める
+            s = sorted(self._q)
+            pos = self.p * (len(s) - 1)
+            lo = int(math.floor(pos))
+            hi = min(lo + 1, len(s) - 1)
+            return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+        if self.count == 5:
+            s = self._q
+            pos = self.p * 4
+            lo = int(math.floor(pos))
+            hi = min(lo + 1, 4)
+            return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+        return self._q[2]
@@ -1,2 +1,2 @@
 # database パッケージ
-__all__ = ["db_manager"]
+__all__ = ["db_manager", "uploader"]
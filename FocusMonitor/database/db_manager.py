@@ -3,15 +3,29 @@ main.py の集計ロジックに対応
 """
 import sqlite3
 from datetime import datetime
+import numpy as np
+from core.profiler import profiled
+from common.timeutil import to_datetime
 # common.data_struct の場所に合わせて調整してください
 try:
-    from common.data_struct import OneSecData, ScoreData
+    from common.data_struct import OneSecData, ScoreData, CalibrationData, CalibrationProfile, EpisodeData, AlertData
 except ImportError:
-    from common.data_struct import OneSecData, ScoreData
+    from common.data_struct import OneSecData, ScoreData, CalibrationData, CalibrationProfile, EpisodeData, AlertData
+
+# 収集サーバーに送るテーブル（送信の種類 -> テーブル名）
+UPLOAD_TABLES = {"detail": "detail_logs", "score": "score_logs"}
+# 送る列: id (このクライアントでの通し番号), user_id, timestamp, 値...
+UPLOAD_COLUMNS = {
+    "detail": ["id", "user_id", "timestamp", "looking_away_count", "sleeping_count",
+               "no_face_count", "nose_movement"],
+    "score": ["id", "user_id", "timestamp", "score", "reaving_ratio"],
+}
+
 
 class DBManager:
     def __init__(self, db_path: str = "focusmonitor.db"):
         self.db_path = db_path
+        self.user_id = None   # ログイン中のユーザー（detail_logs / score_logs の user_id 列に入れる）
         self._ensure_schema()
 
     def _ensure_schema(self):
@@ -52,12 +66,91 @@ class DBManager:
                     note TEXT
                 )
             """)
+
+            # 収集サーバーに送るため、どのユーザーの記録かを残す（既存の DB には列を足す）
+            for table in ("detail_logs", "score_logs"):
+                c.execute(f"PRAGMA table_info({table})")
+                if 'user_id' not in [row[1] for row in c.fetchall()]:
+                    c.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT")
+
+            # 収集サーバーへの送信済み位置（種類ごとに、送り終えた最後の id）
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS upload_state (
+                    kind TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL
+                )
+            """)
+            # 収集サーバーが受け付けなかった行（送り直しても同じなので、ここに残して先へ進む）
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS upload_rejected (
+                    kind TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    reason TEXT,
+                    rejected_at TEXT,
+                    PRIMARY KEY (kind, row_id)
+                )
+            """)
+
+            # ユーザー・カメラごとのキャリブレーション結果（version が大きいほど新しい）
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS calibration_profiles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    camera_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    created_at TEXT,
+                    eye_closedness_threshold REAL,
+                    gaze_angle_yaw_threshold REAL,
+                    gaze_angle_pitch_threshold REAL,
+                    eye_closedness_center REAL,
+                    gaze_angle_yaw_center REAL,
+                    gaze_angle_pitch_center REAL,
+                    sample_count INTEGER,
+                    UNIQUE (user_id, camera_id, version)
+                )
+            """)
+
+            # 居眠り・不在・よそ見の区間（core.episodes.EpisodeTracker が作る）
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS episodes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    episode_type TEXT NOT NULL,
+                    start_ts TEXT NOT NULL,
+                    end_ts TEXT NOT NULL,
+                    duration_seconds INTEGER NOT NULL
+                )
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_episodes_user_type_start ON episodes (user_id, episode_type, start_ts)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_episodes_start ON episodes (start_ts)")
+
+            # 即時アラートの記録（発生・解除それぞれ1行）
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS alert_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    alert_type TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    active INTEGER NOT NULL,
+                    duration_seconds REAL,
+                    latency_ms REAL
+                )
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_alert_logs_timestamp ON alert_logs (timestamp)")
+
+            # 時刻での範囲検索・並び替え用のインデックス
+            c.execute("CREATE INDEX IF NOT EXISTS idx_detail_logs_timestamp ON detail_logs (timestamp)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_score_logs_timestamp ON score_logs (timestamp)")
+            # ユーザーごとの範囲検索用（同じ DB に複数のユーザーの記録がある時）
+            c.execute("CREATE INDEX IF NOT EXISTS idx_detail_logs_user_timestamp ON detail_logs (user_id, timestamp)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_score_logs_user_timestamp ON score_logs (user_id, timestamp)")
             conn.commit()
 
+    @profiled("db.save_detail_log")
     def save_detail_log(self, data: OneSecData):
         """1秒ごとの集計データを保存"""
-        # main.py から渡される datetime オブジェクトを文字列に変換
-        ts_str = data.timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')
+        # monotonic のナノ秒（または datetime）を文字列に変換
+        ts_str = to_datetime(data.timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')
         
         with sqlite3.connect(self.db_path) as conn:
             c = conn.cursor()
@@ -67,17 +160,20 @@ class DBManager:
                     looking_away_count, 
                     sleeping_count, 
                     no_face_count, 
-                    nose_movement
-                ) VALUES (?, ?, ?, ?, ?)
+                    nose_movement,
+                    user_id
+                ) VALUES (?, ?, ?, ?, ?, ?)
             """, (
                 ts_str,
                 data.looking_away_count,
                 data.sleeping_count,
                 data.no_face_count,
-                data.nose_coord_std_ave
+                data.nose_coord_std_ave,
+                self.user_id
             ))
             conn.commit()
 
+    @profiled("db.save_score_log")
     def save_score_log(self, data: ScoreData):
         """1分ごとのスコアを保存"""
         print(f"\n[DB Save] Score: {data.concentration_score}")
@@ -91,27 +187,353 @@ class DBManager:
         with sqlite3.connect(self.db_path) as conn:
             c = conn.cursor()
             c.execute("""
-                INSERT INTO score_logs (timestamp, score, reaving_ratio, note) 
-                VALUES (?, ?, ?, ?)
+                INSERT INTO score_logs (timestamp, score, reaving_ratio, note, user_id) 
+                VALUES (?, ?, ?, ?, ?)
             """, (
                 ts_str, 
                 data.concentration_score,
                 data.reaving_ratio,
-                "" # note
+                "", # note
+                self.user_id
             ))
             conn.commit()
 
+    @profiled("db.save_detail_logs")
+    def save_detail_logs(self, datas):
+        """1秒ごとの集計データをまとめて保存（1回の接続・1回のコミット）"""
+        rows = [(
+            to_datetime(d.timestamp).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            d.looking_away_count,
+            d.sleeping_count,
+            d.no_face_count,
+            d.nose_coord_std_ave,
+            self.user_id
+        ) for d in datas]
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany("""
+                INSERT INTO detail_logs (
+                    timestamp, looking_away_count, sleeping_count, no_face_count, nose_movement, user_id
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+
+    @profiled("db.save_score_logs")
+    def save_score_logs(self, datas):
+        """1分ごとのスコアをまとめて保存（1回の接続・1回のコミット）"""
+        rows = [(
+            d.timestamp.strftime('%Y-%m-%d %H:%M:%S') if isinstance(d.timestamp, datetime) else str(d.timestamp),
+            d.concentration_score,
+            d.reaving_ratio,
+            "",
+            self.user_id
+        ) for d in datas]
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany("""
+                INSERT INTO score_logs (timestamp, score, reaving_ratio, note, user_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+
     # 分析用メソッド
-    def get_recent_details(self, limit: int = 100):
+    # user_id を指定するとそのユーザーの行だけを返す（None なら全員分。(user_id, timestamp) のインデックスを使う）
+    @staticmethod
+    def _user_filter(user_id, where=None, params=()):
+        """WHERE 句の条件のリストとパラメータに user_id の条件を足し、(WHERE 句, パラメータ) を返す"""
+        where, params = list(where or []), list(params)
+        if user_id is not None:
+            where.insert(0, "user_id = ?")
+            params.insert(0, user_id)
+        return (" WHERE " + " AND ".join(where)) if where else "", params
+
+    @profiled("db.get_recent_details")
+    def get_recent_details(self, limit: int = 100, user_id=None):
+        where, params = self._user_filter(user_id)
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             c = conn.cursor()
-            c.execute("SELECT * FROM detail_logs ORDER BY timestamp DESC LIMIT ?", (limit,))
+            c.execute(f"SELECT * FROM detail_logs{where} ORDER BY timestamp DESC LIMIT ?", params + [limit])
             return [dict(row) for row in c.fetchall()]
 
-    def get_recent_scores(self, limit: int = 100):
+    @profiled("db.get_recent_scores")
+    def get_recent_scores(self, limit: int = 100, user_id=None):
+        where, params = self._user_filter(user_id)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            c.execute(f"SELECT * FROM score_logs{where} ORDER BY timestamp DESC LIMIT ?", params + [limit])
+            return [dict(row) for row in c.fetchall()]
+
+    @profiled("db.get_scores_page")
+    def get_scores_page(self, before=None, limit: int = 100, after=None, user_id=None):
+        """スコアを新しい順に1ページ分取得する（履歴画面のページ読み込み用）
+
+        before: 前のページの最後の行の (timestamp, id)。None なら最新から
+        after: 指定すると、この (timestamp, id) より新しい行のうち古い方から limit 件を（新しい順で）返す
+               （画面から外して捨てたページを、上にスクロールした時に読み直す用）
+        OFFSET を使わず timestamp のインデックスで範囲検索するため、古いページでも速い。
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            if after is not None:
+                ts, row_id = after
+                where, params = self._user_filter(user_id, ["timestamp >= ?", "(timestamp > ? OR id > ?)"],
+                                                  (ts, ts, row_id))
+                c.execute(f"SELECT * FROM score_logs{where} ORDER BY timestamp ASC, id ASC LIMIT ?",
+                          params + [limit])
+                return [dict(row) for row in reversed(c.fetchall())]
+            if before is None:
+                where, params = self._user_filter(user_id)
+            else:
+                ts, row_id = before
+                where, params = self._user_filter(user_id, ["timestamp <= ?", "(timestamp < ? OR id < ?)"],
+                                                  (ts, ts, row_id))
+            c.execute(f"SELECT * FROM score_logs{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                      params + [limit])
+            return [dict(row) for row in c.fetchall()]
+
+    @profiled("db.get_scores_between")
+    def get_scores_between(self, start, end=None, user_id=None):
+        """期間 [start, end) のスコアを古い順に取得する（統計用）
+
+        start, end: datetime または 'YYYY-mm-dd HH:MM:SS' 形式の文字列
+        戻り値: (timestamp, score, reaving_ratio) のタプルのリスト
+        """
+        def to_str(ts):
+            return ts.strftime('%Y-%m-%d %H:%M:%S') if isinstance(ts, datetime) else ts
+
+        conditions, params = ["timestamp >= ?"], [to_str(start)]
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(to_str(end))
+        where, params = self._user_filter(user_id, conditions, params)
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT timestamp, score, reaving_ratio FROM score_logs{where} ORDER BY timestamp", params)
+            return c.fetchall()
+
+    def iter_detail_rows(self, start=None, end=None, chunk_size: int = 60 * 1000):
+        """1秒ごとの集計を古い順に chunk_size 行ずつ返すジェネレータ（Calculator.calculate_scores_batch 用）
+
+        start, end: datetime または文字列。期間 [start, end) に絞る（None なら制限なし）
+        各チャンクは (行数, 4) の NumPy 配列 (looking_away, sleeping, no_face, nose_movement)
+        全件をメモリに載せずに処理できるよう、カーソルから少しずつ読む。
+        """
+        def to_str(ts):
+            return ts.strftime('%Y-%m-%d %H:%M:%S.%f') if isinstance(ts, datetime) else ts
+
+        where, params = [], []
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(to_str(start))
+        if end is not None:
+            where.append("timestamp < ?")
+            params.append(to_str(end))
+        sql = """
+            SELECT looking_away_count, sleeping_count, no_face_count, COALESCE(nose_movement, 0.0)
+            FROM detail_logs
+        """
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp, id"
+
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute(sql, params)
+            while True:
+                rows = c.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield np.array(rows, dtype=np.float64)
+
+    # 区間（エピソード）
+    _EPISODE_TS_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+    @profiled("db.save_episode")
+    def save_episode(self, episode: EpisodeData):
+        """区間を1件保存"""
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute("""
+                INSERT INTO episodes (user_id, episode_type, start_ts, end_ts, duration_seconds)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                episode.user_id,
+                episode.episode_type,
+                episode.start.strftime(self._EPISODE_TS_FORMAT),
+                episode.end.strftime(self._EPISODE_TS_FORMAT),
+                episode.duration_seconds
+            ))
+            conn.commit()
+
+    def _episode_filter(self, start, end, episode_type, user_id):
+        """episodes の WHERE 句とパラメータを作る（開始時刻が [start, end) の区間）"""
+        def to_str(ts):
+            return ts.strftime(self._EPISODE_TS_FORMAT) if isinstance(ts, datetime) else ts
+
+        where, params = [], []
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(user_id)
+        if episode_type is not None:
+            where.append("episode_type = ?")
+            params.append(episode_type)
+        if start is not None:
+            where.append("start_ts >= ?")
+            params.append(to_str(start))
+        if end is not None:
+            where.append("start_ts < ?")
+            params.append(to_str(end))
+        return (" WHERE " + " AND ".join(where)) if where else "", params
+
+    def count_episodes(self, start=None, end=None, episode_type=None, user_id=None) -> dict:
+        """期間内の区間の回数と合計秒数を種類ごとに返す
+
+        戻り値: {episode_type: (回数, 合計秒数)}
+        """
+        where, params = self._episode_filter(start, end, episode_type, user_id)
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT episode_type, COUNT(*), COALESCE(SUM(duration_seconds), 0)
+                FROM episodes{where}
+                GROUP BY episode_type
+            """, params)
+            return {row[0]: (row[1], row[2]) for row in c.fetchall()}
+
+    def list_episodes(self, start=None, end=None, episode_type=None, user_id=None, limit: int = 100):
+        """期間内の区間を新しい順に返す（EpisodeData のリスト）"""
+        where, params = self._episode_filter(start, end, episode_type, user_id)
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT user_id, episode_type, start_ts, end_ts, duration_seconds
+                FROM episodes{where}
+                ORDER BY start_ts DESC LIMIT ?
+            """, params + [limit])
+            return [
+                EpisodeData(
+                    episode_type=row[1],
+                    start=datetime.strptime(row[2], self._EPISODE_TS_FORMAT),
+                    end=datetime.strptime(row[3], self._EPISODE_TS_FORMAT),
+                    duration_seconds=row[4],
+                    user_id=row[0],
+                )
+                for row in c.fetchall()
+            ]
+
+    # 即時アラート
+    @profiled("db.save_alert")
+    def save_alert(self, alert: AlertData):
+        """アラートの発生・解除を1件保存"""
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute("""
+                INSERT INTO alert_logs (user_id, alert_type, timestamp, active, duration_seconds, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                alert.user_id,
+                alert.alert_type,
+                alert.timestamp.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                int(alert.active),
+                alert.duration_seconds,
+                alert.latency_ms
+            ))
+            conn.commit()
+
+    # キャリブレーション結果
+    def save_calibration_profile(self, user_id: str, camera_id: int, data: CalibrationData,
+                                 sample_count: int = 0) -> CalibrationProfile:
+        """キャリブレーション結果を新しい version として保存する"""
+        created_at = datetime.now().replace(microsecond=0)
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM calibration_profiles WHERE user_id = ? AND camera_id = ?",
+                      (user_id, camera_id))
+            version = c.fetchone()[0]
+            c.execute("""
+                INSERT INTO calibration_profiles (
+                    user_id, camera_id, version, created_at,
+                    eye_closedness_threshold, gaze_angle_yaw_threshold, gaze_angle_pitch_threshold,
+                    eye_closedness_center, gaze_angle_yaw_center, gaze_angle_pitch_center,
+                    sample_count
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                user_id, camera_id, version, created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                data.eye_closedness_threshold, data.gaze_angle_yaw_threshold, data.gaze_angle_pitch_threshold,
+                data.eye_closedness_center, data.gaze_angle_yaw_center, data.gaze_angle_pitch_center,
+                sample_count
+            ))
+            conn.commit()
+        return CalibrationProfile(user_id=user_id, camera_id=camera_id, version=version,
+                                  created_at=created_at, calibration=data, sample_count=sample_count)
+
+    def load_calibration_profile(self, user_id: str, camera_id: int):
+        """最新のキャリブレーション結果を取得する。なければ None"""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             c = conn.cursor()
-            c.execute("SELECT * FROM score_logs ORDER BY timestamp DESC LIMIT ?", (limit,))
-            return [dict(row) for row in c.fetchall()]
\ No newline at end of file
+            c.execute("""
+                SELECT * FROM calibration_profiles
+                WHERE user_id = ? AND camera_id = ?
+                ORDER BY version DESC LIMIT 1
+            """, (user_id, camera_id))
+            row = c.fetchone()
+        if row is None:
+            return None
+        return CalibrationProfile(
+            user_id=row["user_id"],
+            camera_id=row["camera_id"],
+            version=row["version"],
+            created_at=datetime.strptime(row["created_at"], '%Y-%m-%d %H:%M:%S'),
+            calibration=CalibrationData(
+                eye_closedness_threshold=row["eye_closedness_threshold"],
+                gaze_angle_yaw_threshold=row["gaze_angle_yaw_threshold"],
+                gaze_angle_pitch_threshold=row["gaze_angle_pitch_threshold"],
+                eye_closedness_center=row["eye_closedness_center"],
+                gaze_angle_yaw_center=row["gaze_angle_yaw_center"],
+                gaze_angle_pitch_center=row["gaze_angle_pitch_center"],
+            ),
+            sample_count=row["sample_count"],
+        )
+
+    # 収集サーバー (server.collector) への送信用メソッド
+
+    def get_unuploaded(self, kind: str, limit: int = 500):
+        """まだ送っていない行を id の順に最大 limit 件取得する（各行は UPLOAD_COLUMNS の順の list）"""
+        table = UPLOAD_TABLES[kind]
+        columns = ", ".join(UPLOAD_COLUMNS[kind])
+        with sqlite3.connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute("SELECT last_id FROM upload_state WHERE kind = ?", (kind,))
+            row = c.fetchone()
+            last_id = row[0] if row else 0
+            c.execute(f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit))
+            return [list(r) for r in c.fetchall()]
+
+    def mark_uploaded(self, kind: str, last_id: int):
+        """id が last_id までの行を送信済みにする（サーバーが保存を返してから呼ぶ）"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                INSERT INTO upload_state (kind, last_id) VALUES (?, ?)
+                ON CONFLICT(kind) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)
+            """, (kind, last_id))
+            conn.commit()
+
+    def reject_upload(self, kind: str, row_id: int, reason: str):
+        """サーバーが受け付けなかった行を記録し、その行までを送信済みにする"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT OR REPLACE INTO upload_rejected (kind, row_id, reason, rejected_at) VALUES (?, ?, ?, ?)",
+                         (kind, row_id, reason, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            conn.execute("""
+                INSERT INTO upload_state (kind, last_id) VALUES (?, ?)
+                ON CONFLICT(kind) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)
+            """, (kind, row_id))
+            conn.commit()
+
+    def start_uploader(self, url: str, client_id: str = None):
+        """バックグラウンドで未送信の行を収集サーバーに送り始める。止める時は戻り値の stop() を呼ぶ"""
+        from database.uploader import Uploader
+        uploader = Uploader(self, url, client_id=client_id)
+        uploader.start()
+        return uploader
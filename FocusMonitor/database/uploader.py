@@ -0,0 +1,144 @@
+"""ローカルの DB に溜まった記録を収集サーバー (server.collector) に送る
+
+detail_logs / score_logs の行はまずローカルの DB に保存し（これまでどおり）、別スレッドで
+未送信の行を UPLOAD_BATCH_ROWS 件ずつまとめて送ります。サーバーが保存を返した行だけを
+送信済み (upload_state) にするので、ネットワークが切れている間やアプリを終了した後も、
+次に送れた時に続きから送ります（サーバーは同じ行を2回受け取っても1回分しか保存しない）。
+
+サーバーが行の形式を受け付けなかった時 (400 / 413) は、送り直しても同じなので、行を半分ずつに分けて
+送り直し、受け付けられない行だけを upload_rejected に残して先へ進みます。
+
+送る形式は server.collector を参照。
+"""
+import gzip
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+from config import UPLOAD_BATCH_ROWS, UPLOAD_INTERVAL_SECONDS, UPLOAD_RETRY_MAX_SECONDS, COLLECTOR_CLIENT_ID
+from database.db_manager import UPLOAD_TABLES
+
+BATCH_PATH = "/v1/batches"
+GZIP_MIN_BYTES = 1024        # これより大きい本文は gzip で圧縮して送る
+REQUEST_TIMEOUT = 30
+RETRY_MIN_SECONDS = 5
+REJECTED_STATUSES = (400, 413)   # 送り直しても受け付けられない（行の中身・大きさが原因の）応答
+
+
+def encode_batches(client_id: str, batches: dict) -> bytes:
+    """{種類: [行, ...]} を NDJSON の本文にする"""
+    lines = []
+    for kind, rows in batches.items():
+        lines.append(json.dumps({"client_id": client_id, "kind": kind}, ensure_ascii=False))
+        lines.extend(json.dumps(row, ensure_ascii=False, separators=(",", ":")) for row in rows)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class Uploader:
+    """db: DBManager。start() で送信用のスレッドを始め、stop() で止める"""
+
+    def __init__(self, db, url: str, client_id: str = None, batch_rows: int = UPLOAD_BATCH_ROWS,
+                 interval_seconds: float = UPLOAD_INTERVAL_SECONDS):
+        self.db = db
+        self.url = url.rstrip("/") + BATCH_PATH
+        self.client_id = client_id or COLLECTOR_CLIENT_ID or socket.gethostname()
+        self.batch_rows = batch_rows
+        self.interval_seconds = interval_seconds
+        self.sent_rows = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        print(f"Uploader: {self.url} に {self.client_id} として送信します")
+        self._thread = threading.Thread(target=self._run, name="Uploader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """送信中のものは送り終えてから止める（残りは次に起動した時に送る）"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def upload_once(self) -> int:
+        """未送信の行を1回分送り、送った行数を返す。送れなければ例外"""
+        batches = {}
+        for kind in UPLOAD_TABLES:
+            rows = self.db.get_unuploaded(kind, self.batch_rows)
+            if rows:
+                batches[kind] = rows
+        if not batches:
+            return 0
+
+        try:
+            self._post(batches)
+        except urllib.error.HTTPError as e:
+            if e.code not in REJECTED_STATUSES:
+                raise
+            # どの行が悪いか分からないので、種類ごとに分けて送り直す
+            print(f"Uploader: サーバーが受け付けませんでした。分けて送り直します ({e.code})")
+            return sum(self._send_split(kind, rows) for kind, rows in batches.items())
+
+        # サーバーが保存を返してから送信済みにする
+        sent = 0
+        for kind, rows in batches.items():
+            self.db.mark_uploaded(kind, rows[-1][0])
+            sent += len(rows)
+        self.sent_rows += sent
+        return sent
+
+    def _post(self, batches: dict):
+        body = encode_batches(self.client_id, batches)
+        headers = {"Content-Type": "application/x-ndjson"}
+        if len(body) > GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            json.loads(response.read() or b"{}")
+
+    def _send_split(self, kind: str, rows: list) -> int:
+        """受け付けられなかった行を半分ずつ送り直し、1行でも受け付けられない行は upload_rejected に残す
+
+        処理した（送った・残した）行数を返す
+        """
+        try:
+            self._post({kind: rows})
+        except urllib.error.HTTPError as e:
+            if e.code not in REJECTED_STATUSES:
+                raise
+            if len(rows) == 1:
+                reason = f"{e.code} {e.read().decode('utf-8', 'replace')}"
+                print(f"Uploader: {kind} の行 {rows[0][0]} は受け付けられないため送りません ({reason})")
+                self.db.reject_upload(kind, rows[0][0], reason)
+                return 1
+            middle = len(rows) // 2
+            return self._send_split(kind, rows[:middle]) + self._send_split(kind, rows[middle:])
+        self.db.mark_uploaded(kind, rows[-1][0])
+        self.sent_rows += len(rows)
+        return len(rows)
+
+    def _run(self):
+        delay = 0
+        while not self._stop.is_set():
+            try:
+                sent = self.upload_once()
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                # サーバーが止まっている・ネットワークが切れている間は、間隔を空けながら試し続ける
+                if delay == 0:
+                    print(f"Uploader: 送信できませんでした。再接続を待ちます ({e})")
+                delay = min(max(delay * 2, RETRY_MIN_SECONDS), UPLOAD_RETRY_MAX_SECONDS)
+                self._stop.wait(delay)
+                continue
+            if delay:
+                print("Uploader: 送信を再開しました")
+                delay = 0
+            # 上限いっぱいまで送れた時は、まだ残っているのですぐ次を送る
+            if sent < self.batch_rows:
+                self._stop.wait(self.interval_seconds)
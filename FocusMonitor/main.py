@@ -1,39 +1,64 @@
-import sys
-import statistics
-from datetime import datetime
-from PySide6.QtWidgets import QApplication, QWidget
-from PySide6.QtCore import QTimer
-import numpy as np
 import time
+_STARTUP_T0 = time.perf_counter()  # 起動時間計測の起点（なるべく先に記録する）
+
+import queue
+import sys
+import traceback
+
+from core.startup import StartupProfiler, DetectorLoader
+startup_profiler = StartupProfiler(_STARTUP_T0)
 
-# 既存のモジュール
-from ui.main_window import MainWindow
-from core.detector import FaceDetector
-from core.calculator import Calculator
-from core.calibration import Calibration
-from common.data_struct import SensingData, ScoreData, OneSecData, CalibrationData
-from database.db_manager import DBManager
+with startup_profiler.measure("import PySide6"):
+    from PySide6.QtWidgets import QApplication, QWidget
+    from PySide6.QtCore import QTimer
+
+# 既存のモジュール（mediapipe / cv2 を使う core.detector は DetectorLoader がバックグラウンドで読み込む）
+with startup_profiler.measure("import ui"):
+    from ui.main_window import MainWindow
+with startup_profiler.measure("import core / database"):
+    from core.calculator import Calculator
+    from core.calibration import Calibration, DriftMonitor
+    from common.data_struct import SensingData, CalibrationData
+    from database.db_manager import DBManager
+    from common.event_bus import EventBus, TOPIC_ONE_SEC, TOPIC_SCORE, TOPIC_EPISODE, TOPIC_ALERT
+    from core.alerts import AlertEvaluator
+    from core.aggregator import Aggregator
+    from core.episodes import EpisodeTracker
+    from config import CAMERA_ID, FRAME_LOG_ENABLED, DETECTOR_PROCESS_ENABLED, GOVERNOR_ENABLED
+    from core.governor import CpuGovernor
+    from core.frame_log import FrameRecorder
+    from core.profiler import PROFILER, tick as profiler_tick, window_from_env
+    from core.latency import TRACER, STAGE_MAIN_LOOP, COUNT_MAIN_LOOP_REUSED
+    from config import LATENCY_REPORT_SECONDS, COLLECTOR_URL
 
 class MainApp:
     def __init__(self):
         self.app = QApplication(sys.argv)
         
         # 各モジュールの初期化
-        self.detector = FaceDetector()
-        self.window = MainWindow(detector=self.detector, main_app=self) # UIに自分(MainApp)を渡す
+        # detector（モデル読み込み・カメラ起動）はログイン画面の表示後にバックグラウンドで用意する
+        self.detector = None
+        self.governor = None  # CPU 使用率に合わせた負荷の調整 (detector の準備後に作る)
         self.calculator = Calculator()
         self.db = DBManager()
         self.calibration = Calibration()
 
+        # 集計結果の配信: DB保存も画面更新も購読者として受け取る（DBを先に購読して保存を先に行う）
+        self.bus = EventBus()
+        self.bus.subscribe(TOPIC_ONE_SEC, self.db.save_detail_log)
+        self.bus.subscribe(TOPIC_SCORE, self.db.save_score_log)
+
+        # 居眠り・不在・よそ見の区間を1秒ごとのデータから抽出して保存する
+        self.episode_tracker = EpisodeTracker(on_episode=lambda e: self.bus.publish(TOPIC_EPISODE, e))
+        self.bus.subscribe(TOPIC_ONE_SEC, self.episode_tracker.add)
+        self.bus.subscribe(TOPIC_EPISODE, self.db.save_episode)
+
+        self.window = MainWindow(detector=None, main_app=self, event_bus=self.bus) # UIに自分(MainApp)を渡す
+
         # --- 状態管理フラグ ---
         self.is_calibration_mode = False  # 今キャリブレーション中かどうか
-
-        # --- データバッファリング用変数 ---
-        self.sec_buffer = []  # 1秒分のデータ (最大5個)
-        self.min_buffer = []  # 1分分のデータ (最大60個)
-        self.nose_5sec_buffer_x = []    # 鼻の座標xの5秒分のデータ
-        self.nose_5sec_buffer_y = []    # 鼻の座標yの5秒分のデータ
-        self.nose_data_buffer = 0.0     # 5秒に1回更新される鼻の座標の標準偏差
+        self.user_id = None               # ログイン中のユーザー
+        self.drift_monitor = None         # 保存済み閾値のずれ検知 (閾値が決まってから作る)
 
         # --- キャリブレーションによる閾値データ (初期値) ---
         self.calibration_data = CalibrationData(
@@ -42,29 +67,133 @@ class MainApp:
             gaze_angle_pitch_threshold = 20.0,   # 画面外視線縦角度の閾値
         )
 
-        # --- スコアデータ初期値 ---
-        self.score_data = ScoreData(
-            timestamp = datetime.now(),
-            concentration_score = 0,
-            reaving_ratio = 0,
-        )
+        # --- 居眠り・不在の即時アラート (detector のスレッドでフレームごとに判定する) ---
+        self.alert_evaluator = AlertEvaluator(self.calibration_data,
+                                              on_alert=lambda a: self.bus.publish(TOPIC_ALERT, a))
+        # 保存は detector のスレッドでは行わず、キューに入れて main_loop (GUI スレッド) で書く
+        self._pending_alerts = queue.SimpleQueue()
+        self.bus.subscribe(TOPIC_ALERT, self._pending_alerts.put)
 
-        # 検出開始
-        self.detector.start()
+        # --- 1秒・1分ごとの集計 ---
+        self.aggregator = Aggregator(self.bus, self.calculator, self.calibration_data)
+
+        # --- 遅延の計測 (main_loop が受け取ったデータの古さ) ---
+        self._last_raw_data = None
+        self._latency_reported_at = time.perf_counter()
+
+        # --- フレームごとの記録 (閾値の見直し用。detector のスレッドで書き込む) ---
+        self.frame_recorder = FrameRecorder() if FRAME_LOG_ENABLED else None
+
+        # --- 収集サーバーへの送信 (チーム全体の集計用。送れない間はローカルの DB に溜めておく) ---
+        self.uploader = self.db.start_uploader(COLLECTOR_URL) if COLLECTOR_URL else None
+
+        # ログイン画面を先に表示
         self.window.show()
+        startup_profiler.mark("window_shown")
+        QTimer.singleShot(0, lambda: startup_profiler.mark("first_event_loop"))
+
+        # ログイン中に detector を読み込む
+        use_process = DETECTOR_PROCESS_ENABLED or "--detector-process" in sys.argv[1:]
+        self.detector_loader = DetectorLoader(startup_profiler, use_process=use_process)
+        self.detector_loader.loaded.connect(self.on_detector_ready)
+        self.detector_loader.failed.connect(self.on_detector_failed)
+        self.detector_loader.start()
+
+        # 環境変数・起動オプションで指定されていればプロファイリングを開始
+        profile_window = window_from_env(sys.argv[1:])
+        if profile_window:
+            PROFILER.start(profile_window)
 
         
         # タイマー設定 (200ms = 5fps)
         self.timer = QTimer()
         self.timer.timeout.connect(self.main_loop)
 
+    def on_detector_ready(self, detector):
+        """バックグラウンドで detector の準備ができた時の処理"""
+        if not self.window.isVisible():
+            # 読み込み中にウィンドウが閉じられた
+            detector.stop()
+            return
+        self.detector = detector
+        self.window.set_detector(detector)
+        self.detector.add_listener(self.alert_evaluator.on_frame)
+        if self.frame_recorder is not None:
+            self.detector.add_listener(self.record_frame)
+        # 起動オプション --record-session: カメラ映像と解析結果を記録する（bench/session_replay.py 用）
+        if "--record-session" in sys.argv[1:]:
+            self.detector.start_session_recording()
+        if GOVERNOR_ENABLED:
+            self.governor = CpuGovernor(detector, preview=self.window.frame_dispatcher)
+        # 検出開始
+        self.detector.start()
+        print(startup_profiler.report())
+
+    def record_frame(self, data: SensingData, captured_at: float):
+        """detector のリスナー: フレームをファイルに記録する（ランドマークは次の数フレームの間は書き換わらない）"""
+        self.frame_recorder.write(data, self.detector.latest_landmarks)
+
+    def trace_main_loop(self, raw_data: SensingData):
+        """main_loop が受け取ったデータの古さを記録し、一定間隔で遅延の一覧を出す"""
+        if raw_data is self._last_raw_data:
+            # detector が 200ms の間に次のフレームを出せなかった
+            TRACER.count(COUNT_MAIN_LOOP_REUSED)
+        else:
+            TRACER.record_age(STAGE_MAIN_LOOP, raw_data.captured_at)
+        self._last_raw_data = raw_data
+
+        now = time.perf_counter()
+        if LATENCY_REPORT_SECONDS and now - self._latency_reported_at >= LATENCY_REPORT_SECONDS:
+            self._latency_reported_at = now
+            print("MainApp: 撮影からの遅延\n" + TRACER.report())
+
+    def toggle_profiling(self):
+        """UIのショートカットから呼ばれる: プロファイリングの開始・終了"""
+        PROFILER.toggle()
+
+    def on_detector_failed(self, error):
+        """バックグラウンドで detector を用意できなかった時の処理（カメラやモデルを読み込めない）"""
+        print(f"MainApp: detectorの初期化に失敗しました: {error}")
+        print(startup_profiler.report())
+        if not self.window.isVisible():
+            return
+        # 読み込み中にログインしていても、キャリブレーション・記録は始めない
+        self.timer.stop()
+        self.is_calibration_mode = False
+        self.alert_evaluator.set_enabled(False)
+        self.window.show_detector_error(
+            f"カメラまたは顔検出モデルを読み込めませんでした。\nカメラの接続を確かめてから起動し直してください。\n({error})")
+
+    def save_pending_alerts(self):
+        """detector のスレッドから届いたアラートを DB に保存する（GUI スレッドから呼ぶ）"""
+        while True:
+            try:
+                alert = self._pending_alerts.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.db.save_alert(alert)
+            except Exception:
+                print("MainApp: アラートの保存に失敗しました")
+                traceback.print_exc()
+
     def main_loop(self):
         """
         200msごとに呼ばれるメインループ
         ここで「通常モード」と「キャリブレーションモード」を切り替える
         """
+        profiler_tick("qt_main")
+        self.save_pending_alerts()
+
+        # detector の読み込みが終わるまでは何もしない
+        if self.detector is None:
+            return
+
         # 1. 現在の生データを取得 (AI解析班)
         raw_data: SensingData = self.detector.get_current_data()
+        self.trace_main_loop(raw_data)
+        if self.governor is not None:
+            self.governor.tick()
         
         # モードによる分岐
         if self.is_calibration_mode:
@@ -74,11 +203,52 @@ class MainApp:
             # === B. 通常時の処理 (ログ保存・スコア計算) ===
             self.process_normal_recording(raw_data)
 
+    # --- ログイン・閾値の読み込み ---
+
+    def login(self, user_id: str) -> bool:
+        """UIから呼ばれる: ログインしたユーザーの保存済み閾値を読み込む
+
+        戻り値: 保存済みの閾値があって、そのまま記録を始めたら True（キャリブレーション不要）
+        """
+        self.user_id = user_id
+        self.db.user_id = user_id
+        self.episode_tracker.set_user(user_id)
+        self.alert_evaluator.user_id = user_id
+        profile = self.db.load_calibration_profile(user_id, CAMERA_ID)
+        if profile is None:
+            print(f"MainApp: {user_id} の保存済み閾値がありません。キャリブレーションします")
+            return False
+
+        print(f"MainApp: 保存済み閾値を読み込みました (version {profile.version}, {profile.created_at})")
+        self.apply_calibration(profile.calibration)
+        self.start_recording()
+        return True
+
+    def apply_calibration(self, calibration_data: CalibrationData):
+        """閾値を適用し、ずれ検知を新しい閾値で始め直す"""
+        self.calibration_data = calibration_data
+        self.alert_evaluator.set_calibration(calibration_data)
+        self.aggregator.calibration_data = calibration_data
+        if self.drift_monitor is None:
+            self.drift_monitor = DriftMonitor(calibration_data)
+        else:
+            self.drift_monitor.reset(calibration_data)
+
+    def start_recording(self):
+        """通常記録を開始する"""
+        self.is_calibration_mode = False
+        self.alert_evaluator.set_enabled(True)
+        self.timer.start(200)
+
     # --- モードごとの処理 ---
 
     def start_calibration_mode(self):
         """UIボタンから呼ばれる: キャリブレーションを開始する"""
         print("MainApp: キャリブレーションモードを開始します")
+
+        # 記録が途切れるので、続いている区間はここで閉じる
+        self.episode_tracker.flush()
+        self.alert_evaluator.set_enabled(False)
         
         # 1. キャリブレーションモジュールの準備
         self.calibration.start() # calibration側のバッファクリア
@@ -100,11 +270,17 @@ class MainApp:
             # 結果を取得して適用
             new_thresholds = self.calibration.calculate()
             if new_thresholds:
-                self.calibration_data = new_thresholds
+                self.apply_calibration(new_thresholds)
                 print(f"新しい閾値: {self.calibration_data}")
+                # 次回のログインではこの閾値をすぐに読み込む
+                if self.user_id is not None:
+                    profile = self.db.save_calibration_profile(
+                        self.user_id, CAMERA_ID, new_thresholds, self.calibration.sample_count)
+                    print(f"MainApp: 閾値を保存しました (version {profile.version})")
             
             # モード終了
             self.is_calibration_mode = False
+            self.alert_evaluator.set_enabled(True)
             
             # UIに戻るよう通知
             if hasattr(self.window, 'end_calibration'):
@@ -113,74 +289,14 @@ class MainApp:
     def process_normal_recording(self, raw_data: SensingData):
         """通常時のログ保存処理 (元の main_loop の中身)"""
         
-        # バッファに追加
-        self.sec_buffer.append(raw_data)
+        # 保存済み閾値が今の環境とずれていないか確認（1件あたり定数時間）
+        if self.drift_monitor is not None and self.drift_monitor.add_data(raw_data):
+            print("MainApp: 閾値が環境に合わなくなったため、再キャリブレーションします")
+            self.window.start_calibration()
+            return
 
-        # 1秒経過判定 (データが5個溜まったら処理)
-        if len(self.sec_buffer) >= 5:
-            self.process_one_second()
-            self.sec_buffer.clear() # バッファをリセット
-
-    def process_one_second(self):
-        """
-        1秒ごとの処理：データの集約とDB保存
-        """
-        # 5回分のデータを取り出し
-        data_list = self.sec_buffer
-
-        # A. 目線が画面外にあったフレーム数
-        looking_away_cnt = sum(1 for d in data_list if d.face_detected 
-                               and (d.gaze_angle_yaw > self.calibration_data.gaze_angle_yaw_threshold 
-                               or d.gaze_angle_yaw < -self.calibration_data.gaze_angle_yaw_threshold
-                               or d.gaze_angle_pitch > self.calibration_data.gaze_angle_pitch_threshold
-                               or d.gaze_angle_pitch < -self.calibration_data.gaze_angle_pitch_threshold))
-        
-        # B. 目を閉じているフレーム数
-        sleeping_cnt = sum(1 for d in data_list if d.face_detected and d.eye_closedness > self.calibration_data.eye_closedness_threshold)
-        
-        # C. 顔認識できなかったフレーム数
-        no_face_cnt = sum(1 for d in data_list if not d.face_detected)
-
-        # D. 5秒間の鼻の座標の標準偏差(顔が見えているフレームだけで計算)
-        self.nose_5sec_buffer_x += [d.nose_x for d in data_list if d.face_detected]    # x座標バッファに追加
-        self.nose_5sec_buffer_y += [d.nose_y for d in data_list if d.face_detected]    # y座標バッファに追加
-        
-        if((len(self.min_buffer)+1) % 5 == 0):      # 5秒分のバッファがたまったとき
-            if len(self.nose_5sec_buffer_x) >= 5:   # データの数が5個以上のとき
-                # 動きの激しさを計算 (ここでは顔の向きのブレを標準偏差とする例)
-                self.nose_5sec_buffer_x.clear()
-                self.nose_5sec_buffer_y.clear()
-            else:
-                self.nose_data_buffer = 0.0
-
-        # DB保存用データ構造
-        one_sec_summary = OneSecData(
-            timestamp = datetime.now(),
-            looking_away_count = looking_away_cnt,      # 目線が画面外にあったフレーム数 (0-5)
-            sleeping_count = sleeping_cnt,              # 目を閉じていたフレーム数 (0-5)
-            no_face_count = no_face_cnt,                # 顔認識できなかったフレーム数 (0-5)
-            nose_coord_std_ave = self.nose_data_buffer, # 鼻の座標の標準偏差の平均 (顔の動きの激しさ)
-        )
-
-        self.db.save_detail_log(one_sec_summary)
-        self.min_buffer.append(one_sec_summary)
-
-        # 1分経過判定
-        if len(self.min_buffer) >= 60:
-            self.process_one_minute()
-            self.min_buffer.clear()
-
-    def process_one_minute(self):
-        """1分ごとの処理：スコア算出と画面更新"""
-        self.score_data:ScoreData = self.calculator.calculate_score(self.min_buffer)
-        print("1分のスコア：", self.score_data.concentration_score)
-        
-        # DBにスコアを保存
-        self.db.save_score_log(self.score_data)
-        
-        # ダッシュボード画面を更新
-        if self.window and hasattr(self.window, 'dashboard_page'):
-            self.window.dashboard_page.refresh_current_view()
+        # 1秒・1分ごとの集計とスコア計算（結果は bus 経由で DB と画面に届く）
+        self.aggregator.add(raw_data)
 
     def run(self):
         sys.exit(self.app.exec())
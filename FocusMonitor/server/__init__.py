@@ -0,0 +1,2 @@
+# server パッケージ（複数のクライアントから記録を集める収集サーバー）
+__all__ = ["store", "summaries", "collector"]
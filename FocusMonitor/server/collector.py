@@ -0,0 +1,342 @@
+"""複数の FocusMonitor クライアントから記録を受け取る収集サーバー
+
+各クライアントの database.uploader が、ローカルの DB に溜まった detail_logs / score_logs を
+まとめて HTTP で送ってきます。受け取った行は書き込み用のスレッドでまとめて server.store に保存し、
+保存が終わってから返事をします（返事を受け取ったクライアントは、その行を送信済みにする）。
+
+    POST /v1/batches   本文は NDJSON（Content-Encoding: gzip でもよい）
+        {"client_id": "pc-01", "kind": "detail"}     ← オブジェクトの行から、その種類の行が続く
+        [1, "user01", "2025-01-06 09:00:00.123456", 0, 0, 0, 0.12]
+        [2, "user01", "2025-01-06 09:00:01.124001", 1, 0, 0, 0.10]
+        {"client_id": "pc-01", "kind": "score"}
+        [1, "user01", "2025-01-06 09:01:00", 82.5, 0.05]
+        → 200 {"rows": 3, "inserted": 3}   (inserted は新しく入った行数。送り直しの分は数えない)
+    GET /v1/health     → 200 {"status": "ok"}
+
+グループごとの集計 (server.summaries)。start / end は 'YYYY-mm-dd HH:MM:SS'（時間単位に切り下げ、end は含まない）
+    POST /v1/groups/<group_id>/members   {"name": "開発1課", "add": ["user01"], "remove": ["user02"]}
+                                         （グループがなければ作る）
+    GET  /v1/groups                      グループの一覧
+    GET  /v1/groups/<group_id>/members
+    GET  /v1/groups/<group_id>/trend?start=...&end=...&bucket=hour|day
+    GET  /v1/groups/<group_id>/percentiles?start=...&end=...&q=10,50,90
+    GET  /v1/summary?start=...&end=...   全グループの平均スコアなど
+
+行の列は server.store.KIND_COLUMNS の順。
+
+ローカルで起動（FocusMonitor ディレクトリで実行）:
+    python -m server.collector --port 8765 --data-dir collector_data
+"""
+import argparse
+import asyncio
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from config import COLLECTOR_HOST, COLLECTOR_PORT, COLLECTOR_DATA_DIR, COLLECTOR_MAX_BODY_BYTES
+from server.store import CollectorStore
+
+MAX_HEADER_LINES = 100
+WRITE_MAX_BATCHES = 256      # 1回の書き込みにまとめる送信の最大数
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def decode_batches(body: bytes):
+    """NDJSON の本文を [(client_id, kind, rows), ...] にする"""
+    batches = []
+    current = None
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise HttpError(400, "JSON として読めない行があります")
+        if isinstance(item, dict):
+            client_id, kind = item.get("client_id"), item.get("kind")
+            if not isinstance(client_id, str) or not client_id or not isinstance(kind, str):
+                raise HttpError(400, "client_id と kind が必要です")
+            current = (client_id, kind, [])
+            batches.append(current)
+        elif isinstance(item, list):
+            if current is None:
+                raise HttpError(400, "行の前に client_id と kind の行が必要です")
+            current[2].append(item)
+        else:
+            raise HttpError(400, "行はオブジェクトか配列にしてください")
+    return batches
+
+
+class Collector:
+    def __init__(self, store: CollectorStore, host: str = COLLECTOR_HOST, port: int = COLLECTOR_PORT,
+                 max_body_bytes: int = COLLECTOR_MAX_BODY_BYTES):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self.received_rows = 0
+        self.inserted_rows = 0
+        self._server = None
+        self._queue = None
+        self._writer_task = None
+        # SQLite への書き込みは1本のスレッドにまとめる（イベントループを止めない）
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CollectorWriter")
+        # 集計の問い合わせは別の接続で読む（WAL なので書き込み中も読める）
+        self._reader = store.open_reader()
+        self._reader_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CollectorReader")
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # port=0 の時は空いているポートが選ばれる
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Collector: http://{self.host}:{self.port} で待ち受けます (保存先 {self.store.db_path})")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._writer_task is not None:
+            # 受け付け済みの分を書き終えてから止める
+            await self._queue.join()
+            self._writer_task.cancel()
+            self._writer_task = None
+        self._executor.shutdown(wait=True)
+        self._reader_executor.shutdown(wait=True)
+        self._reader.conn.close()
+
+    async def _write_loop(self):
+        """キューに溜まった送信をまとめて1つのトランザクションで保存し、それぞれに結果を返す"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < WRITE_MAX_BATCHES and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.store.write_many, [batches for batches, _ in items])
+            except Exception as e:
+                results = [e] * len(items)
+            for (_, future), result in zip(items, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    self.inserted_rows += result
+                    future.set_result(result)
+            for _ in items:
+                self._queue.task_done()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "リクエスト行が読めません"}, keep_alive=False)
+                    break
+                headers = await self._read_headers(reader)
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                try:
+                    status, payload = await self._dispatch(method, path, headers, reader)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    # 本文を読み切れていないことがあるので、接続を閉じる
+                    keep_alive = False
+                except Exception as e:
+                    print(f"Collector: 保存に失敗しました ({e})")
+                    status, payload = 500, {"error": "保存に失敗しました"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_headers(self, reader: asyncio.StreamReader) -> dict:
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        raise HttpError(400, "ヘッダーが多すぎます")
+
+    async def _dispatch(self, method: str, path: str, headers: dict, reader: asyncio.StreamReader):
+        url = urlsplit(path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/v1/health":
+            self._require(method, "GET")
+            return 200, {"status": "ok", "received_rows": self.received_rows, "inserted_rows": self.inserted_rows}
+        if url.path == "/v1/batches":
+            self._require(method, "POST")
+            return await self._post_batches(await self._read_body(headers, reader))
+        if url.path == "/v1/summary":
+            self._require(method, "GET")
+            start, end = self._period(params)
+            return 200, {"groups": await self._read(self._reader.compare, start, end)}
+        if parts[:2] == ["v1", "groups"]:
+            return await self._dispatch_groups(method, parts[2:], params, headers, reader)
+        raise HttpError(404, f"{url.path} はありません")
+
+    async def _dispatch_groups(self, method: str, parts: list, params: dict, headers: dict,
+                               reader: asyncio.StreamReader):
+        """グループと集計の問い合わせ (server.summaries)"""
+        if not parts:
+            self._require(method, "GET")
+            return 200, {"groups": await self._read(self._reader.list_groups)}
+        if len(parts) != 2:
+            raise HttpError(404, "/v1/groups/<group_id>/(members|trend|percentiles) を指定してください")
+        group_id, action = parts
+        if action == "members" and method == "POST":
+            try:
+                request = json.loads(await self._read_body(headers, reader) or b"{}")
+            except ValueError:
+                raise HttpError(400, "JSON が読めません")
+            if not isinstance(request, dict):
+                raise HttpError(400, "本文は {\"add\": [...], \"remove\": [...]} の形にしてください")
+            return 200, await self._write(self._update_members, group_id, request)
+        self._require(method, "GET")
+        if action == "members":
+            return 200, {"group_id": group_id, "members": await self._read(self._reader.members, group_id)}
+        start, end = self._period(params)
+        if action == "trend":
+            bucket = params.get("bucket", "hour")
+            try:
+                trend = await self._read(self._reader.trend, group_id, start, end, bucket)
+            except ValueError as e:
+                raise HttpError(400, str(e))
+            return 200, {"group_id": group_id, "bucket": bucket, "trend": trend}
+        if action == "percentiles":
+            try:
+                qs = [float(q) for q in params.get("q", "10,50,90").split(",")]
+            except ValueError:
+                raise HttpError(400, "q は 10,50,90 のように指定してください")
+            if any(not 0 <= q <= 100 for q in qs):
+                raise HttpError(400, "q は 0〜100 です")
+            values = await self._read(self._reader.percentiles, group_id, start, end, qs)
+            return 200, {"group_id": group_id, "percentiles": {f"{q:g}": v for q, v in values.items()}}
+        raise HttpError(404, f"{action} はありません")
+
+    def _update_members(self, group_id: str, request: dict) -> dict:
+        """書き込み用スレッドで、グループの作成・メンバーの追加と削除を行う"""
+        summaries = self.store.summaries
+        add, remove = request.get("add", []), request.get("remove", [])
+        if not isinstance(add, list) or not isinstance(remove, list) or not all(isinstance(u, str) and u for u in list(add) + list(remove)):
+            raise HttpError(400, "add / remove はユーザー ID の配列にしてください")
+        summaries.set_group(group_id, request.get("name"))
+        return {
+            "group_id": group_id,
+            "added": summaries.add_members(group_id, add),
+            "removed": summaries.remove_members(group_id, remove),
+        }
+
+    @staticmethod
+    def _require(method: str, expected: str):
+        if method != expected:
+            raise HttpError(405, f"{expected} で呼んでください")
+
+    @staticmethod
+    def _period(params: dict):
+        if "start" not in params or "end" not in params:
+            raise HttpError(400, "start と end を 'YYYY-mm-dd HH:MM:SS' で指定してください")
+        return params["start"], params["end"]
+
+    async def _read(self, fn, *args):
+        """集計の読み出しは、書き込みと別の接続・スレッドで行う"""
+        return await asyncio.get_running_loop().run_in_executor(self._reader_executor, fn, *args)
+
+    async def _write(self, fn, *args):
+        """保存先への書き込みは、受け取った行の保存と同じスレッドで順番に行う"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _read_body(self, headers: dict, reader: asyncio.StreamReader) -> bytes:
+        if "content-length" not in headers:
+            raise HttpError(411, "Content-Length が必要です")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HttpError(400, "Content-Length が読めません")
+        if length < 0 or length > self.max_body_bytes:
+            raise HttpError(413, f"本文が大きすぎます ({length} bytes)")
+        body = await reader.readexactly(length)
+        if headers.get("content-encoding", "").lower() == "gzip":
+            try:
+                body = gzip.decompress(body)
+            except (OSError, EOFError):
+                raise HttpError(400, "gzip を展開できません")
+            if len(body) > self.max_body_bytes:
+                raise HttpError(413, "展開後の本文が大きすぎます")
+        return body
+
+    async def _post_batches(self, body: bytes):
+        batches = decode_batches(body)
+        rows = sum(len(r) for _, _, r in batches)
+        if rows == 0:
+            return 200, {"rows": 0, "inserted": 0}
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((batches, future))
+        try:
+            inserted = await future
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        self.received_rows += rows
+        return 200, {"rows": rows, "inserted": inserted}
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FocusMonitor の記録を集める収集サーバー")
+    parser.add_argument("--host", default=COLLECTOR_HOST, help=f"待ち受けるアドレス (既定 {COLLECTOR_HOST})")
+    parser.add_argument("--port", type=int, default=COLLECTOR_PORT, help=f"ポート (既定 {COLLECTOR_PORT})")
+    parser.add_argument("--data-dir", default=COLLECTOR_DATA_DIR, help=f"保存先 (既定 {COLLECTOR_DATA_DIR})")
+    args = parser.parse_args(argv)
+
+    store = CollectorStore(args.data_dir)
+    collector = Collector(store, host=args.host, port=args.port)
+    try:
+        asyncio.run(collector.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        print(f"Collector: 終了しました (受信 {collector.received_rows}行, 新規 {collector.inserted_rows}行)")
+
+
+if __name__ == "__main__":
+    main()
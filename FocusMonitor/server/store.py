@@ -0,0 +1,203 @@
+"""収集サーバーの保存先
+
+全クライアントの detail_logs / score_logs を1つの SQLite ファイル (WAL) に、種類と月ごとの
+テーブル (detail_logs_202501 など) に分けて保存します。月で分けておくと、期間を指定した集計で
+関係ない月を読まずに済み、古い月はテーブルごと消したり別ファイルに移したりできます。
+
+行は (client_id, source_id) で一意にしてあり、同じ行を何度受け取っても1回分しか保存しません
+（クライアントは保存の返事を受け取れなかった分を送り直すため）。新しく入った行は、同じトランザクションで
+グループごとの1時間単位の集計 (server.summaries) にも足します。
+
+書き込みは1つのスレッドからだけ行う（server.collector の書き込み用スレッド）。
+"""
+import math
+import os
+import re
+import sqlite3
+
+from server.summaries import GroupSummaries, ensure_schema
+
+DB_FILE = "collector.db"
+
+# 種類ごとの列 (クライアントが送る行の順。database.db_manager.UPLOAD_COLUMNS の id が source_id になる)
+KIND_COLUMNS = {
+    "detail": [("source_id", "INTEGER"), ("user_id", "TEXT"), ("timestamp", "TEXT"),
+               ("looking_away_count", "INTEGER"), ("sleeping_count", "INTEGER"),
+               ("no_face_count", "INTEGER"), ("nose_movement", "REAL")],
+    "score": [("source_id", "INTEGER"), ("user_id", "TEXT"), ("timestamp", "TEXT"),
+              ("score", "REAL"), ("reaving_ratio", "REAL")],
+}
+KIND_TABLES = {"detail": "detail_logs", "score": "score_logs"}
+
+_MONTH = re.compile(r"(\d{4})-(\d{2})")
+
+
+def _check_value(name: str, sql_type: str, value):
+    """1つの値が列の型に合うか確かめる。合わなければ ValueError"""
+    if name == "user_id":
+        ok = value is None or isinstance(value, str)
+    elif sql_type == "TEXT":
+        ok = isinstance(value, str)
+    elif sql_type == "INTEGER":
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        ok = (isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value))
+    if not ok:
+        raise ValueError(f"{name} の値が違います: {value!r}")
+
+
+def partition_of(timestamp: str) -> str:
+    """'YYYY-mm-dd HH:MM:SS' の時刻が入る月 ('YYYYmm')。形式が違えば ValueError"""
+    m = _MONTH.match(timestamp) if isinstance(timestamp, str) else None
+    if m is None:
+        raise ValueError(f"timestamp の形式が違います: {timestamp!r}")
+    return m.group(1) + m.group(2)
+
+
+class CollectorStore:
+    def __init__(self, data_dir: str):
+        os.makedirs(data_dir, exist_ok=True)
+        self.db_path = os.path.join(data_dir, DB_FILE)
+        # 書き込み用スレッドで使うので、作ったスレッド以外からも使えるようにしておく
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._tables = set(self._existing_tables())
+        ensure_schema(self.conn)
+        self.summaries = GroupSummaries(self.conn)
+        # 受け取った行をいったん入れる一時テーブル（既にある行を除いて、新しい行だけを保存・集計する）
+        for kind, kind_columns in KIND_COLUMNS.items():
+            columns = ", ".join(f"{name} {sql_type}" for name, sql_type in kind_columns)
+            self.conn.execute(f"""
+                CREATE TEMP TABLE incoming_{kind} (
+                    request INTEGER NOT NULL,
+                    month TEXT NOT NULL,
+                    client_id TEXT NOT NULL,
+                    {columns},
+                    PRIMARY KEY (client_id, source_id)
+                )
+            """)
+
+    def open_reader(self) -> GroupSummaries:
+        """集計の問い合わせ用に、別の接続で GroupSummaries を作る（書き込みと同時に読める）"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return GroupSummaries(conn)
+
+    def _existing_tables(self):
+        rows = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        return [r[0] for r in rows]
+
+    def _ensure_partition(self, kind: str, month: str) -> str:
+        table = f"{KIND_TABLES[kind]}_{month}"
+        if table not in self._tables:
+            columns = ", ".join(f"{name} {sql_type}" for name, sql_type in KIND_COLUMNS[kind])
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    client_id TEXT NOT NULL,
+                    {columns},
+                    PRIMARY KEY (client_id, source_id)
+                )
+            """)
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp)")
+            self._tables.add(table)
+        return table
+
+    def _group(self, batches) -> dict:
+        """行を (種類, 月) ごとに分け、形式を確かめる。違えば ValueError"""
+        grouped = {}
+        for client_id, kind, rows in batches:
+            if kind not in KIND_COLUMNS:
+                raise ValueError(f"種類が違います: {kind!r}")
+            width = len(KIND_COLUMNS[kind])
+            for row in rows:
+                if len(row) != width:
+                    raise ValueError(f"{kind} の行の列数が違います: {len(row)} (期待 {width})")
+                for (name, sql_type), value in zip(KIND_COLUMNS[kind], row):
+                    _check_value(name, sql_type, value)
+                grouped.setdefault((kind, partition_of(row[2])), []).append((client_id, *row))
+        return grouped
+
+    def write_batches(self, batches) -> int:
+        """[(client_id, kind, rows), ...] を保存し、新しく入った行数を返す
+
+        rows の各行は KIND_COLUMNS の順。種類・行の形式が違えば ValueError（何も保存しない）
+        """
+        result = self.write_many([batches])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def write_many(self, requests) -> list:
+        """複数の送信 ([batches, ...]) を1つのトランザクションで保存する
+
+        送信ごとに、新しく入った行数か、形式が違った時の ValueError を返す（形式が違う送信は何も保存しない）
+        保存に失敗した時は1つずつ保存し直し、失敗した送信には sqlite3.Error を返す（他の送信を巻き込まない）
+        """
+        results = []
+        prepared = []
+        # 先にすべての形式を確かめる（途中で失敗して一部だけ保存されないように）
+        for batches in requests:
+            try:
+                prepared.append(self._group(batches))
+                results.append(0)
+            except ValueError as e:
+                prepared.append(None)
+                results.append(e)
+
+        try:
+            with self.conn:
+                for kind, kind_columns in KIND_COLUMNS.items():
+                    # 送信をまたいで月ごとにまとめる（送信の番号 request を付けて、送信ごとの行数を数える）
+                    staged = {}
+                    for i, grouped in enumerate(prepared):
+                        for (row_kind, month), rows in (grouped or {}).items():
+                            if row_kind == kind:
+                                staged.setdefault(month, []).extend((i, month, *row) for row in rows)
+                    if not staged:
+                        continue
+                    incoming = f"temp.incoming_{kind}"
+                    names = ", ".join(["client_id"] + [name for name, _ in kind_columns])
+                    placeholders = ", ".join("?" * (len(kind_columns) + 3))
+                    for month, rows in staged.items():
+                        table = self._ensure_partition(kind, month)
+                        self.conn.executemany(f"INSERT OR IGNORE INTO {incoming} VALUES ({placeholders})", rows)
+                        self.conn.execute(f"""
+                            DELETE FROM {incoming} WHERE month = ? AND EXISTS (
+                                SELECT 1 FROM {table} p
+                                WHERE p.client_id = {incoming}.client_id AND p.source_id = {incoming}.source_id)
+                        """, (month,))
+                        self.conn.execute(f"INSERT INTO {table} SELECT {names} FROM {incoming} WHERE month = ?",
+                                          (month,))
+                    self.summaries.add_rows(kind, incoming)
+                    for i, n in self.conn.execute(f"SELECT request, COUNT(*) FROM {incoming} GROUP BY request"):
+                        results[i] += n
+                    self.conn.execute(f"DELETE FROM {incoming}")
+        except sqlite3.Error:
+            # ロールバックで作ったテーブルも消えるので、覚えている一覧を読み直す
+            self._tables = set(self._existing_tables())
+            if len(requests) == 1:
+                raise
+            return [self._write_one(batches) for batches in requests]
+        return results
+
+    def _write_one(self, batches):
+        try:
+            return self.write_many([batches])[0]
+        except sqlite3.Error as e:
+            return e
+
+    def partitions(self, kind: str):
+        """保存されている月のテーブル名（古い順）"""
+        prefix = KIND_TABLES[kind] + "_"
+        return sorted(t for t in self._tables if t.startswith(prefix) and t[len(prefix):].isdigit())
+
+    def count(self, kind: str) -> int:
+        return sum(self.conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in self.partitions(kind))
+
+    def rebuild_summaries(self):
+        """保存済みの記録からグループの集計を作り直す"""
+        self.summaries.rebuild({kind: self.partitions(kind) for kind in KIND_COLUMNS})
+
+    def close(self):
+        self.conn.close()
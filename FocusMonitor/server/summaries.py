@@ -0,0 +1,328 @@
+"""チーム（グループ）ごとの1時間単位の集計
+
+多くのユーザーの記録が1つの保存先に集まると、「今週のチームごと・1時間ごとの平均スコア」を
+毎回 score_logs から計算するのは遅すぎます。そこで、記録を受け取るたびに次の集計を差分で更新しておき、
+問い合わせは集計済みの行 (1グループ・1時間で1行) だけを読みます。
+
+- user_hourly / group_hourly:         スコアの件数・合計・2乗和・最小・最大と、detail の秒数・各カウントの合計
+- user_score_hist / group_score_hist:  スコアの度数分布 (0〜100 を1点刻み)。パーセンタイルはここから求める
+
+グループの集計は、今のメンバー全員の過去の記録を含みます（メンバーを足す・外すと、そのユーザーの
+user_hourly の分を足し引きし直す）。user_id のない行は集計しません。
+
+時間は 'YYYY-mm-dd HH:00:00'（記録の timestamp と同じ形式の文字列）。
+"""
+import sqlite3
+from datetime import datetime
+
+SCORE_BINS = 101   # スコア 0〜100 を1点刻み
+
+# 記録の種類ごとの集計列と、新しい行 (src) から作る式・既存の行への足し方
+_SCORE_COLUMNS = ["score_count", "score_sum", "score_sq_sum", "score_min", "score_max"]
+_SCORE_SELECT = "COUNT(*), SUM(score), SUM(score * score), MIN(score), MAX(score)"
+_DETAIL_COLUMNS = ["seconds", "looking_away", "sleeping", "no_face"]
+_DETAIL_SELECT = "COUNT(*), SUM(looking_away_count), SUM(sleeping_count), SUM(no_face_count)"
+_SUMMARY_COLUMNS = _SCORE_COLUMNS + _DETAIL_COLUMNS
+
+_HOUR = "substr(timestamp, 1, 13) || ':00:00'"
+_BIN = f"CAST(MIN(MAX(score, 0), {SCORE_BINS - 1}) AS INTEGER)"
+
+
+def _merge(column: str) -> str:
+    """ON CONFLICT で既存の行に足す式"""
+    if column.endswith("_min"):
+        return f"{column} = MIN(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))"
+    if column.endswith("_max"):
+        return f"{column} = MAX(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))"
+    return f"{column} = {column} + excluded.{column}"
+
+
+def _to_hour(ts) -> str:
+    """datetime / 文字列を、その時刻が入る時間の 'YYYY-mm-dd HH:00:00' にする"""
+    if isinstance(ts, datetime):
+        return ts.strftime('%Y-%m-%d %H:00:00')
+    return str(ts)[:13] + ":00:00"
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    summary = ", ".join([
+        "score_count INTEGER NOT NULL DEFAULT 0", "score_sum REAL NOT NULL DEFAULT 0",
+        "score_sq_sum REAL NOT NULL DEFAULT 0", "score_min REAL", "score_max REAL",
+        "seconds INTEGER NOT NULL DEFAULT 0", "looking_away INTEGER NOT NULL DEFAULT 0",
+        "sleeping INTEGER NOT NULL DEFAULT 0", "no_face INTEGER NOT NULL DEFAULT 0",
+    ])
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS groups (
+                group_id TEXT PRIMARY KEY,
+                name TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS group_members (
+                group_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                PRIMARY KEY (group_id, user_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id)")
+        for owner in ("user", "group"):
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {owner}_hourly (
+                    {owner}_id TEXT NOT NULL,
+                    hour TEXT NOT NULL,
+                    {summary},
+                    PRIMARY KEY ({owner}_id, hour)
+                ) WITHOUT ROWID
+            """)
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {owner}_score_hist (
+                    {owner}_id TEXT NOT NULL,
+                    hour TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY ({owner}_id, hour, bin)
+                ) WITHOUT ROWID
+            """)
+
+
+class GroupSummaries:
+    """conn: 集計のテーブルがある接続 (server.store.CollectorStore が作る)
+
+    書き込み (add_rows / メンバーの変更 / rebuild) は保存先の書き込み用スレッドから呼ぶ。
+    読み出し用には、別の接続で作ったもの (CollectorStore.open_reader) を使う。
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    # --- 書き込み ---
+
+    def add_rows(self, kind: str, source: str):
+        """新しく入った行 (source のテーブル) を集計に足す。保存と同じトランザクションの中で呼ぶ"""
+        if kind == "score":
+            columns, select = _SCORE_COLUMNS, _SCORE_SELECT
+        else:
+            columns, select = _DETAIL_COLUMNS, _DETAIL_SELECT
+        names = ", ".join(columns)
+        merge = ", ".join(_merge(c) for c in columns)
+        # WHERE は ON CONFLICT を SELECT の一部と読ませないため
+        self.conn.execute(f"""
+            INSERT INTO user_hourly (user_id, hour, {names})
+            SELECT user_id, {_HOUR}, {select} FROM {source}
+            WHERE user_id IS NOT NULL GROUP BY 1, 2
+            ON CONFLICT (user_id, hour) DO UPDATE SET {merge}
+        """)
+        self.conn.execute(f"""
+            INSERT INTO group_hourly (group_id, hour, {names})
+            SELECT m.group_id, {_HOUR}, {select} FROM {source} JOIN group_members m USING (user_id)
+            WHERE true GROUP BY 1, 2
+            ON CONFLICT (group_id, hour) DO UPDATE SET {merge}
+        """)
+        if kind != "score":
+            return
+        self.conn.execute(f"""
+            INSERT INTO user_score_hist (user_id, hour, bin, count)
+            SELECT user_id, {_HOUR}, {_BIN}, COUNT(*) FROM {source}
+            WHERE user_id IS NOT NULL GROUP BY 1, 2, 3
+            ON CONFLICT (user_id, hour, bin) DO UPDATE SET count = count + excluded.count
+        """)
+        self.conn.execute(f"""
+            INSERT INTO group_score_hist (group_id, hour, bin, count)
+            SELECT m.group_id, {_HOUR}, {_BIN}, COUNT(*) FROM {source} JOIN group_members m USING (user_id)
+            WHERE true GROUP BY 1, 2, 3
+            ON CONFLICT (group_id, hour, bin) DO UPDATE SET count = count + excluded.count
+        """)
+
+    def _add_users_to_groups(self, where: str = "true", params=()):
+        """user_hourly の行を、そのユーザーが入っているグループの集計に足す"""
+        names = ", ".join(_SUMMARY_COLUMNS)
+        sums = ", ".join(f"{'MIN' if c.endswith('_min') else 'MAX' if c.endswith('_max') else 'SUM'}(u.{c})"
+                         for c in _SUMMARY_COLUMNS)
+        merge = ", ".join(_merge(c) for c in _SUMMARY_COLUMNS)
+        self.conn.execute(f"""
+            INSERT INTO group_hourly (group_id, hour, {names})
+            SELECT m.group_id, u.hour, {sums} FROM user_hourly u JOIN group_members m USING (user_id)
+            WHERE {where} GROUP BY 1, 2
+            ON CONFLICT (group_id, hour) DO UPDATE SET {merge}
+        """, params)
+        self.conn.execute(f"""
+            INSERT INTO group_score_hist (group_id, hour, bin, count)
+            SELECT m.group_id, u.hour, u.bin, SUM(u.count) FROM user_score_hist u JOIN group_members m USING (user_id)
+            WHERE {where} GROUP BY 1, 2, 3
+            ON CONFLICT (group_id, hour, bin) DO UPDATE SET count = count + excluded.count
+        """, params)
+
+    def set_group(self, group_id: str, name: str = None):
+        """グループを作る（あれば名前を変える）"""
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO groups (group_id, name) VALUES (?, ?)
+                ON CONFLICT (group_id) DO UPDATE SET name = COALESCE(excluded.name, name)
+            """, (group_id, name))
+
+    def add_members(self, group_id: str, user_ids) -> int:
+        """メンバーを足し、その人の過去の記録をグループの集計に足す。新しく入った人数を返す"""
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO groups (group_id) VALUES (?)", (group_id,))
+            added = [u for u in dict.fromkeys(user_ids) if self.conn.execute(
+                "INSERT OR IGNORE INTO group_members (group_id, user_id) VALUES (?, ?)", (group_id, u)).rowcount]
+            for user_id in added:
+                self._add_users_to_groups("m.group_id = ? AND u.user_id = ?", (group_id, user_id))
+        return len(added)
+
+    def remove_members(self, group_id: str, user_ids) -> int:
+        """メンバーを外し、その人の記録をグループの集計から引く。外した人数を返す"""
+        with self.conn:
+            removed = [u for u in dict.fromkeys(user_ids) if self.conn.execute(
+                "DELETE FROM group_members WHERE group_id = ? AND user_id = ?", (group_id, u)).rowcount]
+            for user_id in removed:
+                self._subtract_user(group_id, user_id)
+        return len(removed)
+
+    def _subtract_user(self, group_id: str, user_id: str):
+        sums = [c for c in _SUMMARY_COLUMNS if not c.endswith(("_min", "_max"))]
+        self.conn.execute(f"""
+            UPDATE group_hourly AS g SET {", ".join(f"{c} = g.{c} - u.{c}" for c in sums)}
+            FROM user_hourly AS u
+            WHERE g.group_id = ? AND u.user_id = ? AND g.hour = u.hour
+        """, (group_id, user_id))
+        self.conn.execute("""
+            UPDATE group_score_hist AS g SET count = g.count - u.count
+            FROM user_score_hist AS u
+            WHERE g.group_id = ? AND u.user_id = ? AND g.hour = u.hour AND g.bin = u.bin
+        """, (group_id, user_id))
+        # 最小・最大は引けないので、その人の記録がある時間だけ残りのメンバーから求め直す
+        self.conn.execute("""
+            UPDATE group_hourly AS g SET score_min = r.score_min, score_max = r.score_max
+            FROM (
+                SELECT u.hour, MIN(u.score_min) AS score_min, MAX(u.score_max) AS score_max
+                FROM user_hourly u JOIN group_members m USING (user_id)
+                WHERE m.group_id = ?1 AND u.hour IN (SELECT hour FROM user_hourly WHERE user_id = ?2)
+                GROUP BY u.hour
+            ) AS r
+            WHERE g.group_id = ?1 AND g.hour = r.hour
+        """, (group_id, user_id))
+        self.conn.execute("""
+            DELETE FROM group_hourly
+            WHERE group_id = ?1 AND score_count = 0 AND seconds = 0
+              AND hour IN (SELECT hour FROM user_hourly WHERE user_id = ?2)
+        """, (group_id, user_id))
+        self.conn.execute("DELETE FROM group_score_hist WHERE group_id = ? AND count = 0", (group_id,))
+
+    def rebuild(self, partitions: dict):
+        """保存済みの記録から集計をすべて作り直す（集計を入れる前の記録がある時や、確かめる時）
+
+        partitions: {種類: [テーブル名, ...]}
+        """
+        with self.conn:
+            for table in ("user_hourly", "group_hourly", "user_score_hist", "group_score_hist"):
+                self.conn.execute(f"DELETE FROM {table}")
+            # ユーザーの集計を作ってから、それをグループに足す
+            members = self.conn.execute("SELECT group_id, user_id FROM group_members").fetchall()
+            self.conn.execute("DELETE FROM group_members")
+            for kind, tables in partitions.items():
+                for table in tables:
+                    self.add_rows(kind, table)
+            self.conn.executemany("INSERT INTO group_members (group_id, user_id) VALUES (?, ?)", members)
+            self._add_users_to_groups()
+
+    # --- 読み出し ---
+
+    def list_groups(self):
+        rows = self.conn.execute("""
+            SELECT g.group_id, g.name, COUNT(m.user_id) FROM groups g
+            LEFT JOIN group_members m USING (group_id)
+            GROUP BY g.group_id ORDER BY g.group_id
+        """).fetchall()
+        return [{"group_id": r[0], "name": r[1], "members": r[2]} for r in rows]
+
+    def members(self, group_id: str):
+        rows = self.conn.execute("SELECT user_id FROM group_members WHERE group_id = ? ORDER BY user_id",
+                                 (group_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def trend(self, group_id: str, start, end, bucket: str = "hour"):
+        """期間 [start, end) のグループの推移を古い順に返す（start, end は時間単位に切り下げる）
+
+        bucket: "hour"（1時間ごと）または "day"（1日ごと）
+        各行: period, score_count, score_mean, score_std, score_min, score_max,
+              seconds, looking_away, sleeping, no_face
+        """
+        if bucket not in ("hour", "day"):
+            raise ValueError(f"bucket は hour か day です: {bucket!r}")
+        period = "hour" if bucket == "hour" else "substr(hour, 1, 10)"
+        rows = self.conn.execute(f"""
+            SELECT {period}, SUM(score_count), SUM(score_sum), SUM(score_sq_sum), MIN(score_min), MAX(score_max),
+                   SUM(seconds), SUM(looking_away), SUM(sleeping), SUM(no_face)
+            FROM group_hourly
+            WHERE group_id = ? AND hour >= ? AND hour < ?
+            GROUP BY 1 ORDER BY 1
+        """, (group_id, _to_hour(start), _to_hour(end))).fetchall()
+        result = []
+        for period_key, n, total, sq_total, low, high, seconds, looking_away, sleeping, no_face in rows:
+            mean = total / n if n else None
+            std = max(sq_total / n - mean * mean, 0.0) ** 0.5 if n else None
+            result.append({
+                "period": period_key,
+                "score_count": n,
+                "score_mean": mean,
+                "score_std": std,
+                "score_min": low,
+                "score_max": high,
+                "seconds": seconds,
+                "looking_away": looking_away,
+                "sleeping": sleeping,
+                "no_face": no_face,
+            })
+        return result
+
+    def percentiles(self, group_id: str, start, end, qs=(10, 50, 90)) -> dict:
+        """期間 [start, end) のグループのスコアのパーセンタイル {q: 値}
+
+        度数分布の各スコアを1点刻みの値 (bin) として並べ、numpy.percentile の既定 (linear) と同じく
+        前後の値の間で補間する（結果は記録のある bin の範囲に収まる）。記録がなければ各値は None
+        """
+        rows = self.conn.execute("""
+            SELECT bin, SUM(count) FROM group_score_hist
+            WHERE group_id = ? AND hour >= ? AND hour < ?
+            GROUP BY bin HAVING SUM(count) > 0 ORDER BY bin
+        """, (group_id, _to_hour(start), _to_hour(end))).fetchall()
+        total = sum(count for _, count in rows)
+
+        def value_at(rank: int) -> float:
+            """小さい方から rank 番目 (0 始まり) の値"""
+            cumulative = 0
+            for bin_value, count in rows:
+                cumulative += count
+                if rank < cumulative:
+                    return float(bin_value)
+            return float(rows[-1][0])
+
+        result = {}
+        for q in qs:
+            if total == 0:
+                result[q] = None
+                continue
+            rank = (total - 1) * q / 100
+            lower = int(rank)
+            low_value = value_at(lower)
+            high_value = value_at(min(lower + 1, total - 1))
+            result[q] = low_value + (high_value - low_value) * (rank - lower)
+        return result
+
+    def compare(self, start, end):
+        """期間 [start, end) の全グループの平均スコアなど（グループの一覧画面用）"""
+        rows = self.conn.execute("""
+            SELECT g.group_id, g.name, SUM(h.score_count), SUM(h.score_sum), SUM(h.seconds), SUM(h.sleeping)
+            FROM groups g LEFT JOIN group_hourly h ON h.group_id = g.group_id AND h.hour >= ? AND h.hour < ?
+            GROUP BY g.group_id ORDER BY g.group_id
+        """, (_to_hour(start), _to_hour(end))).fetchall()
+        return [{
+            "group_id": group_id,
+            "name": name,
+            "score_count": n or 0,
+            "score_mean": total / n if n else None,
+            "seconds": seconds or 0,
+            "sleeping": sleeping or 0,
+        } for group_id, name, n, total, seconds, sleeping in rows]
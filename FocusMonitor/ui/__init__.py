@@ -1,2 +1,2 @@
 # ui パッケージ
-__all__ = ["main_window", "components", "styles"]
+__all__ = ["main_window", "components", "styles", "overlay", "frame_dispatcher", "history_model"]
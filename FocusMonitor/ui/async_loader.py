@@ -0,0 +1,90 @@
+"""重い処理（DB読み込み・集計）をバックグラウンドで実行するための仕組み
+
+QThreadPool で関数を実行し、結果は Qt のシグナル経由で GUI スレッドのコールバックに渡します。
+処理は「チャンネル」ごとに管理し、同じチャンネルに新しい要求が来たら古い要求はキャンセルします。
+（ボタンを連打しても、最後に押した画面の結果だけが反映される）
+"""
+import traceback
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+
+class _Task(QRunnable):
+    """QThreadPool で実行する1件の処理"""
+
+    def __init__(self, loader, channel, request_id, fn, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)   # 参照は AsyncLoader 側で管理する
+        self.loader = loader
+        self.channel = channel
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result, error = self.fn(*self.args, **self.kwargs), None
+        except Exception as e:
+            traceback.print_exc()
+            result, error = None, e
+        if self.cancelled:
+            return
+        # 別スレッドからの emit なので、GUI スレッド側のスロットにはキュー経由で届く
+        self.loader.task_finished.emit(self.channel, self.request_id, (result, error))
+
+
+class AsyncLoader(QObject):
+    task_finished = Signal(str, int, object)  # (channel, request_id, (result, error))
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._next_id = 0
+        self._tasks = {}        # channel -> 実行中/待機中の _Task
+        self._callbacks = {}    # request_id -> (on_done, on_error)
+        self.task_finished.connect(self._on_task_finished)
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None, **kwargs) -> int:
+        """fn(*args, **kwargs) をバックグラウンドで実行する
+
+        同じチャンネルの古い要求はキャンセルされ、結果も捨てられる。
+        on_done(result) / on_error(exception) は GUI スレッドで呼ばれる。
+        """
+        self.cancel(channel)
+        self._next_id += 1
+        request_id = self._next_id
+        task = _Task(self, channel, request_id, fn, args, kwargs)
+        self._tasks[channel] = task
+        self._callbacks[request_id] = (on_done, on_error)
+        self.pool.start(task)
+        return request_id
+
+    def cancel(self, channel):
+        """チャンネルの要求をキャンセルする（実行中なら結果を捨てる）"""
+        task = self._tasks.pop(channel, None)
+        if task is None:
+            return
+        task.cancelled = True
+        self.pool.tryTake(task)  # まだ開始していなければキューから外す
+        self._callbacks.pop(task.request_id, None)
+
+    def is_busy(self, channel) -> bool:
+        return channel in self._tasks
+
+    @Slot(str, int, object)
+    def _on_task_finished(self, channel, request_id, payload):
+        result, error = payload
+        task = self._tasks.get(channel)
+        if task is None or task.request_id != request_id:
+            return  # 新しい要求に置き換わっている
+        del self._tasks[channel]
+        on_done, on_error = self._callbacks.pop(request_id, (None, None))
+        if error is not None:
+            if on_error:
+                on_error(error)
+            return
+        if on_done:
+            on_done(result)
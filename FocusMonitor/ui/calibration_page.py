@@ -1,7 +1,9 @@
-import cv2
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel
-from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QImage, QPixmap, QFont
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont
+from ui.components import VideoWidget
+from ui.overlay import draw_landmarks, OVERLAY_NONE
+from config import LANDMARK_OVERLAY_LEVEL
 
 class CalibrationPage(QWidget):
     def __init__(self, detector=None):
@@ -9,7 +11,7 @@ class CalibrationPage(QWidget):
         self.setStyleSheet("background-color: #1a5276; color: white;")
         self.main_layout = QVBoxLayout(self)
         self.detector = detector  # detectorインスタンスを保持
-        self.frame_update_timer = None  # フレーム更新タイマー
+        self.overlay_level = LANDMARK_OVERLAY_LEVEL  # ランドマーク重畳表示のレベル
         
         # --- ヘッダー ---
         header_layout = QHBoxLayout()
@@ -35,11 +37,9 @@ class CalibrationPage(QWidget):
         camera_area = QHBoxLayout()
         camera_area.addStretch()
         
-        self.camera_label = QLabel("カメラ待機中")
-        self.camera_label.setFixedSize(500, 500)
-        self.camera_label.setStyleSheet("background-color: #ddd; border: 2px solid black;")
-        self.camera_label.setAlignment(Qt.AlignCenter)
-        camera_area.addWidget(self.camera_label)
+        self.video_widget = VideoWidget(placeholder="カメラ待機中")
+        self.video_widget.setFixedSize(500, 500)
+        camera_area.addWidget(self.video_widget)
         
         camera_area.addStretch()
         content_layout.addLayout(camera_area)
@@ -53,68 +53,28 @@ class CalibrationPage(QWidget):
         
         content_layout.addStretch()
         self.main_layout.addLayout(content_layout)
-        
-        # フレーム更新タイマーの初期化
-        if self.detector:
-            self.frame_update_timer = QTimer()
-            self.frame_update_timer.timeout.connect(self.update_frame_from_detector)
-            self.frame_update_timer.start(50)  # 50ms = 5fps で更新
+
     
-    def update_frame_from_detector(self):
-        """detectorから最新フレームを取得して表示"""
-        if not self.detector:
+    def on_frame(self, frame, landmarks, seq):
+        """FrameDispatcher から新しいフレームを受け取って表示（このページが表示中の時だけ呼ばれる）"""
+        if seq == self.video_widget.frame_seq:
             return
+
+        # ランドマークを描画（元のフレームに影響しないよう、描画する時だけコピー）
+        if landmarks is not None and self.overlay_level != OVERLAY_NONE:
+            frame = self._draw_landmarks(frame.copy(), landmarks)
         
-        frame = self.detector.get_latest_frame()
-        if frame is not None:
-            # フレームのコピーを作成（元のフレームに影響しないように）
-            display_frame = frame.copy()
-            
-            # ランドマーク情報を取得
-            landmarks = self.detector.get_latest_landmarks()
-            
-            # ランドマークを描画
-            if landmarks is not None:
-                display_frame = self._draw_landmarks(display_frame, landmarks)
-            
-            # OpenCV形式 (BGR) → RGB に変換
-            rgb_frame = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-            
-            # RGB → QImage に変換
-            h, w, ch = rgb_frame.shape
-            bytes_per_line = 3 * w
-            qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            
-            # QLabel に表示
-            pixmap = QPixmap.fromImage(qt_image)
-            self.camera_label.setPixmap(pixmap.scaled(500, 500, Qt.KeepAspectRatio))
+        # BGR のまま VideoWidget に渡す（変換・縮小は描画時に行う）
+        self.video_widget.set_frame(frame, seq)
     
     def _draw_landmarks(self, frame, landmarks):
         """フレーム上にランドマークを描画
         
         Args:
             frame: OpenCV形式のフレーム (BGR)
-            landmarks: MediaPipeのランドマークリスト
+            landmarks: (N,3) float32 の正規化ランドマーク配列
             
         Returns:
             ランドマークが描画されたフレーム
         """
-        h, w = frame.shape[:2]
-        
-        # ランドマークを描画（各点を円で表示）
-        for landmark in landmarks:
-            # ランドマークの座標を画像ピクセル座標に変換
-            x = int(landmark.x * w)
-            y = int(landmark.y * h)
-            
-            # 座標が画像内に収まっているかチェック
-            if 0 <= x < w and 0 <= y < h:
-                # 黄色い円を描画 (BGR形式なので (0, 255, 255) は黄色)
-                cv2.circle(frame, (x, y), 2, (0, 255, 255), -1)
-        
-        return frame
-    
-    def cleanup(self):
-        """画面を離れる時のクリーンアップ"""
-        if self.frame_update_timer:
-            self.frame_update_timer.stop()
+        return draw_landmarks(frame, landmarks, self.overlay_level)
@@ -1,21 +1,223 @@
 """UI コンポーネント（カメラ表示やグラフなど）の部品を定義する場所
 
-ここではスケルトンのクラスだけ用意します。
+VideoWidget はカメラ映像を、GraphWidget はスコアの推移を QPainter で描画するウィジェットです。
+AlertBanner は居眠り・不在の即時アラートを画面上部に表示します。
 """
-from PySide6.QtWidgets import QWidget
+import time
+import numpy as np
+from PySide6.QtWidgets import QWidget, QLabel, QApplication
+from PySide6.QtCore import Qt, QPointF, Signal
+from PySide6.QtGui import QImage, QPainter, QColor, QPen, QPolygonF
+
+from core.latency import TRACER, STAGE_ALERT
+
+# OpenCV の BGR 配列をそのまま包める形式 (Qt 5.14 以降)。無い環境では RGB に並べ替える
+_BGR_FORMAT = getattr(QImage, "Format_BGR888", None)
 
 
 class VideoWidget(QWidget):
-    """カメラフレームを描画するウィジェットの骨組み"""
+    """カメラフレームを描画するウィジェット
+
+    - フレーム (BGR の ndarray) をコピーせずに QImage で包む
+    - 拡大縮小は paintEvent 内で QPainter の変換行列に任せる
+    - フレーム番号 (seq) が変わった時だけ再描画を要求する
+    """
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, placeholder="カメラ待機中",
+                 background="#dddddd", border="#000000"):
         super().__init__(parent)
-        # TODO: QPainter を使ってフレームを描画する実装を追加
+        self._frame = None          # QImage が参照するバッファ (寿命を保つため保持)
+        self._image = None          # フレームを包んだ QImage
+        self._seq = None            # 表示中のフレーム番号
+        self._placeholder = placeholder
+        self._background = QColor(background)
+        self._border = QColor(border)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    @property
+    def frame_seq(self):
+        """表示中のフレーム番号"""
+        return self._seq
+
+    def set_frame(self, frame, seq=None) -> bool:
+        """新しいフレームを設定する
+
+        frame: OpenCV形式 (BGR, uint8, HxWx3) のフレーム。None で待機表示に戻す
+        seq: フレーム番号。前回と同じなら何もしない
+        戻り値: 再描画を要求したら True
+        """
+        if seq is not None and seq == self._seq:
+            return False
+        self._seq = seq
+
+        if frame is None:
+            self._frame = None
+            self._image = None
+        else:
+            if _BGR_FORMAT is None:
+                frame = np.ascontiguousarray(frame[..., ::-1])
+            elif not frame.flags['C_CONTIGUOUS']:
+                frame = np.ascontiguousarray(frame)
+            h, w = frame.shape[:2]
+            fmt = _BGR_FORMAT if _BGR_FORMAT is not None else QImage.Format_RGB888
+            self._frame = frame
+            self._image = QImage(frame.data, w, h, frame.strides[0], fmt)
+
+        self.update()
+        return True
+
+    def clear(self):
+        """待機表示に戻す"""
+        self.set_frame(None)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect()
+        painter.fillRect(rect, self._background)
+
+        if self._image is None:
+            painter.setPen(Qt.black)
+            painter.drawText(rect, Qt.AlignCenter, self._placeholder)
+        else:
+            iw, ih = self._image.width(), self._image.height()
+            scale = min(rect.width() / iw, rect.height() / ih)
+            # アスペクト比を保って中央に配置 (拡大縮小は描画時に行う)
+            painter.save()
+            painter.translate((rect.width() - iw * scale) / 2, (rect.height() - ih * scale) / 2)
+            painter.scale(scale, scale)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawImage(0, 0, self._image)
+            painter.restore()
+
+        painter.setPen(self._border)
+        painter.drawRect(rect.adjusted(0, 0, -1, -1))
+        painter.end()
 
 
 class GraphWidget(QWidget):
-    """スコアの時系列グラフを表示するウィジェットの骨組み"""
+    """スコアの時系列グラフを表示するウィジェット
+
+    matplotlib を使わず QPainter で直接描く軽量な折れ線グラフ。
+    append() は固定長のリングバッファに1点書き込んで再描画を要求するだけなので、1秒ごとの更新でも軽い。
+    最新の点が右端に来るようにスクロール表示する。
+    """
+
+    def __init__(self, parent=None, capacity=300, y_range=(0.0, 100.0),
+                 line_color="#2ecc71", background="#ffffff", grid_color="#cccccc"):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.y_min, self.y_max = y_range
+        self._values = np.zeros(capacity, dtype=np.float32)  # リングバッファ
+        self._head = 0      # 次に書き込む位置
+        self._count = 0     # 有効な点の数
+        self._line_color = QColor(line_color)
+        self._background = QColor(background)
+        self._grid_color = QColor(grid_color)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setMinimumHeight(120)
+
+    def append(self, value):
+        """1点追加する（古い点は capacity を超えたら押し出される）"""
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.update()
+
+    def set_values(self, values):
+        """まとめて置き換える（初期表示用）"""
+        self.clear()
+        for v in list(values)[-self.capacity:]:
+            self._values[self._head] = v
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        self.update()
 
-    def __init__(self, parent=None):
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        self.update()
+
+    def values(self):
+        """古い順に並べた有効な値 (ndarray)"""
+        start = (self._head - self._count) % self.capacity
+        idx = (start + np.arange(self._count)) % self.capacity
+        return self._values[idx]
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect()
+        painter.fillRect(rect, self._background)
+
+        w, h = rect.width(), rect.height()
+        span = (self.y_max - self.y_min) or 1.0
+
+        # 目盛り線 (0 / 50 / 100 のように4等分)
+        painter.setPen(QPen(self._grid_color, 1, Qt.DashLine))
+        for i in range(5):
+            y = h - 1 - (h - 1) * i / 4
+            painter.drawLine(QPointF(0, y), QPointF(w, y))
+
+        vals = self.values()
+        if len(vals) > 0:
+            # 右端が最新になるように x 座標を割り当てる
+            dx = w / max(1, self.capacity - 1)
+            xs = w - 1 - dx * np.arange(len(vals) - 1, -1, -1)
+            ys = (h - 1) - (np.clip(vals, self.y_min, self.y_max) - self.y_min) / span * (h - 1)
+            polyline = QPolygonF([QPointF(float(x), float(y)) for x, y in zip(xs, ys)])
+
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(self._line_color, 2))
+            painter.drawPolyline(polyline)
+
+            painter.setPen(Qt.black)
+            painter.drawText(rect.adjusted(4, 2, -4, -2), Qt.AlignTop | Qt.AlignRight, f"{vals[-1]:.0f}")
+
+        painter.end()
+
+
+class AlertBanner(QLabel):
+    """即時アラートの帯表示
+
+    show_alert(AlertData) はどのスレッドから呼んでもよい（シグナル経由で GUI スレッドに渡す）。
+    発生で表示、同じ種類の解除で非表示にする。sound_hook は発生時に呼ばれる（None なら鳴らさない）。
+    """
+    alert_received = Signal(object)
+
+    def __init__(self, parent=None, messages=None, sound_hook=None, latency_budget_ms=300):
         super().__init__(parent)
-        # TODO: matplotlib / pyqtgraph などで実装
+        self.messages = messages or {}
+        self.sound_hook = sound_hook
+        self.latency_budget_ms = latency_budget_ms
+        self.last_latency_ms = None     # 最後に表示したアラートの「撮影→表示」の時間
+        self._active = []               # 表示中のアラートの種類（新しい順）
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("background-color: #d9534f; color: white; font-size: 16px; font-weight: bold; padding: 8px;")
+        self.hide()
+        self.alert_received.connect(self._on_alert)
+
+    def show_alert(self, alert):
+        self.alert_received.emit(alert)
+
+    def _on_alert(self, alert):
+        if alert.active:
+            if alert.alert_type not in self._active:
+                self._active.insert(0, alert.alert_type)
+            self.last_latency_ms = (time.perf_counter() - alert.captured_at) * 1000
+            TRACER.record(STAGE_ALERT, self.last_latency_ms / 1000)
+            if self.last_latency_ms > self.latency_budget_ms:
+                print(f"AlertBanner: 表示までに {self.last_latency_ms:.0f} ms かかりました")
+            if self.sound_hook:
+                self.sound_hook(alert)
+        elif alert.alert_type in self._active:
+            self._active.remove(alert.alert_type)
+
+        if self._active:
+            self.setText(" / ".join(self.messages.get(t, t) for t in self._active))
+            self.show()
+        else:
+            self.hide()
+
+
+def beep(alert=None):
+    """標準のアラート音（AlertBanner.sound_hook 用）"""
+    QApplication.beep()
@@ -1,28 +1,42 @@
-import cv2
 import random
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QPushButton, QTextEdit, QStackedWidget, QTableWidget, 
-                             QTableWidgetItem, QHeaderView)
-from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QImage, QPixmap, QFont
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+                             QPushButton, QTextEdit, QStackedWidget, QTableView, 
+                             QHeaderView, QAbstractItemView)
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont
 from database.db_manager import DBManager
-from config import HISTORY_DISPLAY_COUNT
+from config import HISTORY_DISPLAY_COUNT, LANDMARK_OVERLAY_LEVEL
+from ui.components import VideoWidget, GraphWidget
+from ui.history_model import HistoryTableModel
+from ui.async_loader import AsyncLoader
+from core.score_stats import STATE_LABELS, load_score_arrays, compute_period_stats, period_range
+from ui.overlay import draw_landmarks, next_level, OVERLAY_LABELS, OVERLAY_NONE
+from core.calculator import Calculator
+from common.event_bus import TOPIC_ONE_SEC, TOPIC_SCORE
 
-plt.rcParams['font.family'] = 'MS Gothic'
+LIVE_GRAPH_SECONDS = 300  # 「現在」画面のライブグラフに表示する秒数
+LIVE_SCORE_WINDOW = 60    # ライブスコアを計算する直近の秒数
+RECENT_SCORE_COUNT = 10   # 「現在」画面に表示するスコアの件数
 
 class DashboardPage(QWidget):
-    def __init__(self, detector=None, main_window=None):
+    def __init__(self, detector=None, main_window=None, event_bus=None):
         super().__init__()
         self.setStyleSheet("background-color: #1a5276; color: white;") # スライド背景色
         self.main_layout = QVBoxLayout(self)
         self.detector = detector  # detectorインスタンスを保持
         self.main_window = main_window  # MainWindowインスタンスを保持
-        self.frame_update_timer = None  # タイマー用
         self.db_manager = DBManager()  # DBManagerインスタンスを保持
+        self.loader = AsyncLoader(self)  # DB読み込み・集計はバックグラウンドで行う
+        self.overlay_level = LANDMARK_OVERLAY_LEVEL  # ランドマーク重畳表示のレベル
+        self.calculator = Calculator()  # ライブスコア計算用
+
+        # --- 画面側で持つ直近データ（DBは初回表示の時だけ読む） ---
+        self.recent_scores = deque(maxlen=RECENT_SCORE_COUNT)  # (timestamp, score, reaving_ratio) 古い順
+        self.recent_loaded = False      # DBからの初回読み込みが済んだか
+        self._pending_scores = []       # 初回読み込み中に届いたスコア
+        self.live_window = deque(maxlen=LIVE_SCORE_WINDOW)  # 直近の OneSecData
 
         # --- 1. ヘッダー (ログインID / 再キャリブ / 各種切替ボタン) ---
         header_top = QHBoxLayout()
@@ -33,8 +47,14 @@ class DashboardPage(QWidget):
         self.recal_btn.setStyleSheet("background-color: white; color: black; border: 1px solid black; padding: 5px;")
         self.recal_btn.clicked.connect(self.start_calibration)
         
+        self.overlay_btn = QPushButton()
+        self.overlay_btn.setStyleSheet("background-color: white; color: black; border: 1px solid black; padding: 5px;")
+        self.overlay_btn.clicked.connect(self.toggle_overlay_level)
+        self._update_overlay_button()
+
         header_top.addWidget(self.user_label)
         header_top.addWidget(self.recal_btn)
+        header_top.addWidget(self.overlay_btn)
         header_top.addStretch()
 
         self.history_btn = QPushButton("履歴")
@@ -64,11 +84,9 @@ class DashboardPage(QWidget):
         face_title.setStyleSheet("font-size: 16px; font-weight: bold;")
         left_cam_layout.addWidget(face_title)
 
-        self.camera_label = QLabel("カメラ待機中")
-        self.camera_label.setFixedSize(400, 400)
-        self.camera_label.setStyleSheet("background-color: #ddd; border: 2px solid black; color: black;")
-        self.camera_label.setAlignment(Qt.AlignCenter)
-        left_cam_layout.addWidget(self.camera_label)
+        self.video_widget = VideoWidget(placeholder="カメラ待機中")
+        self.video_widget.setFixedSize(400, 400)
+        left_cam_layout.addWidget(self.video_widget)
         left_cam_layout.addStretch()
         content_main_layout.addLayout(left_cam_layout)
 
@@ -78,6 +96,9 @@ class DashboardPage(QWidget):
         # A. 現在 (リスト表示)
         self.page_now = QWidget()
         now_v = QVBoxLayout(self.page_now)
+        now_v.addWidget(QLabel("直近のスコア推移 (1秒ごと)"))
+        self.live_graph = GraphWidget(capacity=LIVE_GRAPH_SECONDS)
+        now_v.addWidget(self.live_graph)
         now_v.addWidget(QLabel("スコア"))
         self.score_log = QTextEdit()
         self.score_log.setReadOnly(True)
@@ -88,36 +109,43 @@ class DashboardPage(QWidget):
 
         # B. 統計 (円グラフ + 棒グラフ)
         self.page_stats = QWidget()
-        stats_v = QVBoxLayout(self.page_stats)
-        self.fig = Figure(figsize=(5, 8), facecolor='#1a5276')
-        self.canvas = FigureCanvas(self.fig)
-        stats_v.addWidget(self.canvas)
+        self.stats_layout = QVBoxLayout(self.page_stats)
+        self.fig = None     # matplotlib は統計画面を初めて開いた時に読み込む
+        self.canvas = None
         self.right_stack.addWidget(self.page_stats) # Index 1
 
         # C. 履歴 (テーブル)
         self.page_history = QWidget()
         hist_v = QVBoxLayout(self.page_history)
         hist_v.addWidget(QLabel("過去の履歴"))
-        self.history_table = QTableWidget(HISTORY_DISPLAY_COUNT, 2)
-        self.history_table.setHorizontalHeaderLabels(["平均スコア", "状態"])
+        self.history_model = HistoryTableModel(self.db_manager, self.get_status,
+                                               page_size=HISTORY_DISPLAY_COUNT, loader=self.loader)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # 行の高さを固定にして、行数が増えても高さ計算をしないようにする
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.history_table.setStyleSheet("background-color: white; color: black;")
+        # メモリに持つページ数には上限があるので、先頭側を捨てた後に上へ戻ったら読み直す
+        self.history_table.setVerticalScrollMode(QAbstractItemView.ScrollPerItem)
+        self.history_table.verticalScrollBar().valueChanged.connect(self._on_history_scrolled)
+        self.history_model.rows_shifted_above.connect(self._on_history_rows_shifted)
         hist_v.addWidget(self.history_table)
         self.right_stack.addWidget(self.page_history) # Index 2
 
         content_main_layout.addWidget(self.right_stack)
         self.main_layout.addLayout(content_main_layout)
 
-        self.worker = None
         self.update_view_mode("現在")
-        
-        # フレーム更新タイマーの初期化
-        if self.detector:
-            self.frame_update_timer = QTimer()
-            self.frame_update_timer.timeout.connect(self.update_frame_from_detector)
-            self.frame_update_timer.start(50)  # 50ms = 5fps で更新
+
+        # 集計結果の購読（MainApp が GUI スレッドから配信する）
+        if event_bus is not None:
+            event_bus.subscribe(TOPIC_ONE_SEC, self.on_one_sec_data)
+            event_bus.subscribe(TOPIC_SCORE, self.on_new_score)
 
     def update_view_mode(self, period):
+        # 前の画面の読み込みが終わっていなければ捨てる（最後に押した画面だけ反映）
+        self.loader.cancel("stats")
         if period == "現在":
             self.right_stack.setCurrentIndex(0)
             self.refresh_current_view()
@@ -129,7 +157,25 @@ class DashboardPage(QWidget):
             self.draw_stats_graphs(period)
     
     def refresh_current_view(self):
-        """現在訪啊を更新（main.pyからの直接呼び出し用）"""
+        """現在訪啊を更新。初回だけDBから直近のスコアをバックグラウンドで読み込み、以降は手元のデータで表示する"""
+        if self.recent_loaded:
+            self.score_log.setPlainText(self.generate_dummy_list())
+            return
+        if not self.loader.is_busy("now"):
+            self.loader.submit("now", self.db_manager.get_recent_scores, limit=RECENT_SCORE_COUNT,
+                               on_done=self._on_recent_scores_loaded)
+
+    def _on_recent_scores_loaded(self, rows):
+        """DBから読んだ直近のスコア（新しい順）を手元に持ち、読み込み中に届いた分を足す"""
+        self.recent_scores.clear()
+        for row in reversed(rows):
+            self.recent_scores.append((row['timestamp'], row['score'], row.get('reaving_ratio', 0) or 0))
+        newest = self.recent_scores[-1][0] if self.recent_scores else ""
+        for item in self._pending_scores:
+            if item[0] > newest:
+                self.recent_scores.append(item)
+        self._pending_scores = []
+        self.recent_loaded = True
         self.score_log.setPlainText(self.generate_dummy_list())
 
     def get_status(self, score, reaving_ratio):
@@ -146,13 +192,9 @@ class DashboardPage(QWidget):
             return "非集中"
 
     def generate_dummy_list(self):
-        """DBから最近のスコアを取得して表示"""
-        recent_scores = self.db_manager.get_recent_scores(limit=10)
+        """手元に持っている直近のスコアから表示用の文字列を作る（新しい順）"""
         lines = []
-        for score_data in recent_scores:
-            timestamp = score_data['timestamp']
-            score = score_data['score']
-            reaving_ratio = score_data.get('reaving_ratio', 0) or 0  # NullやNoneの場合は0
+        for timestamp, score, reaving_ratio in reversed(self.recent_scores):
             status = self.get_status(score, reaving_ratio)
             lines.append(f"{timestamp}  {score:.1f}  {status}")
         
@@ -161,236 +203,152 @@ class DashboardPage(QWidget):
             return "スコアデータが利用できません"
         return "\n".join(lines)
 
+    def on_one_sec_data(self, one_sec_data):
+        """1秒ごとの集計を受け取り、直近60秒のスコアをライブグラフに追加"""
+        self.live_window.append(one_sec_data)
+        live_score = self.calculator.calculate_score(list(self.live_window))
+        self.append_live_score(live_score.concentration_score)
+
+    def append_live_score(self, score):
+        """1秒ごとのスコアをライブグラフに追加"""
+        self.live_graph.append(score)
+
+    def _ensure_stats_canvas(self):
+        """統計グラフ用の matplotlib を遅延読み込みしてキャンバスを用意する"""
+        if self.canvas is not None:
+            return
+        import matplotlib
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        matplotlib.rcParams['font.family'] = 'MS Gothic'
+        self.fig = Figure(figsize=(5, 8), facecolor='#1a5276')
+        self.canvas = FigureCanvas(self.fig)
+        self.stats_layout.addWidget(self.canvas)
+
     def draw_stats_graphs(self, period):
-        """日・週・月用のグラフ描画（時間帯ごとの最大スコアを表示）"""
+        """日・週・月用のグラフ描画（時間帯ごとの最大スコアを表示）
+
+        DB読み込みと集計はバックグラウンドで行い、描画だけ GUI スレッドで行う。
+        """
+        self.loader.submit("stats", self._load_period_stats, period,
+                           on_done=lambda result: self._render_stats_graphs(period, result))
+
+    def _load_period_stats(self, period):
+        """期間のスコアを読み込んで集計する（バックグラウンドで実行）
+
+        戻り値: PeriodStats。データがなければ None
+        """
+        # 期間内のスコアだけを時刻インデックスで範囲検索する
+        start, end = period_range(period)
+        period_scores = self.db_manager.get_scores_between(start, end)
+        if not period_scores:
+            return None
+        # タイムスタンプ・スコアを配列に変換して、全時間帯をまとめて集計
+        return compute_period_stats(load_score_arrays(period_scores), period)
+
+    def _render_stats_graphs(self, period, stats):
+        """集計結果をグラフに描画する（GUI スレッド）"""
+        self._ensure_stats_canvas()
         self.fig.clear()
-        recent_scores = self.db_manager.get_recent_scores(limit=1000)  # より多くのデータを取得
         
-        if not recent_scores:
-            ax = self.fig.add_subplot(111)
-            ax.set_facecolor('#1a5276')
-            ax.text(0.5, 0.5, 'データが利用できません', 
-                   horizontalalignment='center', verticalalignment='center',
-                   color='white', transform=ax.transAxes)
-            self.canvas.draw()
+        if stats is None:
+            self._draw_stats_message('データが利用できません')
             return
         
-        # タイムスタンプをパース
-        parsed_data = []
-        for s in recent_scores:
-            try:
-                timestamp = datetime.strptime(s['timestamp'], '%Y-%m-%d %H:%M:%S')
-                parsed_data.append({
-                    'timestamp': timestamp,
-                    'score': s['score'],
-                    'reaving_ratio': s.get('reaving_ratio', 0) or 0
-                })
-            except:
-                continue
-        
-        if not parsed_data:
-            ax = self.fig.add_subplot(111)
-            ax.set_facecolor('#1a5276')
-            ax.text(0.5, 0.5, 'パース可能なデータがありません', 
-                   horizontalalignment='center', verticalalignment='center',
-                   color='white', transform=ax.transAxes)
-            self.canvas.draw()
+        if stats.counts.sum() == 0:
+            self._draw_stats_message('パース可能なデータがありません')
             return
         
-        # スコアデータから統計情報を計算（全体用）
-        scores = [s['score'] for s in recent_scores]
-        avg_score = sum(scores) / len(scores) if scores else 0
-        
-        # 集中度による分類（新しい条件）
-        focused_count = sum(1 for s in recent_scores if s['reaving_ratio'] <= 90 and s['score'] >= 70)
-        distracted_count = sum(1 for s in recent_scores if s['reaving_ratio'] <= 90 and 40 <= s['score'] < 70)
-        unfocused_count = sum(1 for s in recent_scores if s['reaving_ratio'] <= 90 and s['score'] < 40)
-        away_count = sum(1 for s in recent_scores if s['reaving_ratio'] > 90)
-        
         # 上段：円グラフ
         ax1 = self.fig.add_subplot(211)
         ax1.set_facecolor('#1a5276')
-        vals = [focused_count, distracted_count, unfocused_count, away_count]
-        labels = ["集中", "注意散漫", "非集中", "離席"]
-        ax1.pie(vals, labels=labels, autopct='%1.1f%%', colors=['#9b59b6', '#f1c40f', '#e74c3c', '#3498db'], textprops={'color':"white"})
+        vals = stats.total_state_counts
+        ax1.pie(vals, labels=STATE_LABELS, autopct='%1.1f%%', colors=['#9b59b6', '#f1c40f', '#e74c3c', '#3498db'], textprops={'color':"white"})
         ax1.set_title(f"{period}の集中度内訳", color='white')
 
         # 下段：棒グラフ（時間帯ごとの最大スコア）
         ax2 = self.fig.add_subplot(212)
         ax2.set_facecolor('#1a5276')
-        
-        if period == "日":
-            display_labels, bar_vals = self._get_daily_max_scores(parsed_data)
-        elif period == "週":
-            display_labels, bar_vals = self._get_weekly_max_scores(parsed_data)
-        elif period == "月":
-            display_labels, bar_vals = self._get_monthly_max_scores(parsed_data)
-        else:
-            display_labels = []
-            bar_vals = []
-        
-        ax2.bar(display_labels, bar_vals, color='#2ecc71')
+        ax2.bar(stats.labels, stats.max_scores, color='#2ecc71')
         ax2.set_ylim(0, 100)
         ax2.tick_params(colors='white')
-        ax2.set_title(f"{period}の推移 (平均: {avg_score:.1f})", color='white')
+        ax2.set_title(f"{period}の推移 (平均: {stats.mean_score:.1f})", color='white')
         ax2.set_ylabel('スコア', color='white')
         
         self.fig.tight_layout()
-        self.canvas.draw()
-    
-    def _get_daily_max_scores(self, parsed_data):
-        """今日のデータを6つの時間帯に分割して、各時間帯の最大スコアを取得"""
-        today = datetime.now().date()
-        today_data = [d for d in parsed_data if d['timestamp'].date() == today]
-        
-        time_ranges = [
-            ("0-4時", 0, 4),
-            ("4-8時", 4, 8),
-            ("8-12時", 8, 12),
-            ("12-16時", 12, 16),
-            ("16-20時", 16, 20),
-            ("20-24時", 20, 24)
-        ]
-        
-        labels = []
-        values = []
-        for label, start_hour, end_hour in time_ranges:
-            range_data = [d['score'] for d in today_data if start_hour <= d['timestamp'].hour < end_hour]
-            max_score = max(range_data) if range_data else 0
-            labels.append(label)
-            values.append(max_score)
-        
-        return labels, values
-    
-    def _get_weekly_max_scores(self, parsed_data):
-        """今週のデータを1日ごとに7つに分割して、各日の最大スコアを取得"""
-        today = datetime.now().date()
-        # 今週の月曜日を取得
-        sunday = today - timedelta(days=today.weekday())
-        
-        labels = []
-        values = []
-        for i in range(7):
-            target_date = sunday + timedelta(days=i)
-            day_data = [d['score'] for d in parsed_data if d['timestamp'].date() == target_date]
-            max_score = max(day_data) if day_data else 0
-            labels.append(target_date.strftime("%m/%d"))  # 月/日 形式
-            values.append(max_score)
-        
-        return labels, values
-    
-    def _get_monthly_max_scores(self, parsed_data):
-        """今月のデータを週ごとに分割して、各週の最大スコアを取得"""
-        today = datetime.now().date()
-        # 月初を取得
-        first_day = today.replace(day=1)
-        # 月初の週の月曜日を取得
-        sunday = first_day - timedelta(days=first_day.weekday()+1)
-        
-        labels = []
-        values = []
-        week_num = 1
-        
-        current_sunday = sunday
-        while True:
-            week_end = current_sunday + timedelta(days=6)
-            # その週のデータを取得（ただし当月のみ）
-            week_data = [d['score'] for d in parsed_data 
-                        if current_sunday <= d['timestamp'].date() < week_end 
-                        and d['timestamp'].month == today.month]
-            
-            if not week_data and current_sunday.month == today.month+1:
-                # 来月のデータが出始めたら終了
-                break
-            
-            max_score = max(week_data) if week_data else 0
-            labels.append(f"第{week_num}週")
-            values.append(max_score)
-            
-            current_sunday = week_end + timedelta(days=1)
-            week_num += 1
-            
-            if week_num > 6:  # 最大6週まで
-                break
-        
-        return labels, values
+        self.canvas.draw_idle()
+
+    def _draw_stats_message(self, message):
+        """グラフの代わりにメッセージを表示"""
+        ax = self.fig.add_subplot(111)
+        ax.set_facecolor('#1a5276')
+        ax.text(0.5, 0.5, message, 
+               horizontalalignment='center', verticalalignment='center',
+               color='white', transform=ax.transAxes)
+        self.canvas.draw_idle()
 
     def fill_history_table(self):
-        """履歴テーブルにDBデータを補充"""
-        recent_scores = self.db_manager.get_recent_scores(limit=HISTORY_DISPLAY_COUNT)
-        for i, score_data in enumerate(recent_scores):
-            if i >= 60:  # テーブルは最大60行
-                break
-            timestamp = score_data['timestamp']
-            score = score_data['score']
-            reaving_ratio = score_data.get('reaving_ratio', 0) or 0  # NullやNoneの場合は0
-            status = self.get_status(score, reaving_ratio)
-            self.history_table.setItem(i, 0, QTableWidgetItem(f"{timestamp}  {score:.1f}"))
-            self.history_table.setItem(i, 1, QTableWidgetItem(status))
-        
-        # 残りの行をクリア
-        for i in range(len(recent_scores), HISTORY_DISPLAY_COUNT):
-            self.history_table.setItem(i, 0, QTableWidgetItem(""))
-            self.history_table.setItem(i, 1, QTableWidgetItem(""))
+        """履歴テーブルの初回読み込み（以降はスクロールに応じてモデルが追加で読み込む）"""
+        if self.history_model.rowCount() == 0 and self.history_model.canFetchMore():
+            self.history_model.fetchMore()
+
+    def _on_history_scrolled(self, value):
+        if value == self.history_table.verticalScrollBar().minimum() and self.history_model.can_fetch_newer():
+            self.history_model.fetch_newer()
+
+    def _on_history_rows_shifted(self, delta):
+        """表示位置より上の行が増減した分だけスクロール位置をずらし、見ている行を動かさない"""
+        bar = self.history_table.verticalScrollBar()
+        bar.setValue(max(bar.minimum(), bar.value() + delta))
+
+    def on_new_score(self, score_data):
+        """新しい1分スコアを受け取った時の処理（DBは読み直さない）"""
+        ts = score_data.timestamp
+        if isinstance(ts, datetime):
+            ts = ts.strftime('%Y-%m-%d %H:%M:%S')
+        item = (ts, score_data.concentration_score, score_data.reaving_ratio or 0)
+        if self.recent_loaded:
+            self.recent_scores.append(item)
+            if self.right_stack.currentIndex() == 0:
+                self.score_log.setPlainText(self.generate_dummy_list())
+        else:
+            self._pending_scores.append(item)
+        self.history_model.prepend_score(score_data)
 
     def start_calibration(self):
         """キャリブレーション開始"""
         if self.main_window:
             self.main_window.start_calibration()
 
-    def update_camera_display(self, qt_img):
-        self.camera_label.setPixmap(QPixmap.fromImage(qt_img).scaled(400, 400, Qt.KeepAspectRatio))
-    
-    def update_frame_from_detector(self):
-        """detectorから最新フレームを取得して表示"""
-        if not self.detector:
+    def toggle_overlay_level(self):
+        """ランドマーク表示レベルを なし → 特徴点 → メッシュ の順に切り替え"""
+        self.overlay_level = next_level(self.overlay_level)
+        self._update_overlay_button()
+
+    def _update_overlay_button(self):
+        self.overlay_btn.setText(f"表示: {OVERLAY_LABELS.get(self.overlay_level, self.overlay_level)}")
+
+    def on_frame(self, frame, landmarks, seq):
+        """FrameDispatcher から新しいフレームを受け取って表示（このページが表示中の時だけ呼ばれる）"""
+        if seq == self.video_widget.frame_seq:
             return
+
+        # ランドマークを描画（元のフレームに影響しないよう、描画する時だけコピー）
+        if landmarks is not None and self.overlay_level != OVERLAY_NONE:
+            frame = self._draw_landmarks(frame.copy(), landmarks)
         
-        frame = self.detector.get_latest_frame()
-        if frame is not None:
-            # フレームのコピーを作成（元のフレームに影響しないように）
-            display_frame = frame.copy()
-            
-            # ランドマーク情報を取得
-            landmarks = self.detector.get_latest_landmarks()
-            
-            # ランドマークを描画
-            if landmarks is not None:
-                display_frame = self._draw_landmarks(display_frame, landmarks)
-            
-            # OpenCV形式 (BGR) → RGB に変換
-            rgb_frame = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-            
-            # RGB → QImage に変換
-            h, w, ch = rgb_frame.shape
-            bytes_per_line = 3 * w
-            qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            
-            # QLabel に表示
-            pixmap = QPixmap.fromImage(qt_image)
-            self.camera_label.setPixmap(pixmap.scaled(400, 400, Qt.KeepAspectRatio))
+        # BGR のまま VideoWidget に渡す（変換・縮小は描画時に行う）
+        self.video_widget.set_frame(frame, seq)
     
     def _draw_landmarks(self, frame, landmarks):
         """フレーム上にランドマークを描画
         
         Args:
             frame: OpenCV形式のフレーム (BGR)
-            landmarks: MediaPipeのランドマークリスト
+            landmarks: (N,3) float32 の正規化ランドマーク配列
             
         Returns:
             ランドマークが描画されたフレーム
         """
-        h, w = frame.shape[:2]
-        
-        # ランドマークを描画（各点を円で表示）
-        for landmark in landmarks:
-            # ランドマークの座標を画像ピクセル座標に変換
-            x = int(landmark.x * w)
-            y = int(landmark.y * h)
-            
-            # 座標が画像内に収まっているかチェック
-            if 0 <= x < w and 0 <= y < h:
-                # 黄色い円を描画 (BGR形式なので (0, 255, 255) は黄色)
-                cv2.circle(frame, (x, y), 2, (0, 255, 255), -1)
-        
-        return frame
\ No newline at end of file
+        return draw_landmarks(frame, landmarks, self.overlay_level)
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""カメラフレームの配信（MainWindow が1つだけ持つ）
+
+各ページがそれぞれタイマーで detector を読みに行くのではなく、ここで新しいフレームを1回だけ取り出して
+表示中のページにだけ渡します。
+
+- 表示中のページが `on_frame(frame, landmarks, seq)` を持っていなければタイマーを止める
+- ウィンドウ最小化中は完全に停止する
+- 読み取り間隔はディスプレイのリフレッシュレートと detector の実測レートに合わせる
+"""
+from PySide6.QtCore import QObject, QTimer, Qt
+
+from config import FPS, PREVIEW_MAX_FPS
+from core.latency import TRACER, STAGE_PREVIEW
+
+
+class FrameDispatcher(QObject):
+    RETUNE_INTERVAL_TICKS = 30  # 何回の読み取りごとに間隔を見直すか
+
+    def __init__(self, detector, stack, parent=None):
+        super().__init__(parent)
+        self.detector = detector
+        self.stack = stack              # 表示ページを切り替える QStackedWidget
+        self.suspended = False          # 最小化中などで止めているか
+        self.max_fps = PREVIEW_MAX_FPS  # 表示レートの上限 (core.governor が下げる)
+        self._last_seq = None
+        self._ticks = 0
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._on_tick)
+
+        self.stack.currentChanged.connect(self._on_page_changed)
+
+    # --- 外部から呼ぶ操作 ---
+
+    def set_detector(self, detector):
+        """detector を差し替える（起動後に読み込まれた場合など）"""
+        self.detector = detector
+        self._last_seq = None
+        self.resume()
+
+    def set_suspended(self, suspended: bool):
+        """最小化中は True にして配信を完全に止める"""
+        self.suspended = suspended
+        if suspended:
+            self.timer.stop()
+        else:
+            self.resume()
+
+    def resume(self):
+        """配信先があればタイマーを開始する"""
+        if self.suspended or self.detector is None or self._preview_target() is None:
+            self.timer.stop()
+            return
+        # ページ切り替え直後は同じフレームでも描画させる
+        self._last_seq = None
+        self.timer.start(self._interval_ms())
+
+    def set_max_fps(self, fps: float):
+        """表示レートの上限を変える（次の読み取りから反映）"""
+        self.max_fps = fps
+        if self.timer.isActive():
+            self.timer.setInterval(self._interval_ms())
+
+    def stop(self):
+        self.timer.stop()
+
+    # --- 内部処理 ---
+
+    def _preview_target(self):
+        """表示中のページがプレビューを持っていれば返す"""
+        page = self.stack.currentWidget()
+        if page is not None and hasattr(page, "on_frame"):
+            return page
+        return None
+
+    def _on_page_changed(self, _index):
+        self.resume()
+
+    def _display_hz(self) -> float:
+        screen = self.stack.screen() if hasattr(self.stack, "screen") else None
+        hz = screen.refreshRate() if screen is not None else 0.0
+        return hz if hz > 0 else 60.0
+
+    def _interval_ms(self) -> int:
+        """読み取り間隔 (ms)
+
+        表示レートは min(ディスプレイ, detector, max_fps) になるようにする。
+        detector のフレーム到着とタイマーの位相ずれで取りこぼさないよう、detector のレートの2倍までは速く読む
+        （新しいフレームが無い読み取りは seq の比較だけで終わる）。
+        """
+        detector_fps = self.detector.get_fps() if self.detector is not None else 0.0
+        if detector_fps <= 0:
+            detector_fps = FPS
+        poll_fps = min(self._display_hz(), self.max_fps, detector_fps * 2)
+        return max(1, int(1000 / poll_fps))
+
+    def _on_tick(self):
+        target = self._preview_target()
+        if target is None or self.detector is None:
+            self.timer.stop()
+            return
+
+        self._ticks += 1
+        if self._ticks % self.RETUNE_INTERVAL_TICKS == 0:
+            interval = self._interval_ms()
+            if interval != self.timer.interval():
+                self.timer.setInterval(interval)
+
+        frame, seq = self.detector.get_latest_frame_with_seq()
+        if frame is None or seq == self._last_seq:
+            return
+        self._last_seq = seq
+
+        landmarks = self.detector.get_latest_landmarks()
+        target.on_frame(frame, landmarks, seq)
+
+        # 表示したフレームの古さ（通し番号が一致する時だけ。読み取りの間に次のフレームが来ていれば数えない）
+        trace_seq, captured_at = getattr(self.detector, "frame_trace", (None, 0.0))
+        if trace_seq == seq:
+            TRACER.record_age(STAGE_PREVIEW, captured_at)
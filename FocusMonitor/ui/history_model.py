@@ -0,0 +1,192 @@
+"""履歴テーブル用のモデル（QTableView と組み合わせて使う）
+
+- スクロールで末尾に近づくと canFetchMore/fetchMore で次の1ページを DB から読み込む
+- ページは timestamp のインデックスを使った範囲検索で取得する（OFFSET は使わない）
+- メモリに持つのは最大 max_pages ページ分。超えたら表示位置の反対側の端から捨て、
+  そちらへスクロールし直した時に (timestamp, id) の位置から読み直す（1年分をさかのぼってもメモリは一定）
+- 新しいスコアはテーブルを作り直さず、先頭に1行挿入する（先頭のページを捨てている間は、戻った時に DB から読む）
+- AsyncLoader を渡すと、ページの読み込みはバックグラウンドで行う
+"""
+from datetime import datetime
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+from config import HISTORY_DISPLAY_COUNT, HISTORY_MAX_PAGES
+
+
+class HistoryTableModel(QAbstractTableModel):
+    HEADERS = ["平均スコア", "状態"]
+
+    # 読み込み・破棄で表示位置より上の行数が変わった時の増減（ビューはスクロール位置をこの分ずらす）
+    rows_shifted_above = Signal(int)
+
+    def __init__(self, db_manager, status_func, page_size: int = HISTORY_DISPLAY_COUNT,
+                 loader=None, max_pages: int = HISTORY_MAX_PAGES, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.loader = loader                # AsyncLoader（None なら同期で読み込む）
+        self.status_func = status_func      # (score, reaving_ratio) -> 状態の文字列
+        self.page_size = page_size
+        self.max_rows = max(2, max_pages) * page_size
+        # 行は (timestamp, id, score, reaving_ratio) のタプルで新しい順に持つ（QTableWidgetItem は作らない）
+        # 読み込み後に届いたスコアは id が None
+        self._rows = []
+        self._cursor = None         # 次の古いページの起点 (timestamp, id)
+        self._newer_cursor = None   # 先頭側を捨てた時、次の新しいページの起点 (timestamp, id)
+        self._exhausted = False
+        self._loading = False       # バックグラウンドで読み込み中か
+
+    # --- QAbstractTableModel の実装 ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        timestamp, _, score, reaving_ratio = self._rows[index.row()]
+        if index.column() == 0:
+            return f"{timestamp}  {score:.1f}"
+        return self.status_func(score, reaving_ratio)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        self._load(self.append_page, before=self._cursor)
+
+    # --- 外部から呼ぶ操作 ---
+
+    def can_fetch_newer(self) -> bool:
+        """先頭側のページを捨てていて、読み直せるか"""
+        return self._newer_cursor is not None and not self._loading
+
+    def fetch_newer(self):
+        """捨てた先頭側のページを1ページ読み直す（ビューが先頭までスクロールした時に呼ぶ）"""
+        if not self.can_fetch_newer():
+            return
+        self._load(self.prepend_page, after=self._newer_cursor)
+
+    def append_page(self, rows):
+        """DB から読み込んだ1ページ分（新しい順）を末尾に追加する"""
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(self._to_row(r) for r in rows)
+        self.endInsertRows()
+        last = rows[-1]
+        self._cursor = (last['timestamp'], last['id'])
+        self._drop_head()
+
+    def prepend_page(self, rows):
+        """捨てた先頭側から読み直した1ページ分（新しい順）を先頭に追加する"""
+        if len(rows) < self.page_size:
+            # 最新まで戻った（以降は届いたスコアを先頭に挿入する）
+            self._newer_cursor = None
+        if rows:
+            self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+            self._rows[:0] = [self._to_row(r) for r in rows]
+            self.endInsertRows()
+            if self._newer_cursor is not None:
+                self._newer_cursor = (rows[0]['timestamp'], rows[0]['id'])
+            self.rows_shifted_above.emit(len(rows))
+        self._drop_tail()
+
+    def _on_page_loaded(self, handler, rows):
+        self._loading = False
+        handler(rows)
+
+    def _on_page_error(self, error):
+        self._loading = False
+
+    def prepend_score(self, score_data):
+        """新しいスコアを先頭に1行挿入する（テーブルは作り直さない）"""
+        if self._cursor is None and not self._exhausted:
+            # まだ1ページも読み込んでいない: 次の fetchMore で DB から読まれる
+            return
+        if self._newer_cursor is not None:
+            # 先頭側を捨てている: 先頭まで戻った時に DB から読まれる
+            return
+        ts = score_data.timestamp
+        if isinstance(ts, datetime):
+            ts = ts.strftime('%Y-%m-%d %H:%M:%S')
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._rows.insert(0, (ts, None, score_data.concentration_score, score_data.reaving_ratio or 0))
+        self.endInsertRows()
+
+    def reload(self):
+        """読み込み済みの行を捨てて最初から読み直す"""
+        if self.loader is not None:
+            self.loader.cancel("history")
+        self.beginResetModel()
+        self._loading = False
+        self._rows = []
+        self._cursor = None
+        self._newer_cursor = None
+        self._exhausted = False
+        self.endResetModel()
+
+    # --- 内部処理 ---
+
+    def _load(self, handler, **kwargs):
+        if self.loader is None:
+            handler(self.db_manager.get_scores_page(limit=self.page_size, **kwargs))
+            return
+        self._loading = True
+        self.loader.submit("history", self.db_manager.get_scores_page, limit=self.page_size, **kwargs,
+                           on_done=lambda rows: self._on_page_loaded(handler, rows),
+                           on_error=self._on_page_error)
+
+    @staticmethod
+    def _to_row(r):
+        return (r['timestamp'], r['id'], r['score'], r.get('reaving_ratio', 0) or 0)
+
+    def _drop_head(self):
+        """上限を超えた分を先頭側（末尾を読んでいる時の、表示位置から遠い側）から捨てる"""
+        excess = len(self._rows) - self.max_rows
+        if excess <= 0:
+            return
+        # 読み直しの起点にするため、新しい先頭は DB から読んだ行 (id あり) にする
+        while excess < len(self._rows) and self._rows[excess][1] is None:
+            excess += 1
+        if excess >= len(self._rows):
+            return
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        del self._rows[:excess]
+        self.endRemoveRows()
+        head = self._rows[0]
+        self._newer_cursor = (head[0], head[1])
+        self.rows_shifted_above.emit(-excess)
+
+    def _drop_tail(self):
+        """上限を超えた分を末尾側（先頭側を読み直している時の、表示位置から遠い側）から捨てる"""
+        excess = len(self._rows) - self.max_rows
+        if excess <= 0:
+            return
+        keep = len(self._rows) - excess
+        self.beginRemoveRows(QModelIndex(), keep, len(self._rows) - 1)
+        del self._rows[keep:]
+        self.endRemoveRows()
+        tail = self._rows[-1]
+        self._cursor = (tail[0], tail[1])
+        self._exhausted = False
@@ -26,4 +26,18 @@ class LoginPage(QWidget):
             QPushButton:hover { background-color: #2471a3; }
         """)
         self.login_btn.clicked.connect(on_login_success)
-        layout.addWidget(self.login_btn, alignment=Qt.AlignCenter)
\ No newline at end of file
+        layout.addWidget(self.login_btn, alignment=Qt.AlignCenter)
+
+        # カメラ・モデルの読み込みに失敗した時などのメッセージ
+        self.status_label = QLabel("")
+        self.status_label.setFixedWidth(280)
+        self.status_label.setWordWrap(True)
+        self.status_label.setStyleSheet("color: #c0392b; font-size: 13px;")
+        self.status_label.hide()
+        layout.addWidget(self.status_label, alignment=Qt.AlignCenter)
+
+    def show_error(self, message: str):
+        """メッセージを表示し、ログインできないようにする"""
+        self.status_label.setText(message)
+        self.status_label.show()
+        self.login_btn.setEnabled(False)
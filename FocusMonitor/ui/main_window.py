@@ -1,12 +1,20 @@
 import sys
-from PySide6.QtWidgets import QMainWindow, QStackedWidget
-from PySide6.QtGui import QCloseEvent
+from PySide6.QtWidgets import QMainWindow, QStackedWidget, QWidget, QVBoxLayout, QMessageBox
+from PySide6.QtCore import QEvent
+from PySide6.QtGui import QCloseEvent, QKeySequence, QShortcut
 from ui.login_page import LoginPage
 from ui.dashboard_page import DashboardPage
 from ui.calibration_page import CalibrationPage
+from ui.frame_dispatcher import FrameDispatcher
+from ui.components import AlertBanner, beep
+from core.alerts import ALERT_MESSAGES
+from common.event_bus import TOPIC_ALERT
+from core.profiler import PROFILER
+from core.latency import TRACER
+from config import ALERT_SOUND_ENABLED, ALERT_LATENCY_BUDGET_MS
 
 class MainWindow(QMainWindow):
-    def __init__(self, detector=None, main_app=None):
+    def __init__(self, detector=None, main_app=None, event_bus=None):
         super().__init__()
         self.setWindowTitle("集中度モニタリングサービス")
         self.detector = detector
@@ -14,12 +22,22 @@ class MainWindow(QMainWindow):
         self.resize(1100, 700)
 
         # 画面を重ねて切り替えるスタック構造をメインウィンドウに持たせる
+        # （上部には居眠り・不在の即時アラートの帯を置く）
         self.stack = QStackedWidget()
-        self.setCentralWidget(self.stack)
+        self.alert_banner = AlertBanner(messages=ALERT_MESSAGES,
+                                        sound_hook=beep if ALERT_SOUND_ENABLED else None,
+                                        latency_budget_ms=ALERT_LATENCY_BUDGET_MS)
+        central = QWidget()
+        central_layout = QVBoxLayout(central)
+        central_layout.setContentsMargins(0, 0, 0, 0)
+        central_layout.setSpacing(0)
+        central_layout.addWidget(self.alert_banner)
+        central_layout.addWidget(self.stack)
+        self.setCentralWidget(central)
 
         # ログイン画面とダッシュボード画面を初期化
         self.login_page = LoginPage(self.on_logged_in)
-        self.dashboard_page = DashboardPage(detector=self.detector, main_window=self)
+        self.dashboard_page = DashboardPage(detector=self.detector, main_window=self, event_bus=event_bus)
         self.calibration_page = CalibrationPage(detector=self.detector)
 
         # 画面をスタックに登録
@@ -27,13 +45,41 @@ class MainWindow(QMainWindow):
         self.stack.addWidget(self.dashboard_page)   # Index 1
         self.stack.addWidget(self.calibration_page) # Index 2
 
+        # カメラ映像の配信はここで一括して行う（表示中のページにだけ届く）
+        self.frame_dispatcher = FrameDispatcher(self.detector, self.stack, parent=self)
+
+        # 隠しショートカット: プロファイリングの開始・終了（動作が重い時の調査用）
+        self.profile_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        self.profile_shortcut.activated.connect(self.toggle_profiling)
+
+        # アラートは detector のスレッドから届くので、バナー側でシグナルに載せ替える
+        if event_bus is not None:
+            event_bus.subscribe(TOPIC_ALERT, self.alert_banner.show_alert)
+
+    def set_detector(self, detector):
+        """起動後にバックグラウンドで用意された detector を設定する"""
+        self.detector = detector
+        self.dashboard_page.detector = detector
+        self.calibration_page.detector = detector
+        self.frame_dispatcher.set_detector(detector)
+
+    def show_detector_error(self, message: str):
+        """detector を用意できなかったことを知らせ、ログイン画面に戻してキャリブレーション・記録を始められないようにする"""
+        self.login_page.show_error(message)
+        self.stack.setCurrentIndex(0)
+        QMessageBox.critical(self, "カメラを使えません", message)
+
     def on_logged_in(self):
         """ログイン成功時の処理"""
         user_id = self.login_page.id_input.text() or "間々田"
         # ダッシュボードにユーザー名を反映
         self.dashboard_page.user_label.setText(f"ログインID: {user_id}")
 
-        self.start_calibration()    # ログイン後すぐキャリブレーション起動
+        # 保存済みの閾値があればそれを使ってすぐ記録を始め、なければキャリブレーション
+        if self.main_app and self.main_app.login(user_id):
+            self.stack.setCurrentIndex(1)
+        else:
+            self.start_calibration()
 
     
     def start_calibration(self):
@@ -49,19 +95,54 @@ class MainWindow(QMainWindow):
         # ダッシュボードに戻る
         self.stack.setCurrentIndex(1)
     
+    def toggle_profiling(self):
+        if self.main_app and hasattr(self.main_app, 'toggle_profiling'):
+            self.main_app.toggle_profiling()
+
+    def changeEvent(self, event):
+        """最小化されたらカメラ映像の配信を止め、元に戻ったら再開する"""
+        if event.type() == QEvent.WindowStateChange:
+            self.frame_dispatcher.set_suspended(self.isMinimized())
+        super().changeEvent(event)
+
     def closeEvent(self, event: QCloseEvent):
         """ウィンドウをクローズするイベント処理（×ボタンが押された時）"""
         print("ウィンドウをクローズしています...")
         
+        # カメラ映像の配信を停止
+        self.frame_dispatcher.stop()
+
         # メインループのタイマーを停止
         if self.main_app and hasattr(self.main_app, 'timer'):
             self.main_app.timer.stop()
             print("メインループタイマーを停止しました")
+
+        # プロファイリング中なら、そこまでの結果を書き出す
+        PROFILER.stop()
+
+        # 続いている居眠り・不在などの区間を保存
+        if self.main_app and hasattr(self.main_app, 'episode_tracker'):
+            self.main_app.episode_tracker.flush()
+
+        # 遅延の一覧を出す
+        print("撮影からの遅延\n" + TRACER.report())
+
+        # 収集サーバーへの送信を止める（残りは次に起動した時に送る）
+        if self.main_app and getattr(self.main_app, 'uploader', None):
+            self.main_app.uploader.stop()
         
         # detectorのループを停止
         if self.detector:
             self.detector.stop()
             print("detectorを停止しました")
+
+        # 残っているアラートを保存する
+        if self.main_app and hasattr(self.main_app, 'save_pending_alerts'):
+            self.main_app.save_pending_alerts()
+
+        # フレームごとの記録を書き切る（detector のスレッドが止まってから閉じる）
+        if self.main_app and getattr(self.main_app, 'frame_recorder', None):
+            self.main_app.frame_recorder.close()
         
         # ウィンドウのクローズを実行
         event.accept()
\ No newline at end of file
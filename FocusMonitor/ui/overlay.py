@@ -0,0 +1,132 @@
+"""カメラ映像へのランドマーク重畳描画
+
+detector から受け取る (N,3) float32 配列のランドマークを、ピクセル座標へ一括変換して描画します。
+1点ずつ cv2.circle を呼ぶのではなく、NumPy のマスクで画面外の点を除外してからまとめて描画します。
+"""
+import numpy as np
+
+# --- 重畳表示レベル ---
+OVERLAY_NONE = "none"            # 描画しない
+OVERLAY_KEYPOINTS = "keypoints"  # 目・鼻・口・輪郭などの特徴点のみ
+OVERLAY_MESH = "mesh"            # 顔全体のメッシュ
+
+OVERLAY_LEVELS = [OVERLAY_NONE, OVERLAY_KEYPOINTS, OVERLAY_MESH]
+OVERLAY_LABELS = {
+    OVERLAY_NONE: "なし",
+    OVERLAY_KEYPOINTS: "特徴点",
+    OVERLAY_MESH: "メッシュ",
+}
+
+# 描画色 (BGR形式なので (0, 255, 255) は黄色)
+POINT_COLOR = (0, 255, 255)
+MESH_COLOR = (0, 200, 200)
+
+# 特徴点として表示するランドマーク番号 (MediaPipe Face Mesh の番号)
+KEYPOINT_INDICES = np.array([
+    33, 133, 159, 145,      # 右目 (目尻・目頭・上まぶた・下まぶた)
+    362, 263, 386, 374,     # 左目
+    468, 473,               # 虹彩の中心 (refine 済みモデルのみ)
+    70, 105, 300, 334,      # 眉
+    1, 4,                   # 鼻
+    61, 291, 13, 14,        # 口
+    10, 152, 234, 454,      # 顔の輪郭 (上下左右)
+], dtype=np.intp)
+
+# 点スタンプ (半径2の円を構成するオフセット)
+_STAMP_RADIUS = 2
+_sy, _sx = np.mgrid[-_STAMP_RADIUS:_STAMP_RADIUS + 1, -_STAMP_RADIUS:_STAMP_RADIUS + 1]
+_STAMP_MASK = _sx ** 2 + _sy ** 2 <= _STAMP_RADIUS ** 2
+STAMP_OFFSETS = np.stack([_sx[_STAMP_MASK], _sy[_STAMP_MASK]], axis=1).astype(np.int32)
+
+_mesh_edges = None  # (E,2) のメッシュ辺インデックス (初回利用時に生成)
+
+
+def _load_mesh_edges():
+    """MediaPipe のテッセレーション定義から (E,2) の辺インデックス配列を作る
+
+    取得できない環境では空配列を返し、メッシュ表示は全点表示で代用する。
+    """
+    global _mesh_edges
+    if _mesh_edges is not None:
+        return _mesh_edges
+
+    connections = None
+    try:
+        import mediapipe as mp
+        connections = [(c.start, c.end) for c in
+                       mp.tasks.vision.FaceLandmarksConnections.FACE_LANDMARKS_TESSELATION]
+    except Exception:
+        try:
+            import mediapipe as mp
+            connections = list(mp.solutions.face_mesh.FACEMESH_TESSELATION)
+        except Exception:
+            connections = []
+
+    if connections:
+        _mesh_edges = np.array(connections, dtype=np.intp).reshape(-1, 2)
+    else:
+        _mesh_edges = np.empty((0, 2), dtype=np.intp)
+    return _mesh_edges
+
+
+def to_pixel_coords(landmarks, w, h):
+    """正規化座標 (N,3) をピクセル座標 (N,2) int32 に一括変換する"""
+    return (landmarks[:, :2] * np.array([w, h], dtype=np.float32)).astype(np.int32)
+
+
+def stamp_points(frame, pts, color=POINT_COLOR):
+    """点群をまとめてフレームに書き込む (cv2.circle を1点ずつ呼ばない)"""
+    h, w = frame.shape[:2]
+    stamped = (pts[:, None, :] + STAMP_OFFSETS[None, :, :]).reshape(-1, 2)
+    xs, ys = stamped[:, 0], stamped[:, 1]
+    inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    frame[ys[inside], xs[inside]] = color
+    return frame
+
+
+def draw_mesh(frame, pts, color=MESH_COLOR):
+    """メッシュの辺を cv2.polylines で一括描画する"""
+    edges = _load_mesh_edges()
+    # モデルの点数がメッシュ定義より少ない場合に備えて範囲外の辺を除く
+    edges = edges[(edges < len(pts)).all(axis=1)]
+    if len(edges) == 0:
+        return stamp_points(frame, pts)
+
+    h, w = frame.shape[:2]
+    segments = pts[edges]  # (E,2,2)
+    xs, ys = segments[..., 0], segments[..., 1]
+    inside = ((xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)).all(axis=1)
+    segments = np.ascontiguousarray(segments[inside])
+    if len(segments):
+        import cv2  # 起動を速くするため、実際に描画する時に読み込む（detector 側で読み込み済み）
+        cv2.polylines(frame, segments, False, color, 1, cv2.LINE_8)
+    return frame
+
+
+def draw_landmarks(frame, landmarks, level=OVERLAY_MESH):
+    """フレーム上にランドマークを描画
+
+    Args:
+        frame: OpenCV形式のフレーム (BGR)。直接書き換える
+        landmarks: (N,3) float32 の正規化ランドマーク配列
+        level: OVERLAY_NONE / OVERLAY_KEYPOINTS / OVERLAY_MESH
+
+    Returns:
+        ランドマークが描画されたフレーム
+    """
+    if landmarks is None or level == OVERLAY_NONE or len(landmarks) == 0:
+        return frame
+
+    h, w = frame.shape[:2]
+    pts = to_pixel_coords(landmarks, w, h)
+
+    if level == OVERLAY_KEYPOINTS:
+        indices = KEYPOINT_INDICES[KEYPOINT_INDICES < len(pts)]
+        return stamp_points(frame, pts[indices])
+    return draw_mesh(frame, pts)
+
+
+def next_level(level):
+    """表示レベルを順番に切り替える (ボタン用)"""
+    i = OVERLAY_LEVELS.index(level) if level in OVERLAY_LEVELS else 0
+    return OVERLAY_LEVELS[(i + 1) % len(OVERLAY_LEVELS)]